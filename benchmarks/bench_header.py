@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from sc2replaytool.core.header import load_replay_header  # noqa: E402
+from sc2replaytool.core.indexer import (  # noqa: E402
+    HEADER_LOAD_LEVEL,
+    _ensure_sc2reader,
+    _serialize_replay_metadata,
+)
+
+# Fields the header reader has to reproduce for the list view and filters.
+COMPARED_FIELDS = ("map", "players", "matchup", "start_time", "length", "game_type", "speed")
+
+
+def _time(load: Callable[[str], Any], files: List[Path], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for path in files:
+            load(str(path))
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _record(replay: Any, path: Path) -> Dict[str, Any]:
+    record = _serialize_replay_metadata(replay, path)
+    return {key: record.get(key) for key in COMPARED_FIELDS}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the mpyq header reader with sc2reader's header load")
+    parser.add_argument("paths", nargs="*", type=Path, default=[REPO_ROOT / "data"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    files: List[Path] = []
+    for path in args.paths:
+        files.extend(sorted(path.rglob("*.SC2Replay")) if path.is_dir() else [path])
+    if not files:
+        print("No replays found")
+        return 1
+
+    _ensure_sc2reader()
+    import sc2reader
+
+    def sc2reader_header(path: str) -> Any:
+        return sc2reader.load_replay(path, load_level=HEADER_LOAD_LEVEL)
+
+    # One untimed pass so imports and datapack loading are not measured.
+    for path in files:
+        load_replay_header(str(path))
+        sc2reader_header(str(path))
+
+    fast = _time(load_replay_header, files, args.repeat)
+    slow = _time(sc2reader_header, files, args.repeat)
+    print(f"Replays: {len(files)} (best of {args.repeat})")
+    print(f"header reader: {fast * 1000:8.1f} ms  ({fast * 1000 / len(files):.2f} ms/replay)")
+    print(f"sc2reader:     {slow * 1000:8.1f} ms  ({slow * 1000 / len(files):.2f} ms/replay)")
+    if fast > 0:
+        print(f"Speedup: {slow / fast:.1f}x")
+
+    mismatches = 0
+    for path in files:
+        expected = _record(sc2reader_header(str(path)), path)
+        actual = _record(load_replay_header(str(path)), path)
+        for key in COMPARED_FIELDS:
+            if expected[key] != actual[key]:
+                mismatches += 1
+                print(f"{path.name}: {key} differs: sc2reader={expected[key]!r} header={actual[key]!r}")
+    print(f"Field mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+# Loaders measured in child processes so each starts from a clean heap.
+LOADERS = ("json", "tables", "snapshot")
+
+RACES = ("Protoss", "Terran", "Zerg")
+UNITS = {
+    "Protoss": ("Probe", "Pylon", "Gateway", "Assimilator", "CyberneticsCore", "Stalker", "Zealot", "Nexus"),
+    "Terran": ("SCV", "SupplyDepot", "Barracks", "Refinery", "Factory", "Marine", "Reaper", "OrbitalCommand"),
+    "Zerg": ("Drone", "Overlord", "Hatchery", "Extractor", "SpawningPool", "Zergling", "Queen", "RoachWarren"),
+}
+
+
+def _corpus(count: int) -> Dict[str, Any]:
+    # Synthetic records shaped like the indexer's: a few folders and maps,
+    # a few thousand player names and build orders from a small unit set.
+    rng = random.Random(0)
+    folders = [f"C:/Users/player/Documents/StarCraft II/Accounts/{n}/Replays/Multiplayer" for n in range(12)]
+    maps = [f"Map {n} LE" for n in range(40)]
+    names = [f"Player{n}" for n in range(3000)]
+    replays = []
+    for n in range(count):
+        folder = rng.choice(folders)
+        races = [rng.choice(RACES) for _ in range(2)]
+        players = [
+            {"name": rng.choice(names), "race": race, "result": result, "team_id": slot + 1, "pid": slot + 1}
+            for slot, (race, result) in enumerate(zip(races, ("Win", "Loss")))
+        ]
+        sequences = [
+            {
+                "pid": player["pid"],
+                "race": player["race"],
+                "name": player["name"],
+                "seq_tech": [rng.choice(UNITS[player["race"]]) for _ in range(20)],
+                "seq_general": [rng.choice(UNITS[player["race"]]) for _ in range(30)],
+            }
+            for player in players
+        ]
+        filename = f"{rng.choice(maps)} ({n}).SC2Replay"
+        replays.append(
+            {
+                "path": f"{folder}/{filename}",
+                "filename": filename,
+                "source_folder": folder,
+                "map": rng.choice(maps),
+                "start_time": f"2024-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}T{rng.randint(0, 23):02}:00:00",
+                "length": f"{rng.randint(3, 40):02}.{rng.randint(0, 59):02}",
+                "game_type": "1v1",
+                "speed": "Faster",
+                "matchup": "v".join(sorted(race[0] for race in races)),
+                "players": players,
+                "analysis_status": "complete",
+                "mtime": 1700000000.0 + n,
+                "size": rng.randint(20000, 200000),
+                "build_order_auto": " | ".join(
+                    f"{sequence['race'][0]}: {' > '.join(sequence['seq_tech'][:3])}" for sequence in sequences
+                ),
+                "bo_sequences": sequences,
+                "proxy_flag": False,
+                "proxy_distance_max": round(rng.uniform(10, 80), 2),
+                "proxy_distances": {"1": round(rng.uniform(10, 80), 2), "2": round(rng.uniform(10, 80), 2)},
+                "proxy_threshold": 35.0,
+            }
+        )
+    return {"replays": replays, "folders": folders}
+
+
+def _resident_kib() -> int:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return -1
+
+
+def _child(loader: str, data_dir: Path) -> int:
+    before = _resident_kib()
+    started = time.perf_counter()
+    if loader == "json":
+        with open(data_dir / "replay_index.json", encoding="utf-8") as f:
+            index = json.load(f)
+    else:
+        from sc2replaytool.core import index_db
+
+        if loader == "tables":
+            with index_db._connect() as conn:
+                index = dict(index_db._read_meta(conn), replays=index_db._read_records(conn))
+        else:
+            index = index_db.read_index()
+    opened = time.perf_counter() - started
+    # Touch every record so lazily decoded ones count too.
+    records = list(index["replays"])
+    loaded = time.perf_counter() - started
+    print(json.dumps({"records": len(records), "opened": opened, "loaded": loaded, "rss": _resident_kib() - before}))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare index size on disk and in memory across storage formats")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--child", choices=LOADERS, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return _child(args.child, args.data_dir)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, XDG_DATA_HOME=tmp, APPDATA=tmp)
+        os.environ.update(XDG_DATA_HOME=tmp, APPDATA=tmp)
+        from sc2replaytool.core import index_db
+        from sc2replaytool.core.paths import get_data_dir
+        from sc2replaytool.core.storage import save_json
+
+        data_dir = get_data_dir()
+        index = _corpus(args.count)
+        save_json(data_dir / "replay_index.json", index)
+        index_db.write_index(index)
+        with index_db._connect() as conn:
+            conn.execute("VACUUM")
+            generations = [generation for (generation,) in conn.execute("SELECT generation FROM shards")]
+
+        sizes: Dict[str, int] = {
+            "replay_index.json": (data_dir / "replay_index.json").stat().st_size,
+            index_db.INDEX_DB_FILENAME: index_db.index_db_path().stat().st_size,
+            f"{len(generations)} snapshots": sum(
+                index_db.snapshot_path(generation).stat().st_size for generation in generations
+            ),
+        }
+        print(f"Records: {args.count}")
+        for name, size in sizes.items():
+            print(f"{name:28} {size / 1024 / 1024:8.1f} MiB")
+
+        results: List[Dict[str, Any]] = []
+        for loader in LOADERS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", loader, "--data-dir", str(data_dir)],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(dict(json.loads(output), loader=loader))
+        for result in results:
+            rss = f"{result['rss'] / 1024:8.1f} MiB" if result["rss"] >= 0 else "     n/a"
+            print(
+                f"{result['loader']:9} open {result['opened'] * 1000:8.1f} ms  "
+                f"all records {result['loaded'] * 1000:8.1f} ms  RSS growth {rss}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,10 +8,12 @@ if __package__ is None or __package__ == "":
 
 import json
 import csv
+import multiprocessing
 import threading
 import subprocess
 import os
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 from queue import Queue
@@ -25,13 +27,58 @@ from .core.indexer import (
     scan_replays_multi,
     scan_replays_delta,
     scan_replays_multi_delta,
+    scan_replay_paths,
+    analyze_partial_replays,
+    apply_proxy_threshold,
+    needs_analysis,
+    prewarm_parse_workers,
     load_index,
+    save_index,
+    ANALYSIS_COMPLETE,
+    ANALYSIS_PARTIAL,
+)
+from .core.tags import (
+    TAG_JOURNAL_FILENAME,
+    is_favorite,
+    load_tags,
+    save_tag_edits,
+    save_tags,
+    set_favorite,
+    set_build_order,
+    set_tags,
 )
-from .core.tags import load_tags, save_tags, set_favorite, set_build_order, set_tags
 from .core.paths import get_data_dir
+from .core.archives import replay_file_path
+from .core.index_db import (
+    LEGACY_INDEX_FILENAME,
+    LEGACY_TAGS_FILENAME,
+    clear_index_store,
+    filter_replays,
+    shard_folder,
+)
+from .core.index_snapshot import copy_replays
+from .core.listing_cache import DISCOVERY_WORKERS, LISTING_CACHE_FILENAME
+from .core.event_cache import clear_event_cache
+from .core.failures import FAILURES_FILENAME
+from .core.journal import JOURNAL_FILENAME
+from .core.scan_job import ScanCancelled, ScanJob
+from .core.governor import (
+    ScanGovernor,
+    BACKGROUND_WORKERS,
+    BACKGROUND_NICE,
+    BACKGROUND_BYTES_PER_SECOND,
+    BACKGROUND_TICK_SECONDS,
+    BACKGROUND_REST_SECONDS,
+)
+from .core.watcher import ReplayWatcher, create_watcher
 
 
 SETTINGS_FILENAME = "settings.json"
+# How often watcher results are drained into a scan; the watcher itself only
+# wakes up when the filesystem reports a change.
+WATCH_DRAIN_MS = 500
+# Scans that run while a game may be in progress go through a ScanGovernor.
+BACKGROUND_CONTEXTS = ("watch", "startup")
 
 
 def _icon_path() -> Path:
@@ -149,6 +196,7 @@ class App:
         self.proxy_threshold = tk.StringVar(value=str(self.settings.get("proxy_threshold", 35.0)))
         self.watch_enabled = tk.BooleanVar(value=bool(self.settings.get("watch_enabled", False)))
         self.watch_interval_seconds = tk.StringVar(value=str(self.settings.get("watch_interval_seconds", 15)))
+        self.scan_jobs = tk.StringVar(value=str(self.settings.get("scan_jobs", 0)))
         self.bo_step_vars = [tk.StringVar(value="Any") for _ in range(8)]
         self.build_order_entry = tk.StringVar(value="")
         self.tags_entry = tk.StringVar(value="")
@@ -173,9 +221,19 @@ class App:
         self._scan_baseline_paths: set[str] = set()
         self._scan_update_ui = True
         self._scan_delta_only = False
+        self._scan_analysis_only = False
         self._watch_enabled = bool(self.watch_enabled.get())
         initial_watch_ms = self._get_watch_interval_ms_silent(default_ms=15000)
         self._watch_interval_ms = initial_watch_ms if initial_watch_ms > 0 else 15000
+        self.watch_queue: Queue[Any] = Queue()
+        self._watcher: ReplayWatcher | None = None
+        self._watcher_key: tuple[Any, ...] | None = None
+        self._watch_pending: set[str] = set()
+        self._scan_paths: List[str] | None = None
+        self._scan_job: ScanJob | None = None
+        self._scan_governor: ScanGovernor | None = None
+        self._deferred_paths: set[str] = set()
+        self._deferred_resume_at = 0.0
         self._new_replays_window: tk.Toplevel | None = None
         self._new_replays_tree: ttk.Treeview | None = None
         self._new_replays_by_path: Dict[str, Dict[str, Any]] = {}
@@ -245,6 +303,9 @@ class App:
         ttk.Label(action_row, text="Watch (s):").pack(side=tk.LEFT)
         ttk.Entry(action_row, textvariable=self.watch_interval_seconds, width=6).pack(side=tk.LEFT, padx=4)
         ttk.Button(action_row, text="Set Watch", command=self._set_watch_settings).pack(side=tk.LEFT, padx=6)
+        ttk.Label(action_row, text="Scan Jobs:").pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Entry(action_row, textvariable=self.scan_jobs, width=4).pack(side=tk.LEFT, padx=4)
+        ttk.Button(action_row, text="Set Jobs", command=self._set_scan_jobs).pack(side=tk.LEFT, padx=6)
 
         filter_row = ttk.Frame(search_tab)
         filter_row.pack(fill=tk.X, pady=8)
@@ -425,6 +486,10 @@ class App:
         ttk.Label(status_row, textvariable=self.status).pack(side=tk.LEFT)
         self.progress = ttk.Progressbar(status_row, orient=tk.HORIZONTAL, length=260, mode="determinate", variable=self.progress_var)
         self.progress.pack(side=tk.RIGHT)
+        self.cancel_scan_button = ttk.Button(status_row, text="Cancel", command=self._cancel_scan, state=tk.DISABLED)
+        self.cancel_scan_button.pack(side=tk.RIGHT, padx=6)
+        self.pause_scan_button = ttk.Button(status_row, text="Pause", command=self._toggle_scan_pause, state=tk.DISABLED)
+        self.pause_scan_button.pack(side=tk.RIGHT)
 
     def _apply_window_icon(self, window: tk.Toplevel | tk.Tk) -> None:
         try:
@@ -524,9 +589,21 @@ class App:
                 self.replay_folder.set("")
                 self.settings["replay_folder"] = ""
             save_settings(self.settings)
+            self._drop_folder_records(folder)
             self._sync_folder_controls()
             self._refresh_list()
 
+    def _drop_folder_records(self, folder: str) -> None:
+        # Only the removed folder's shard is rewritten.
+        shard = str(Path(folder).resolve())
+        replays = [item for item in self.index.get("replays", []) if shard_folder(item) != shard]
+        if len(replays) == len(self.index.get("replays", [])):
+            return
+        index = dict(self.index)
+        index["replays"] = replays
+        self.index = index
+        save_index(self.index, [shard])
+
     def _save_folder_name(self) -> None:
         folder = self.replay_folder.get().strip()
         if not folder:
@@ -599,9 +676,41 @@ class App:
             delta_only=True,
         )
 
+    def _sync_watcher(self) -> None:
+        key = (self._watch_enabled, tuple(self.replay_folders), self._watch_interval_ms)
+        if key == self._watcher_key:
+            return
+        self._watcher_key = key
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        if not self._watch_enabled or not self.replay_folders:
+            return
+        # The polling fallback (no inotify) reuses the watch interval.
+        self._watcher = create_watcher(
+            self.replay_folders,
+            self.watch_queue.put,
+            interval=self._watch_interval_ms / 1000,
+        )
+        self._watcher.start()
+        self._log_scan(f"Watching {len(self.replay_folders)} folder(s) with {type(self._watcher).__name__}")
+        # Watch ticks reuse these workers, so the first new game is parsed
+        # without waiting for sc2reader to import.
+        prewarm_parse_workers(governor=self._background_governor())
+
     def _watch_loop(self) -> None:
         try:
-            if self._watch_enabled and self.replay_folders and not self._scan_in_progress:
+            self._sync_watcher()
+            while not self.watch_queue.empty():
+                self._watch_pending.update(self.watch_queue.get())
+            # Replays deferred by a governed scan run on the next tick, after
+            # a short rest, whether or not watching is enabled.
+            resting = bool(self._deferred_paths) and time.monotonic() < self._deferred_resume_at
+            ready = bool(self._deferred_paths) or (bool(self._watch_pending) and self._watch_enabled)
+            if ready and not resting and self.replay_folders and not self._scan_in_progress:
+                paths = sorted(self._watch_pending | self._deferred_paths)
+                self._watch_pending = set()
+                self._deferred_paths = set()
                 threshold = self._get_proxy_threshold_silent(default=35.0)
                 known_paths = {str(item.get("path", "")) for item in self.index.get("replays", []) if item.get("path")}
                 self._start_scan_thread(
@@ -611,10 +720,10 @@ class App:
                     notify_new=True,
                     baseline_paths=known_paths,
                     update_ui=False,
-                    delta_only=True,
+                    paths=paths,
                 )
         finally:
-            self.root.after(self._watch_interval_ms, self._watch_loop)
+            self.root.after(WATCH_DRAIN_MS, self._watch_loop)
 
     def _start_scan_thread(
         self,
@@ -626,6 +735,9 @@ class App:
         baseline_paths: set[str] | None = None,
         update_ui: bool = True,
         delta_only: bool = False,
+        analysis_only: bool = False,
+        paths: List[str] | None = None,
+        background: bool = False,
     ) -> bool:
         if self._scan_in_progress:
             self.status.set("Scan already running...")
@@ -636,7 +748,20 @@ class App:
         self._scan_baseline_paths = set(baseline_paths or set())
         self._scan_update_ui = update_ui
         self._scan_delta_only = delta_only
-        thread = threading.Thread(target=self._scan_worker, args=(folders, threshold), daemon=True)
+        self._scan_analysis_only = analysis_only
+        self._scan_paths = paths
+        self._scan_job = ScanJob()
+        self._scan_governor = self._background_governor() if background or context in BACKGROUND_CONTEXTS else None
+        self._set_scan_controls(True)
+        jobs = self._get_scan_jobs_silent(default=0)
+        # Scans start from the in-memory index instead of re-reading the JSON;
+        # the list is copied so edits made here while scanning stay separate.
+        # A snapshot list's copy leaves unread records undecoded.
+        index = dict(self.index)
+        index["replays"] = copy_replays(self.index.get("replays", []))
+        thread = threading.Thread(
+            target=self._scan_worker, args=(folders, threshold, jobs, index, self._scan_job), daemon=True
+        )
         thread.start()
         self.root.after(100, self._poll_scan)
         return True
@@ -647,20 +772,87 @@ class App:
         self._refresh_filters()
         self._refresh_list()
 
-    def _scan_worker(self, folders: List[Path], threshold: float) -> None:
+    def _background_governor(self) -> ScanGovernor:
+        return ScanGovernor(
+            workers=int(self.settings.get("background_workers", BACKGROUND_WORKERS)),
+            nice=int(self.settings.get("background_nice", BACKGROUND_NICE)),
+            bytes_per_second=float(self.settings.get("background_bytes_per_second", BACKGROUND_BYTES_PER_SECOND)),
+            tick_seconds=float(self.settings.get("background_tick_seconds", BACKGROUND_TICK_SECONDS)),
+            rest_seconds=float(self.settings.get("background_rest_seconds", BACKGROUND_REST_SECONDS)),
+        )
+
+    def _set_scan_controls(self, active: bool) -> None:
+        state = tk.NORMAL if active else tk.DISABLED
+        self.pause_scan_button.configure(state=state, text="Pause")
+        self.cancel_scan_button.configure(state=state)
+
+    def _toggle_scan_pause(self) -> None:
+        job = self._scan_job
+        if job is None or job.cancelled:
+            return
+        if job.paused:
+            job.resume()
+            self.pause_scan_button.configure(text="Pause")
+            self.status.set("Scan resumed")
+            self._log_scan("Scan resumed")
+            return
+        job.pause()
+        self.pause_scan_button.configure(text="Resume")
+        self.status.set("Scan paused")
+        self._log_scan("Scan paused")
+        # Replays parsed so far are in the scan journal; show them while paused.
+        self.index = load_index()
+        self._refresh_filters()
+        self._refresh_list()
+
+    def _cancel_scan(self) -> None:
+        if self._scan_job is None or self._scan_job.cancelled:
+            return
+        self._scan_job.cancel()
+        self._set_scan_controls(False)
+        self.status.set("Cancelling scan...")
+        self._log_scan("Scan cancel requested")
+
+    def _scan_worker(
+        self,
+        folders: List[Path],
+        threshold: float,
+        jobs: int,
+        index: Dict[str, Any],
+        job: ScanJob,
+    ) -> None:
         def progress_cb(current: int, total: int) -> None:
             self.scan_queue.put(("progress", current, total))
 
+        options = {
+            "proxy_threshold": threshold,
+            "progress_cb": progress_cb,
+            "jobs": jobs,
+            "opening_window": bool(self.settings.get("opening_window", True)),
+            "opening_loops": self.settings.get("opening_loops"),
+            "index": index,
+            "newest_first": True,
+            "job": job,
+            "governor": self._scan_governor,
+        }
         try:
-            if len(folders) == 1 and self._scan_delta_only:
-                index = scan_replays_delta(folders[0], proxy_threshold=threshold, progress_cb=progress_cb)
-            elif len(folders) == 1:
-                index = scan_replays(folders[0], proxy_threshold=threshold, progress_cb=progress_cb)
-            elif self._scan_delta_only:
-                index = scan_replays_multi_delta(folders, proxy_threshold=threshold, progress_cb=progress_cb)
+            if self._scan_analysis_only:
+                index = analyze_partial_replays(**options)
+            elif self._scan_paths is not None:
+                index = scan_replay_paths(self._scan_paths, folders, two_phase=True, **options)
             else:
-                index = scan_replays_multi(folders, proxy_threshold=threshold, progress_cb=progress_cb)
+                options["discovery_jobs"] = int(self.settings.get("discovery_jobs", DISCOVERY_WORKERS))
+                if len(folders) == 1 and self._scan_delta_only:
+                    index = scan_replays_delta(folders[0], two_phase=True, **options)
+                elif len(folders) == 1:
+                    index = scan_replays(folders[0], two_phase=True, **options)
+                elif self._scan_delta_only:
+                    index = scan_replays_multi_delta(folders, two_phase=True, **options)
+                else:
+                    index = scan_replays_multi(folders, two_phase=True, **options)
             self.scan_queue.put(("done", index))
+        except ScanCancelled as exc:
+            self.scan_queue.put(("cancelled", str(exc)))
         except Exception as exc:  # noqa: BLE001
             self.scan_queue.put(("error", str(exc)))
 
@@ -674,11 +866,13 @@ class App:
             if total and self._scan_update_ui:
                 percent = (current / total) * 100.0
                 self.progress_var.set(percent)
-                self.status.set(f"Scanning... {current}/{total}")
+                label = "Analyzing" if self._scan_analysis_only else "Scanning"
+                self.status.set(f"{label}... {current}/{total}")
             self.root.after(50, self._poll_scan)
             return
         if isinstance(item, tuple) and item[0] == "done":
             context = self._scan_context
+            analysis_only = self._scan_analysis_only
             notify_new = self._scan_notify_new
             baseline_paths = set(self._scan_baseline_paths)
             self.index = item[1]
@@ -688,14 +882,23 @@ class App:
                 new_items = [r for r in self.index.get("replays", []) if r.get("path") not in baseline_paths]
             if self._scan_update_ui:
                 self.progress_var.set(100.0)
-                self.status.set("Scan complete")
+                self.status.set("Analysis complete" if analysis_only else "Scan complete")
                 self.scan_hint.set("")
             self._scan_in_progress = False
-            should_refresh_ui = self._scan_update_ui or bool(new_items)
+            self._scan_job = None
+            self._set_scan_controls(False)
+            stats = self.index.get("stats") or {}
+            should_refresh_ui = self._scan_update_ui or bool(new_items or stats.get("changed") or stats.get("removed"))
             if should_refresh_ui:
                 self._refresh_filters()
                 self._refresh_list()
             self._log_scan("Scan complete")
+            if stats:
+                self._log_scan(
+                    "Scan stats: {total} total, {cached} cached, {parsed} parsed, {refreshed} refreshed, "
+                    "{failed} failed, "
+                    "{events_decoded} tracker events decoded, ~{events_skipped} skipped".format(**stats)
+                )
             if notify_new:
                 if new_items:
                     self._show_new_replays_window(new_items, source_context=context)
@@ -706,6 +909,46 @@ class App:
             self._scan_baseline_paths = set()
             self._scan_update_ui = True
             self._scan_delta_only = False
+            self._scan_analysis_only = False
+            self._scan_paths = None
+            governor = self._scan_governor
+            self._scan_governor = None
+            if governor is not None and (self.index.get("deferred") or stats.get("deferred")):
+                self._log_scan(f"Deferred {stats.get('deferred', 0)} replays to the next background tick")
+                self._deferred_paths.update(self.index.get("deferred") or [])
+                self._deferred_resume_at = time.monotonic() + governor.rest_seconds
+                if analysis_only:
+                    self.root.after(int(governor.rest_seconds * 1000), lambda: self._start_analysis_pass(background=True))
+            if not analysis_only:
+                if governor is not None:
+                    # The analysis pass after a background scan is governed
+                    # too, and starts after the same rest.
+                    self.root.after(int(governor.rest_seconds * 1000), lambda: self._start_analysis_pass(background=True))
+                else:
+                    self._start_analysis_pass()
+            return
+        if isinstance(item, tuple) and item[0] == "cancelled":
+            _tag, message = item
+            # The scan stopped before saving; what it parsed is folded in from
+            # the journal, and the rest is picked up by the next scan.
+            self.index = load_index()
+            self.tags = load_tags()
+            self.status.set("Scan cancelled")
+            self.scan_hint.set("")
+            self._log_scan(message)
+            self._refresh_filters()
+            self._refresh_list()
+            self._scan_in_progress = False
+            self._scan_job = None
+            self._scan_governor = None
+            self._set_scan_controls(False)
+            self._scan_context = "manual"
+            self._scan_notify_new = False
+            self._scan_baseline_paths = set()
+            self._scan_update_ui = True
+            self._scan_delta_only = False
+            self._scan_analysis_only = False
+            self._scan_paths = None
             return
         if isinstance(item, tuple) and item[0] == "error":
             _tag, message = item
@@ -716,20 +959,42 @@ class App:
             if self._scan_update_ui:
                 self.scan_hint.set("")
             self._scan_in_progress = False
+            self._scan_job = None
+            self._scan_governor = None
+            self._set_scan_controls(False)
             self._scan_context = "manual"
             self._scan_notify_new = False
             self._scan_baseline_paths = set()
             self._scan_update_ui = True
             self._scan_delta_only = False
+            self._scan_analysis_only = False
+            self._scan_paths = None
             if context != "watch":
                 messagebox.showerror("Scan failed", message)
             return
         self._scan_in_progress = False
+        self._scan_job = None
+        self._scan_governor = None
+        self._set_scan_controls(False)
         self._scan_context = "manual"
         self._scan_notify_new = False
         self._scan_baseline_paths = set()
         self._scan_update_ui = True
         self._scan_delta_only = False
+        self._scan_analysis_only = False
+        self._scan_paths = None
+
+    def _start_analysis_pass(self, background: bool = False) -> None:
+        if self._scan_in_progress:
+            # The running scan starts its own analysis pass when it finishes.
+            return
+        if not any(needs_analysis(item) for item in self.index.get("replays", [])):
+            return
+        threshold = self._get_proxy_threshold_silent(default=35.0)
+        self._log_scan("Starting background analysis pass")
+        self._start_scan_thread(
+            [], threshold, context="analysis", update_ui=True, analysis_only=True, background=background
+        )
 
     def _refresh_filters(self) -> None:
         self._sync_folder_controls()
@@ -871,11 +1136,14 @@ class App:
         selected_steps = self._normalized_bo_steps()
 
         inserted_by_path: Dict[str, str] = {}
-        for item in self.index.get("replays", []):
+        for item in filter_replays(
+            self.index.get("replays", []),
+            matchup=None if matchup_filter == "All" else matchup_filter,
+            map_text=map_query,
+            player_text=player_query,
+        ):
             if not self._folder_matches(item, folder_filter):
                 continue
-            if matchup_filter != "All" and item.get("matchup") != matchup_filter:
-                continue
             if self.favorite_only.get() and item.get("path") not in favorites:
                 continue
             if self.proxy_only.get() and not item.get("proxy_flag"):
@@ -898,12 +1166,6 @@ class App:
                 continue
             if search_tags and not all(t in tag_list for t in search_tags):
                 continue
-            if player_query:
-                players = item.get("players", [])
-                if not any(player_query in str(p.get("name", "")).lower() for p in players):
-                    continue
-            if map_query and map_query not in str(item.get("map", "")).lower():
-                continue
             if selected_steps and not self._match_build_order_steps(item, selected_steps):
                 continue
             self.filtered_items.append(item)
@@ -1009,6 +1271,7 @@ class App:
             f"Build Order (auto): {auto_bo}",
             f"Proxy Distances: {proxy_by_player}",
             f"Proxy Threshold: {item.get('proxy_threshold', '')}",
+            f"Analysis: {item.get('analysis_status', ANALYSIS_COMPLETE)}",
         ]
         self._set_details("\n".join(details))
 
@@ -1020,7 +1283,7 @@ class App:
         value = self.build_order_entry.get().strip()
         for path in paths:
             set_build_order(self.tags, path, value)
-        save_tags(self.tags)
+        save_tag_edits(self.tags, paths)
         self._refresh_filters()
         self._refresh_list()
         self.status.set(f"Build order updated for {len(paths)} replay(s)")
@@ -1034,7 +1297,7 @@ class App:
         tag_list = [t.strip() for t in raw.split(",")] if raw else []
         for path in paths:
             set_tags(self.tags, path, tag_list)
-        save_tags(self.tags)
+        save_tag_edits(self.tags, paths)
         self._refresh_filters()
         self._refresh_list()
         self.status.set(f"Tags updated for {len(paths)} replay(s)")
@@ -1044,11 +1307,9 @@ class App:
         if not paths:
             messagebox.showinfo("No Selection", "Select a replay first.")
             return
-        favorites = set(self.tags.get("favorites", []))
         for path in paths:
-            is_fav = path in favorites
-            set_favorite(self.tags, path, not is_fav)
-        save_tags(self.tags)
+            set_favorite(self.tags, path, not is_favorite(self.tags, path))
+        save_tag_edits(self.tags, paths)
         self._refresh_list()
         self.status.set(f"Favorite toggled for {len(paths)} replay(s)")
 
@@ -1102,11 +1363,14 @@ class App:
         map_query = self.map_filter.get().strip().lower()
         tags_map = self.tags.get("tags", {})
 
-        for item in self.index.get("replays", []):
+        for item in filter_replays(
+            self.index.get("replays", []),
+            matchup=None if matchup_filter == "All" else matchup_filter,
+            map_text=map_query,
+            player_text=player_query,
+        ):
             if not self._folder_matches(item, folder_filter):
                 continue
-            if matchup_filter != "All" and item.get("matchup") != matchup_filter:
-                continue
             if self.favorite_only.get() and item.get("path") not in favorites:
                 continue
             if self.proxy_only.get() and not item.get("proxy_flag"):
@@ -1114,12 +1378,6 @@ class App:
             tag_list = tags_map.get(item.get("path", ""), [])
             if self.tag_filter.get() != "All" and self.tag_filter.get() not in tag_list:
                 continue
-            if player_query:
-                players = item.get("players", [])
-                if not any(player_query in str(p.get("name", "")).lower() for p in players):
-                    continue
-            if map_query and map_query not in str(item.get("map", "")).lower():
-                continue
             candidates.append(item)
 
         selected = [var.get() for var in self.bo_step_vars]
@@ -1186,6 +1444,34 @@ class App:
             return default_ms
         return int(seconds * 1000)
 
+    def _get_scan_jobs(self) -> int | None:
+        try:
+            jobs = int(self.scan_jobs.get().strip())
+        except ValueError:
+            messagebox.showwarning("Invalid Jobs", "Scan jobs must be a whole number (0 = one per CPU).")
+            return None
+        if jobs < 0:
+            messagebox.showwarning("Invalid Jobs", "Scan jobs must be >= 0.")
+            return None
+        return jobs
+
+    def _get_scan_jobs_silent(self, default: int = 0) -> int:
+        try:
+            jobs = int(self.scan_jobs.get().strip())
+        except (TypeError, ValueError):
+            return default
+        if jobs < 0:
+            return default
+        return jobs
+
+    def _set_scan_jobs(self) -> None:
+        jobs = self._get_scan_jobs()
+        if jobs is None:
+            return
+        self.settings["scan_jobs"] = jobs
+        save_settings(self.settings)
+        self.status.set(f"Scan jobs saved ({jobs or 'auto'})")
+
     def _on_watch_toggle(self) -> None:
         self._watch_enabled = bool(self.watch_enabled.get())
         self.settings["watch_enabled"] = self._watch_enabled
@@ -1340,8 +1626,7 @@ class App:
         tag_list = [t.strip() for t in raw_tags.split(",")] if raw_tags else []
         set_tags(self.tags, path, tag_list)
         set_favorite(self.tags, path, bool(self.new_replays_fav.get()))
-        save_tags(self.tags)
-        self.tags = load_tags()
+        save_tag_edits(self.tags, [path])
         self._refresh_filters()
         self._refresh_list()
         self.status.set("Replay metadata updated")
@@ -1363,7 +1648,11 @@ class App:
             return
         self.settings["proxy_threshold"] = value
         save_settings(self.settings)
-        self.status.set("Proxy threshold saved. Re-scan to apply.")
+        changed = apply_proxy_threshold(self.index, value)
+        if changed:
+            save_index(self.index)
+        self._refresh_filters()
+        self.status.set(f"Proxy threshold applied ({changed} replay(s) updated)")
 
     def _format_proxy_distance(self, value: Any) -> str:
         if value is None:
@@ -1764,7 +2053,7 @@ class App:
             if tag not in current_tags:
                 current_tags.append(tag)
             set_tags(self.tags, path, current_tags)
-        save_tags(self.tags)
+        save_tag_edits(self.tags, paths)
         first_path = paths[0]
         self.tags_entry.set(", ".join(self.tags.get("tags", {}).get(first_path, [])))
         self._refresh_filters()
@@ -1776,7 +2065,7 @@ class App:
         if not path:
             messagebox.showinfo("No Selection", "Select a replay first.")
             return
-        file_path = Path(path)
+        file_path = Path(replay_file_path(path))
         if not file_path.exists():
             messagebox.showwarning("Missing File", "Replay file not found.")
             return
@@ -1826,6 +2115,7 @@ class App:
                     "proxy_distance_max",
                     "proxy_distances",
                     "proxy_threshold",
+                    "analysis_status",
                     "mtime",
                     "size",
                     "tags",
@@ -1854,6 +2144,7 @@ class App:
                         "proxy_distance_max": item.get("proxy_distance_max", ""),
                         "proxy_distances": json.dumps(item.get("proxy_distances", {}), ensure_ascii=False),
                         "proxy_threshold": item.get("proxy_threshold", ""),
+                        "analysis_status": item.get("analysis_status", ANALYSIS_COMPLETE),
                         "mtime": item.get("mtime", ""),
                         "size": item.get("size", ""),
                         "tags": ", ".join(tags_map.get(path, [])),
@@ -1944,6 +2235,7 @@ class App:
                 "proxy_distance_max": row.get("proxy_distance_max", ""),
                 "proxy_distances": parse_json(row.get("proxy_distances", ""), {}),
                 "proxy_threshold": row.get("proxy_threshold", ""),
+                "analysis_status": row.get("analysis_status") or ANALYSIS_COMPLETE,
                 "mtime": row.get("mtime", ""),
                 "size": row.get("size", ""),
             }
@@ -1997,7 +2289,19 @@ class App:
         )
         if not confirm:
             return
-        for filename in ("replay_index.json", "replay_tags.json"):
+        try:
+            clear_index_store()
+        except Exception:
+            pass
+        clear_event_cache()
+        for filename in (
+            LEGACY_INDEX_FILENAME,
+            LEGACY_TAGS_FILENAME,
+            TAG_JOURNAL_FILENAME,
+            JOURNAL_FILENAME,
+            FAILURES_FILENAME,
+            LISTING_CACHE_FILENAME,
+        ):
             path = get_data_dir() / filename
             try:
                 if path.exists():
@@ -2021,6 +2325,7 @@ class App:
 
 
 def main() -> None:
+    multiprocessing.freeze_support()
     root = tk.Tk()
     App(root)
     root.mainloop()
@@ -1,10 +1,29 @@
 from __future__ import annotations
 
 import argparse
+import multiprocessing
+import signal
+import time
 from pathlib import Path
+from queue import Queue
 
-from .core.indexer import scan_replays, load_index
-from .core.tags import load_tags, save_tags, set_favorite, set_build_order
+from .core.indexer import (
+    scan_replays,
+    scan_replays_delta,
+    scan_replay_paths,
+    load_index,
+    analyze_partial_replays,
+    is_partial,
+    prewarm_parse_workers,
+)
+from .core.listing_cache import DISCOVERY_WORKERS
+from .core.scan_job import ScanCancelled, ScanJob
+from .core.governor import ScanGovernor
+from .core.watcher import create_watcher
+from .core.tags import load_tags, save_tag_edits, set_favorite, set_build_order
+from .core.failures import load_failures, save_failures, list_failures
+from .core.dedup import duplicate_groups
+from .core.index_db import filter_replays
 
 
 def parse_args() -> argparse.Namespace:
@@ -20,6 +39,56 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--proxy", action="store_true", help="Filter proxy-only replays")
     parser.add_argument("--export-csv", type=Path, help="Export filtered list to CSV")
     parser.add_argument("--proxy-threshold", type=float, default=35.0, help="Proxy distance threshold")
+    parser.add_argument("--jobs", type=int, default=1, help="Parallel parse workers for --scan (0 = one per CPU)")
+    parser.add_argument(
+        "--discovery-jobs",
+        type=int,
+        default=DISCOVERY_WORKERS,
+        help="Folders listed and stat'ed concurrently during --scan (raise for network shares)",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="With --scan, only parse added or modified replays and drop deleted ones",
+    )
+    parser.add_argument("--watch", action="store_true", help="Keep running and index replays as they are written")
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=15.0,
+        help="Polling interval in seconds when filesystem events are unavailable",
+    )
+    parser.add_argument(
+        "--newest-first",
+        action="store_true",
+        help="Parse the most recently modified replays first",
+    )
+    parser.add_argument("--two-phase", action="store_true", help="Index header metadata only; run --analyze later")
+    parser.add_argument("--analyze", action="store_true", help="Fill build orders/proxy data for partial replays and rerun outdated analyzers")
+    parser.add_argument(
+        "--opening-window",
+        action="store_true",
+        help="Stop decoding tracker events once build orders and proxy data are complete",
+    )
+    parser.add_argument(
+        "--opening-loops",
+        type=int,
+        default=None,
+        help="With --opening-window, never decode tracker events past this game loop",
+    )
+    parser.add_argument(
+        "--analysis",
+        choices=["partial", "complete"],
+        default="",
+        help="Filter by analysis status",
+    )
+    parser.add_argument("--failures", action="store_true", help="List replays that failed to parse")
+    parser.add_argument("--duplicates", action="store_true", help="List groups of byte-identical indexed replays")
+    parser.add_argument(
+        "--clear-failures",
+        action="store_true",
+        help="Forget known parse failures so the next scan retries them",
+    )
     parser.add_argument("--tag", type=str, default="", help="Filter by tag")
     parser.add_argument("--set-tags", type=Path, help="Set tags for a replay path")
     parser.add_argument("--tags-value", type=str, default="", help="Comma separated tags")
@@ -42,42 +111,188 @@ def _format_winner(players: list[dict[str, object]]) -> str:
     return " | ".join(winners)
 
 
+def _print_scan_stats(stats: dict[str, object]) -> None:
+    if not stats:
+        return
+    print(
+        f"Scanned {stats.get('total', 0)} replays: {stats.get('cached', 0)} cached, "
+        f"{stats.get('parsed', 0)} parsed, {stats.get('refreshed', 0)} refreshed, {stats.get('failed', 0)} failed"
+    )
+    if "added" in stats:
+        print(f"Delta: {stats['added']} added, {stats.get('changed', 0)} changed, {stats.get('removed', 0)} removed")
+    if "fs_calls" in stats:
+        print(
+            f"Discovery: {stats.get('dirs_listed', 0)} folders listed, {stats.get('dirs_cached', 0)} cached, "
+            f"{stats['fs_calls']} filesystem calls ({stats.get('fs_calls_per_replay', 0)} per replay)"
+        )
+    if stats.get("deferred"):
+        print(f"Deferred {stats['deferred']} replays to the next tick")
+    if stats.get("deduplicated"):
+        print(f"Reused {stats['deduplicated']} results for byte-identical copies")
+    if stats.get("known_failures"):
+        print(f"Skipped {stats['known_failures']} known bad replays (see --failures)")
+    if stats.get("events_decoded") or stats.get("events_skipped"):
+        print(
+            f"Tracker events: {stats.get('events_decoded', 0)} decoded, "
+            f"~{stats.get('events_skipped', 0)} skipped ({stats.get('bytes_skipped', 0)} bytes)"
+        )
+
+
+def _run_scan(scan: callable, *args: object, **kwargs: object) -> dict[str, object] | None:
+    # Ctrl+C (or SIGTERM) stops the scan after the replays in progress, keeping
+    # what was parsed for the next run; a second Ctrl+C aborts immediately.
+    # SIGUSR1 pauses and resumes.
+    job = ScanJob()
+
+    def cancel(_signum: int, _frame: object) -> None:
+        if job.cancelled:
+            raise KeyboardInterrupt
+        print("Stopping after the replays in progress (Ctrl+C again to abort)...")
+        job.cancel()
+
+    def toggle_pause(_signum: int, _frame: object) -> None:
+        if job.paused:
+            job.resume()
+            print("Scan resumed")
+        else:
+            job.pause()
+            print("Scan paused (send SIGUSR1 again to resume)")
+
+    handlers = {signal.SIGINT: cancel, signal.SIGTERM: cancel}
+    if hasattr(signal, "SIGUSR1"):
+        handlers[signal.SIGUSR1] = toggle_pause
+    previous = {signum: signal.signal(signum, handler) for signum, handler in handlers.items()}
+    try:
+        return scan(*args, job=job, **kwargs)
+    except ScanCancelled as exc:
+        print(exc)
+        return None
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+def _watch(folder: Path, interval: float, parse_options: dict[str, object]) -> None:
+    changes: Queue[set[str]] = Queue()
+    watcher = create_watcher([folder.resolve()], changes.put, interval=interval)
+    watcher.start()
+    print(f"Watching {folder} ({type(watcher).__name__}), Ctrl+C to stop")
+    index = load_index()
+    # Watch scans share the machine with the game, so they are governed and
+    # replays left over from one tick carry over to the next.
+    governor = ScanGovernor()
+    prewarm_parse_workers(governor=governor)
+    deferred: set[str] = set()
+    try:
+        while True:
+            if deferred:
+                time.sleep(governor.rest_seconds)
+                paths = set(deferred)
+            else:
+                paths = set(changes.get())
+            while not changes.empty():
+                paths.update(changes.get())
+            index = scan_replay_paths(paths, [folder], index=index, governor=governor, **parse_options)
+            deferred = set(index.get("deferred", []))
+            _print_scan_stats(index.get("stats", {}))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+
+
 def main() -> None:
+    # Frozen builds start parse workers by re-running this executable.
+    multiprocessing.freeze_support()
     args = parse_args()
+    parse_options = {
+        "proxy_threshold": args.proxy_threshold,
+        "jobs": args.jobs,
+        "opening_window": args.opening_window,
+        "opening_loops": args.opening_loops,
+        "newest_first": args.newest_first,
+    }
+
+    if args.clear_failures:
+        registry = load_failures()
+        print(f"Cleared {len(registry.get('failures', {}))} known failures")
+        registry["failures"] = {}
+        save_failures(registry)
 
     if args.scan:
         if not args.replays:
             raise SystemExit("--replays is required for --scan")
-        scan_replays(args.replays, proxy_threshold=args.proxy_threshold)
+        scan = scan_replays_delta if args.delta else scan_replays
+        index = _run_scan(
+            scan, args.replays, two_phase=args.two_phase, discovery_jobs=args.discovery_jobs, **parse_options
+        )
+        if index is None:
+            return
+        _print_scan_stats(index.get("stats", {}))
+
+    if args.analyze:
+        index = _run_scan(analyze_partial_replays, **parse_options)
+        if index is None:
+            return
+        _print_scan_stats(index.get("stats", {}))
+
+    if args.watch:
+        if not args.replays:
+            raise SystemExit("--replays is required for --watch")
+        _watch(args.replays, args.watch_interval, parse_options)
+
+    if args.failures:
+        for entry in list_failures(load_failures()):
+            print(
+                f"{entry.get('path')} | {entry.get('exception')} | attempts={entry.get('attempts')} | "
+                f"{entry.get('elapsed')}s | sc2reader {entry.get('parser_version')} | "
+                f"{entry.get('last_seen')} | {entry.get('message')}"
+            )
+
+    if args.duplicates:
+        groups = duplicate_groups(load_index().get("replays", []))
+        for group in groups:
+            print(f"{len(group)} copies:")
+            for item in group:
+                print(f"  {item.get('path')}")
+        print(f"{len(groups)} duplicate groups, {sum(len(group) - 1 for group in groups)} redundant copies")
 
     if args.set_favorite:
         tags = load_tags()
-        set_favorite(tags, str(args.set_favorite.resolve()), args.favorite_value)
-        save_tags(tags)
+        path = str(args.set_favorite.resolve())
+        set_favorite(tags, path, args.favorite_value)
+        save_tag_edits(tags, [path])
 
     if args.set_build_order:
         tags = load_tags()
-        set_build_order(tags, str(args.set_build_order.resolve()), args.build_order_value)
-        save_tags(tags)
+        path = str(args.set_build_order.resolve())
+        set_build_order(tags, path, args.build_order_value)
+        save_tag_edits(tags, [path])
     if args.set_tags:
         tags = load_tags()
         from .core.tags import set_tags as _set_tags
 
         tag_list = [t.strip() for t in args.tags_value.split(",")] if args.tags_value else []
-        _set_tags(tags, str(args.set_tags.resolve()), tag_list)
-        save_tags(tags)
+        path = str(args.set_tags.resolve())
+        _set_tags(tags, path, tag_list)
+        save_tag_edits(tags, [path])
 
     if args.list:
         index = load_index()
         tags = load_tags()
         rows = []
-        for item in index.get("replays", []):
-            if args.matchup and item.get("matchup") != args.matchup:
-                continue
+        for item in filter_replays(
+            index.get("replays", []),
+            matchup=args.matchup or None,
+            map_text=args.map or "",
+            player_text=args.player or "",
+        ):
             if args.favorite and item.get("path") not in tags.get("favorites", []):
                 continue
             if args.proxy and not item.get("proxy_flag"):
                 continue
+            if args.analysis and is_partial(item) != (args.analysis == "partial"):
+                continue
             if args.tag and args.tag not in tags.get("tags", {}).get(item.get("path", ""), []):
                 continue
             if args.build_order:
@@ -86,12 +301,6 @@ def main() -> None:
                 display_bo = manual_bo or auto_bo
                 if display_bo != args.build_order:
                     continue
-            if args.player:
-                players = item.get("players", [])
-                if not any(args.player.lower() in str(p.get("name", "")).lower() for p in players):
-                    continue
-            if args.map and args.map.lower() not in str(item.get("map", "")).lower():
-                continue
             bo_display = tags.get("build_orders", {}).get(item.get("path", ""), "") or item.get("build_order_auto", "")
             players = "; ".join(p.get("name", "") for p in item.get("players", []))
             tag_list = tags.get("tags", {}).get(item.get("path", ""), [])
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import tarfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+# Replays inside replay packs are addressed as "<archive>!<member>" and read
+# into memory on demand, so packs never need extracting. A member's record
+# uses the archive's mtime/size as its cache key.
+ARCHIVE_SEPARATOR = "!"
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+REPLAY_SUFFIX = ".sc2replay"
+
+# Member sizes seen while listing archives, so governed scans charge a
+# member's own size against the read budget instead of the whole pack's.
+_member_sizes: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def member_path(archive: Any, member: str) -> str:
+    return f"{archive}{ARCHIVE_SEPARATOR}{member}"
+
+
+def split_member_path(path: Any) -> Optional[Tuple[str, str]]:
+    # Returns (archive, member) for a member path, None for a plain file.
+    text = str(path)
+    lowered = text.lower()
+    end = None
+    for suffix in ARCHIVE_SUFFIXES:
+        index = lowered.find(suffix + ARCHIVE_SEPARATOR)
+        if index >= 0 and (end is None or index + len(suffix) < end):
+            end = index + len(suffix)
+    if end is None:
+        return None
+    # Member names always use "/" inside zip and tar files.
+    return text[:end], text[end + 1 :].replace("\\", "/")
+
+
+def replay_file_path(path: Any) -> str:
+    # The file on disk holding the replay: the archive for members.
+    split = split_member_path(path)
+    return split[0] if split else str(path)
+
+
+def replay_name(path: Any) -> str:
+    split = split_member_path(path)
+    return split[1].rpartition("/")[2] if split else Path(path).name
+
+
+def replay_stat(path: Any) -> os.stat_result:
+    return os.stat(replay_file_path(path))
+
+
+def replay_exists(path: Any) -> bool:
+    return os.path.exists(replay_file_path(path))
+
+
+def list_replay_members(archive: Any) -> Dict[str, int]:
+    # Maps each .SC2Replay member to its uncompressed size. A damaged archive
+    # lists nothing; OSError (e.g. the archive is gone) propagates.
+    members: Dict[str, int] = {}
+    try:
+        if str(archive).lower().endswith(".zip"):
+            with zipfile.ZipFile(archive) as pack:
+                for info in pack.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith(REPLAY_SUFFIX):
+                        members[info.filename] = info.file_size
+        else:
+            with tarfile.open(archive) as pack:
+                for info in pack:
+                    if info.isfile() and info.name.lower().endswith(REPLAY_SUFFIX):
+                        members[info.name] = info.size
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError) as exc:
+        logging.debug("Could not list replay archive %s: %s", archive, exc)
+        return {}
+    remember_member_sizes(archive, members)
+    return members
+
+
+def remember_member_sizes(archive: Any, members: Dict[str, int]) -> None:
+    with _lock:
+        for member, size in members.items():
+            _member_sizes[member_path(archive, member)] = size
+
+
+def read_size(path: Any, size: int) -> int:
+    # Bytes a parse of path reads: the member's size when it is known.
+    with _lock:
+        return _member_sizes.get(str(path), size)
+
+
+def open_replay(path: Any) -> Any:
+    # What sc2reader and mpyq load: the path itself for plain files, an
+    # in-memory copy of the member for archived replays.
+    split = split_member_path(path)
+    if split is None:
+        return str(path)
+    archive, member = split
+    if archive.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive) as pack:
+            data = pack.read(member)
+    else:
+        with tarfile.open(archive) as pack:
+            stream = pack.extractfile(member)
+            if stream is None:
+                raise KeyError(f"{member} is not a file in {Path(archive).name}")
+            data = stream.read()
+    source = io.BytesIO(data)
+    source.name = str(path)
+    return source
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from .archives import open_replay
+from .index_snapshot import record_value
+
+
+# Byte-identical replays (copies synced into several account folders, "(2)"
+# duplicates from downloads) share a content hash, so one parse serves all
+# of them. blake2b reads at memory speed, far below the cost of a parse.
+HASH_DIGEST_SIZE = 16
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def content_hash(path: Any) -> str:
+    return source_hash(open_replay(path))
+
+
+def source_hash(source: Any) -> str:
+    # source is what open_replay returned, so a parse can hash the replay it
+    # already holds instead of opening it again.
+    digest = hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+    if hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            digest.update(view)
+        return digest.hexdigest()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def try_content_hash(path: Any) -> Optional[str]:
+    try:
+        return content_hash(path)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def try_source_hash(source: Any) -> Optional[str]:
+    try:
+        return source_hash(source)
+    except (OSError, ValueError):
+        return None
+
+
+class RecordsByHash(Mapping):
+    # The first indexed record of each content hash, found through the hash
+    # and size columns: a snapshot row is only decoded when looked up.
+    # sizes holds the sizes of those records.
+    def __init__(self, replays: Any) -> None:
+        self._replays = replays
+        self._slots: Dict[str, int] = {}
+        self.sizes: Set[Any] = set()
+        for slot in range(len(replays)):
+            digest = record_value(replays, slot, "content_hash")
+            if digest and digest not in self._slots:
+                self._slots[digest] = slot
+                self.sizes.add(record_value(replays, slot, "size"))
+
+    def __getitem__(self, digest: str) -> Dict[str, Any]:
+        return self._replays[self._slots[digest]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+def records_by_hash(replays: Any) -> RecordsByHash:
+    return RecordsByHash(replays)
+
+
+def duplicate_groups(replays: Iterable[Dict[str, Any]], *, hash_missing: bool = True) -> List[List[Dict[str, Any]]]:
+    # Groups of indexed records whose files are byte-identical, largest first.
+    # Records indexed before content hashes were stored are hashed on the fly.
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in replays:
+        digest = item.get("content_hash")
+        if not digest and hash_missing and item.get("path"):
+            digest = try_content_hash(item["path"])
+        if digest:
+            groups.setdefault(digest, []).append(item)
+    found = [sorted(items, key=lambda item: item.get("path", "")) for items in groups.values() if len(items) > 1]
+    return sorted(found, key=lambda items: (-len(items), items[0].get("path", "")))
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from .paths import get_data_dir
+
+
+EVENT_CACHE_DIRNAME = "event_cache"
+
+
+def _cache_name(replay_path: str) -> str:
+    return hashlib.sha1(replay_path.encode("utf-8")).hexdigest() + ".json.gz"
+
+
+def event_cache_path(replay_path: str) -> Path:
+    return get_data_dir() / EVENT_CACHE_DIRNAME / _cache_name(replay_path)
+
+
+def save_event_subset(replay_path: str, mtime: float, size: int, subset: Dict[str, Any]) -> None:
+    path = event_cache_path(replay_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = dict(subset)
+    data.update({"path": replay_path, "mtime": mtime, "size": size})
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    tmp_path.replace(path)
+
+
+def load_event_subset(replay_path: str, mtime: Any, size: Any) -> Optional[Dict[str, Any]]:
+    path = event_cache_path(replay_path)
+    if not path.exists():
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, EOFError, json.JSONDecodeError):
+        return None
+    if data.get("path") != replay_path or data.get("mtime") != mtime or data.get("size") != size:
+        return None
+    return data
+
+
+def discard_event_subset(replay_path: str) -> None:
+    try:
+        event_cache_path(replay_path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def prune_event_cache(replay_paths: Iterable[str]) -> int:
+    # Drops the subsets of replays no longer indexed (and temporary files a
+    # crash left behind). Returns the number of files removed.
+    keep = {_cache_name(path) for path in replay_paths if path}
+    removed = 0
+    try:
+        with os.scandir(get_data_dir() / EVENT_CACHE_DIRNAME) as entries:
+            stale = [entry.path for entry in entries if entry.name not in keep]
+    except OSError:
+        return 0
+    for path in stale:
+        try:
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def clear_event_cache() -> None:
+    shutil.rmtree(get_data_dir() / EVENT_CACHE_DIRNAME, ignore_errors=True)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .archives import replay_exists
+from .storage import load_json, save_json
+from .paths import get_data_dir
+
+
+FAILURES_FILENAME = "failures.json"
+
+
+def failures_path() -> Path:
+    return get_data_dir() / FAILURES_FILENAME
+
+
+def load_failures() -> Dict[str, Any]:
+    return load_json(failures_path(), {"failures": {}})
+
+
+def save_failures(registry: Dict[str, Any]) -> None:
+    save_json(failures_path(), registry)
+
+
+def get_failure(
+    registry: Dict[str, Any],
+    replay_path: str,
+    stat: os.stat_result,
+    parser_version: str,
+) -> Optional[Dict[str, Any]]:
+    # An entry only applies while the file and the parser are unchanged; a new
+    # mtime/size or an sc2reader upgrade earns the replay another attempt.
+    entry = registry.get("failures", {}).get(replay_path)
+    if not entry:
+        return None
+    if entry.get("mtime") != stat.st_mtime or entry.get("size") != stat.st_size:
+        return None
+    if entry.get("parser_version") != parser_version:
+        return None
+    return entry
+
+
+def record_failure(
+    registry: Dict[str, Any],
+    replay_path: str,
+    stat: os.stat_result,
+    parser_version: str,
+    failure: Dict[str, Any],
+) -> Dict[str, Any]:
+    # Attempts accumulate across file changes and parser upgrades, since a
+    # matching entry is skipped rather than retried.
+    failures = registry.setdefault("failures", {})
+    previous = failures.get(replay_path)
+    now = datetime.now().isoformat(timespec="seconds")
+    entry = {
+        "path": replay_path,
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "parser_version": parser_version,
+        "exception": failure.get("exception", ""),
+        "message": failure.get("message", ""),
+        "elapsed": failure.get("elapsed"),
+        "attempts": (previous.get("attempts", 0) if previous else 0) + 1,
+        "first_seen": previous.get("first_seen", now) if previous else now,
+        "last_seen": now,
+    }
+    failures[replay_path] = entry
+    return entry
+
+
+def clear_failure(registry: Dict[str, Any], replay_path: str) -> bool:
+    return registry.get("failures", {}).pop(replay_path, None) is not None
+
+
+def prune_failures(registry: Dict[str, Any]) -> int:
+    # Archive members are gone with their archive.
+    failures = registry.get("failures", {})
+    missing = [path for path in failures if not replay_exists(path)]
+    for path in missing:
+        failures.pop(path, None)
+    return len(missing)
+
+
+def list_failures(registry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return sorted(registry.get("failures", {}).values(), key=lambda entry: entry.get("path", ""))
+
+
+def failure_text(entry: Dict[str, Any]) -> str:
+    return f"{entry.get('path', '')}: {entry.get('message', '')}"
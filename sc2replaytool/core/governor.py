@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+
+BACKGROUND_WORKERS = 1
+BACKGROUND_NICE = 10
+BACKGROUND_BYTES_PER_SECOND = 4 * 1024 * 1024
+BACKGROUND_TICK_SECONDS = 2.0
+# Pause between two ticks of the same background scan.
+BACKGROUND_REST_SECONDS = 2.0
+
+
+class ScanGovernor:
+    # Limits for scans running next to a game (watch and startup scans): a
+    # worker cap, a nice level for the parse workers, a replay read rate and
+    # a time budget per tick. Replays left over when the budget runs out are
+    # reported as deferred and picked up by the next tick.
+    def __init__(
+        self,
+        *,
+        workers: int = BACKGROUND_WORKERS,
+        nice: int = BACKGROUND_NICE,
+        bytes_per_second: float = BACKGROUND_BYTES_PER_SECOND,
+        tick_seconds: float = BACKGROUND_TICK_SECONDS,
+        rest_seconds: float = BACKGROUND_REST_SECONDS,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.nice = max(0, int(nice))
+        self.bytes_per_second = float(bytes_per_second)
+        self.tick_seconds = float(tick_seconds)
+        self.rest_seconds = float(rest_seconds)
+        self._deadline: Optional[float] = None
+        self._next_read = 0.0
+
+    def start_tick(self) -> None:
+        now = time.monotonic()
+        self._deadline = now + self.tick_seconds if self.tick_seconds > 0 else None
+        self._next_read = now
+
+    def expired(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def cap_jobs(self, jobs: int) -> int:
+        return min(jobs, self.workers)
+
+    def reserve(self, nbytes: int) -> Optional[float]:
+        # Seconds to wait before reading nbytes more, or None when that wait
+        # would run past the tick budget (the replay is deferred instead).
+        now = time.monotonic()
+        if self.bytes_per_second <= 0:
+            return 0.0
+        start = max(now, self._next_read)
+        if self._deadline is not None and start > self._deadline:
+            return None
+        self._next_read = start + nbytes / self.bytes_per_second
+        return start - now
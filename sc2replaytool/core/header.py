@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import struct
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Reads the list-filtering metadata (map, players, races, results, start
+# time, length, game type, speed) straight from the MPQ archive with mpyq:
+# the replay header in the user data block, replay.details and the attribute
+# events. The result duck-types the sc2reader replay attributes that
+# _serialize_replay_metadata reads, so records come out in the same shape.
+
+# LotV replays count game loops at 22.4 per real second on Faster; older ones
+# at 16 per game second.
+LOTV_BASE_BUILD = 34784
+GAME_SPEEDS = {0: "Slower", 1: "Slow", 2: "Normal", 3: "Fast", 4: "Faster"}
+RESULTS = {1: "Win", 2: "Loss", 3: "Tie"}
+RACES = {"Terran": "Terran", "Protoss": "Protoss", "Zerg": "Zerg"}
+PICK_RACES = {"Terr": "Terran", "Prot": "Protoss", "Zerg": "Zerg"}
+ATTRIBUTE_TEAMS = 2001
+ATTRIBUTE_RACE = 3001
+ATTRIBUTE_GLOBAL_SCOPE = 16
+
+_WINDOWS_EPOCH_OFFSET = 116444736000000000
+
+
+def _read_vint(data: bytes, pos: int) -> Tuple[int, int]:
+    byte = data[pos]
+    pos += 1
+    negative = byte & 1
+    value = (byte >> 1) & 0x3F
+    shift = 6
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+    return (-value if negative else value), pos
+
+
+def _decode_versioned(data: bytes, pos: int = 0) -> Tuple[Any, int]:
+    # Generic decoder for Blizzard's "versioned" serialization: every value is
+    # prefixed with its type, so no per-build protocol tables are needed.
+    kind = data[pos]
+    pos += 1
+    if kind == 0x00:
+        count, pos = _read_vint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _decode_versioned(data, pos)
+            items.append(item)
+        return items, pos
+    if kind == 0x01:
+        bits, pos = _read_vint(data, pos)
+        size = (bits + 7) // 8
+        return data[pos : pos + size], pos + size
+    if kind == 0x02:
+        size, pos = _read_vint(data, pos)
+        return data[pos : pos + size], pos + size
+    if kind == 0x03:
+        tag, pos = _read_vint(data, pos)
+        value, pos = _decode_versioned(data, pos)
+        return {tag: value}, pos
+    if kind == 0x04:
+        present = data[pos]
+        pos += 1
+        if present:
+            return _decode_versioned(data, pos)
+        return None, pos
+    if kind == 0x05:
+        count, pos = _read_vint(data, pos)
+        fields: Dict[int, Any] = {}
+        for _ in range(count):
+            tag, pos = _read_vint(data, pos)
+            fields[tag], pos = _decode_versioned(data, pos)
+        return fields, pos
+    if kind == 0x06:
+        return data[pos], pos + 1
+    if kind == 0x07:
+        return struct.unpack_from(">I", data, pos)[0], pos + 4
+    if kind == 0x08:
+        return struct.unpack_from(">Q", data, pos)[0], pos + 8
+    if kind == 0x09:
+        return _read_vint(data, pos)
+    raise ValueError(f"Unknown versioned type {kind:#x} at offset {pos - 1}")
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value) if value is not None else ""
+
+
+def _read_attributes(data: Optional[bytes], base_build: int) -> Dict[int, Dict[int, str]]:
+    # replay.attributes.events: a short header, then fixed 13-byte records of
+    # (namespace, attribute id, scope, value) with the value stored reversed.
+    attributes: Dict[int, Dict[int, str]] = {}
+    if not data:
+        return attributes
+    pos = 5 if base_build >= 17326 else 4
+    (count,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    for _ in range(count):
+        _namespace, attribute_id, scope = struct.unpack_from("<IIB", data, pos)
+        value = data[pos + 9 : pos + 13][::-1].strip(b"\x00")
+        pos += 13
+        attributes.setdefault(scope, {})[attribute_id] = value.decode("utf-8", errors="replace")
+    return attributes
+
+
+def _format_length(seconds: int) -> str:
+    # Matches str() of sc2reader's Length.
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours:02}.{minutes:02}.{secs:02}"
+    return f"{minutes:02}.{secs:02}"
+
+
+def _player_name(raw: Any) -> str:
+    # Clan tags are stored as "&lt;TAG&gt;<sp/>Name".
+    return _text(raw).split("<sp/>")[-1]
+
+
+def _players(details: Dict[int, Any], attributes: Dict[int, Dict[int, str]]) -> List[SimpleNamespace]:
+    players = []
+    for index, entry in enumerate(details.get(0) or []):
+        if entry.get(7):
+            continue
+        race = RACES.get(_text(entry.get(2)))
+        if race is None:
+            # Localized clients store translated race names; fall back to the
+            # race picked in the lobby slot.
+            slot = entry.get(9)
+            picked = attributes.get(slot + 1, {}).get(ATTRIBUTE_RACE, "") if slot is not None else ""
+            race = PICK_RACES.get(picked, _text(entry.get(2)))
+        players.append(
+            SimpleNamespace(
+                pid=index + 1,
+                name=_player_name(entry.get(0)),
+                play_race=race,
+                result=RESULTS.get(entry.get(8), "Unknown"),
+                team_id=(entry.get(5) or 0) + 1,
+            )
+        )
+    return players
+
+
+def load_replay_header(source: Any) -> SimpleNamespace:
+    # source is a replay path or an open binary file.
+    import mpyq
+
+    archive = mpyq.MPQArchive(source if hasattr(source, "read") else str(source), listfile=False)
+    user_data = archive.header.get("user_data_header") or {}
+    details_data = archive.read_file("replay.details")
+    if not details_data:
+        raise ValueError(f"{Path(str(getattr(source, 'name', source))).name} has no replay.details")
+    return read_replay_header(
+        user_data.get("content") or b"", details_data, archive.read_file("replay.attributes.events")
+    )
+
+
+def read_replay_header(user_data: bytes, details_data: bytes, attributes_data: Optional[bytes]) -> SimpleNamespace:
+    # The header from the raw user data header, replay.details and
+    # replay.attributes.events contents.
+    header, _pos = _decode_versioned(user_data)
+    versions = header.get(1) or {}
+    base_build = versions.get(5) or versions.get(4) or 0
+    game_loops = header.get(3) or 0
+    details, _pos = _decode_versioned(details_data)
+    attributes = _read_attributes(attributes_data, base_build)
+
+    loops_per_second = 22.4 if base_build >= LOTV_BASE_BUILD else 16.0
+    seconds = int(game_loops / loops_per_second)
+    end_time = None
+    file_time = details.get(5)
+    if file_time:
+        # Whole seconds, as sc2reader truncates the file time too.
+        unix_time = (file_time - _WINDOWS_EPOCH_OFFSET) // 10**7
+        end_time = datetime.fromtimestamp(unix_time, timezone.utc).replace(tzinfo=None)
+    return SimpleNamespace(
+        map_name=_text(details.get(1)) or "Unknown",
+        start_time=end_time - timedelta(seconds=seconds) if end_time else None,
+        length=_format_length(seconds),
+        game_type=attributes.get(ATTRIBUTE_GLOBAL_SCOPE, {}).get(ATTRIBUTE_TEAMS, ""),
+        speed=GAME_SPEEDS.get(details.get(12), ""),
+        players=_players(details, attributes),
+        build=versions.get(4),
+        base_build=base_build,
+        frames=game_loops,
+    )
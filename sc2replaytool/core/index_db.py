@@ -0,0 +1,764 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .index_snapshot import SnapshotReplays, open_snapshot, split_path, write_snapshot
+from .storage import load_json
+from .paths import get_data_dir
+
+
+INDEX_DB_FILENAME = "replay_index.sqlite"
+# JSON stores imported once into a new database.
+LEGACY_INDEX_FILENAME = "replay_index.json"
+LEGACY_TAGS_FILENAME = "replay_tags.json"
+# Replays are partitioned into one shard per source folder, listed in the
+# shards table. Startup maps a columnar copy of each shard instead of
+# reading its rows; the file is named after the generation it was written
+# for.
+SNAPSHOT_PREFIX = "replay_index-"
+SNAPSHOT_SUFFIX = ".snapshot"
+SCHEMA_VERSION = 5
+SHARD_LOAD_WORKERS = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS strings (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS shards (
+    folder TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS replays (
+    id INTEGER PRIMARY KEY,
+    folder_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    shape_id INTEGER NOT NULL,
+    source_folder_id INTEGER,
+    map_id INTEGER,
+    matchup_id INTEGER,
+    game_type_id INTEGER,
+    speed_id INTEGER,
+    analysis_status_id INTEGER,
+    build_order_auto_id INTEGER,
+    filename,
+    start_time,
+    length,
+    mtime,
+    size,
+    content_hash,
+    proxy_distance_max,
+    proxy_threshold,
+    data TEXT,
+    UNIQUE (folder_id, name)
+);
+CREATE TABLE IF NOT EXISTS players (
+    replay_id INTEGER NOT NULL REFERENCES replays(id) ON DELETE CASCADE,
+    slot INTEGER NOT NULL,
+    name_id INTEGER,
+    race_id INTEGER,
+    result_id INTEGER,
+    team_id,
+    pid,
+    PRIMARY KEY (replay_id, slot)
+);
+CREATE TABLE IF NOT EXISTS bo_sequences (
+    replay_id INTEGER NOT NULL REFERENCES replays(id) ON DELETE CASCADE,
+    slot INTEGER NOT NULL,
+    pid,
+    race_id INTEGER,
+    name_id INTEGER,
+    seq_tech TEXT,
+    seq_general TEXT,
+    PRIMARY KEY (replay_id, slot)
+);
+CREATE TABLE IF NOT EXISTS favorites (path TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS tags (path TEXT NOT NULL, tag TEXT NOT NULL, PRIMARY KEY (path, tag));
+CREATE TABLE IF NOT EXISTS build_orders (path TEXT PRIMARY KEY, build_order TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS replays_matchup ON replays(matchup_id);
+CREATE INDEX IF NOT EXISTS replays_map ON replays(map_id);
+CREATE INDEX IF NOT EXISTS replays_start_time ON replays(start_time);
+CREATE INDEX IF NOT EXISTS replays_source_folder ON replays(source_folder_id);
+CREATE INDEX IF NOT EXISTS players_name ON players(name_id);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags(tag);
+"""
+
+# Repeated strings (folders, maps, matchups, player names, unit names and
+# each record's key order) are stored once in the strings table and
+# referenced by id; a path is split into its folder's id and its name.
+# Untyped columns keep the record's own value types. Values a column cannot
+# hold exactly stay in the record's JSON data, and so do players or build
+# order sequences that do not have the usual shape.
+_REF_COLUMNS = (
+    "source_folder",
+    "map",
+    "matchup",
+    "game_type",
+    "speed",
+    "analysis_status",
+    "build_order_auto",
+)
+_VALUE_COLUMNS = (
+    "filename",
+    "start_time",
+    "length",
+    "mtime",
+    "size",
+    "content_hash",
+    "proxy_distance_max",
+    "proxy_threshold",
+)
+_RECORD_COLUMNS = frozenset(("path", "players", "bo_sequences", *_REF_COLUMNS, *_VALUE_COLUMNS))
+_PLAYER_KEYS = ("name", "race", "result", "team_id", "pid")
+_PLAYER_REFS = ("name", "race", "result")
+_SEQUENCE_KEYS = ("pid", "race", "name", "seq_tech", "seq_general")
+_SEQUENCE_REFS = ("race", "name")
+_SEQUENCE_LISTS = ("seq_tech", "seq_general")
+_SELECT_REPLAYS = (
+    "SELECT id, folder_id, name, shape_id, "
+    + ", ".join([f"{column}_id" for column in _REF_COLUMNS] + list(_VALUE_COLUMNS))
+    + ", data FROM replays"
+)
+
+# The record objects last read from or written to the database, by path.
+# Scans replace records instead of editing them in place, so a record that
+# is still the same object (or equal to it) needs no write. Records read
+# lazily from a snapshot are looked up in its decoded map.
+_synced: Dict[str, Dict[str, Any]] = {}
+_synced_snapshot: Optional[SnapshotReplays] = None
+_synced_db = ""
+_lock = threading.Lock()
+
+
+def index_db_path() -> Path:
+    return get_data_dir() / INDEX_DB_FILENAME
+
+
+def snapshot_path(generation: int) -> Path:
+    return get_data_dir() / f"{SNAPSHOT_PREFIX}{generation}{SNAPSHOT_SUFFIX}"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    # One short-lived connection per call: the GUI and scan threads both
+    # write, and SQLite's own locking serializes them.
+    path = index_db_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30.0)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            _create(conn)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _create(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        # Another process may have created it while we waited for the lock.
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        for statement in _SCHEMA.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        _migrate_json(conn)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+
+def _migrate_json(conn: sqlite3.Connection) -> None:
+    # One-shot import of the JSON stores; the files are left in place.
+    data_dir = get_data_dir()
+    index = load_json(data_dir / LEGACY_INDEX_FILENAME, None)
+    if isinstance(index, dict):
+        _write_index(conn, index, {})
+    tags = load_json(data_dir / LEGACY_TAGS_FILENAME, None)
+    if isinstance(tags, dict):
+        _write_tags(conn, tags)
+
+
+class _StringIds:
+    # Ids of strings table rows, loaded on first use and added as needed.
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.ids: Optional[Dict[str, int]] = None
+
+    def get(self, text: Optional[str]) -> Optional[int]:
+        if text is None:
+            return None
+        if self.ids is None:
+            self.ids = {text: string_id for string_id, text in self.conn.execute("SELECT id, text FROM strings")}
+        found = self.ids.get(text)
+        if found is None:
+            found = self.conn.execute("INSERT INTO strings (text) VALUES (?)", (text,)).lastrowid
+            self.ids[text] = found
+        return found
+
+
+def _read_strings(conn: sqlite3.Connection) -> Dict[int, str]:
+    # Interned, so every record shares one object per map, name or unit.
+    return {string_id: sys.intern(text) for string_id, text in conn.execute("SELECT id, text FROM strings")}
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or type(value) in (str, int, float)
+
+
+def _entry_rows(
+    entries: Any, keys: Tuple[str, ...], refs: Tuple[str, ...], lists: Tuple[str, ...], strings: _StringIds
+) -> Optional[List[Tuple[Any, ...]]]:
+    # Column values for each entry, or None when any entry has another shape.
+    if type(entries) is not list:
+        return None
+    rows = []
+    for entry in entries:
+        if type(entry) is not dict or tuple(entry) != keys:
+            return None
+        row = []
+        for key, value in entry.items():
+            if key in lists:
+                if type(value) is not list or not all(type(item) is str for item in value):
+                    return None
+                row.append(_dumps([strings.get(item) for item in value]))
+            elif key in refs:
+                if value is not None and type(value) is not str:
+                    return None
+                row.append(strings.get(value))
+            elif _is_scalar(value):
+                row.append(value)
+            else:
+                return None
+        rows.append(tuple(row))
+    return rows
+
+
+def _entry(
+    row: Tuple[Any, ...], keys: Tuple[str, ...], refs: Tuple[str, ...], lists: Tuple[str, ...], texts: Dict[int, str]
+) -> Dict[str, Any]:
+    entry = {}
+    for key, value in zip(keys, row):
+        if key in lists:
+            entry[key] = [texts[item] for item in json.loads(value)]
+        elif key in refs:
+            entry[key] = None if value is None else texts[value]
+        else:
+            entry[key] = value
+    return entry
+
+
+def _column_name(key: str, refs: Tuple[str, ...]) -> str:
+    return f"{key}_id" if key in refs else key
+
+
+def _upsert_replay(conn: sqlite3.Connection, strings: _StringIds, record: Dict[str, Any], position: int) -> None:
+    data: Dict[str, Any] = {}
+    folder, name = split_path(record["path"])
+    refs = []
+    for column in _REF_COLUMNS:
+        value = record.get(column)
+        if column == "source_folder":
+            # Always set: it is the shard the row belongs to.
+            refs.append(strings.get(shard_folder(record)))
+            if type(value) is not str and column in record:
+                data[column] = value
+        elif value is None or type(value) is str:
+            refs.append(strings.get(value))
+        else:
+            refs.append(None)
+            data[column] = value
+    values = []
+    for column in _VALUE_COLUMNS:
+        value = record.get(column)
+        if _is_scalar(value):
+            values.append(value)
+        else:
+            values.append(None)
+            data[column] = value
+    players = _entry_rows(record.get("players", []), _PLAYER_KEYS, _PLAYER_REFS, (), strings)
+    if players is None:
+        data["players"] = record["players"]
+    sequences = _entry_rows(record.get("bo_sequences", []), _SEQUENCE_KEYS, _SEQUENCE_REFS, _SEQUENCE_LISTS, strings)
+    if sequences is None:
+        data["bo_sequences"] = record["bo_sequences"]
+    for key, value in record.items():
+        if key not in _RECORD_COLUMNS:
+            data[key] = value
+
+    columns = ["folder_id", "name", "position", "shape_id"]
+    columns += [f"{column}_id" for column in _REF_COLUMNS] + list(_VALUE_COLUMNS) + ["data"]
+    shape_id = strings.get(_dumps(list(record)))
+    folder_id = strings.get(folder)
+    conn.execute(
+        f"""
+        INSERT INTO replays ({", ".join(columns)})
+        VALUES ({", ".join("?" for _ in columns)})
+        ON CONFLICT(folder_id, name) DO UPDATE SET
+            {", ".join(f"{column} = excluded.{column}" for column in columns[2:])}
+        """,
+        (folder_id, name, position, shape_id, *refs, *values, _dumps(data) if data else None),
+    )
+    # No RETURNING: it needs SQLite 3.35, newer than some supported systems
+    # ship, and lastrowid is not set when the upsert updates.
+    (replay_id,) = conn.execute("SELECT id FROM replays WHERE folder_id = ? AND name = ?", (folder_id, name)).fetchone()
+    conn.execute("DELETE FROM players WHERE replay_id = ?", (replay_id,))
+    conn.execute("DELETE FROM bo_sequences WHERE replay_id = ?", (replay_id,))
+    conn.executemany(
+        f"INSERT INTO players VALUES (?, ?, {', '.join('?' for _ in _PLAYER_KEYS)})",
+        [(replay_id, slot, *row) for slot, row in enumerate(players or [])],
+    )
+    conn.executemany(
+        f"INSERT INTO bo_sequences VALUES (?, ?, {', '.join('?' for _ in _SEQUENCE_KEYS)})",
+        [(replay_id, slot, *row) for slot, row in enumerate(sequences or [])],
+    )
+
+
+def shard_folder(record: Dict[str, Any]) -> str:
+    # The shard a record is stored in: its source folder, "" when unknown.
+    folder = record.get("source_folder")
+    return folder if type(folder) is str else ""
+
+
+def _write_index(
+    conn: sqlite3.Connection,
+    index: Dict[str, Any],
+    synced: Dict[str, Dict[str, Any]],
+    folders: Optional[Iterable[str]] = None,
+) -> Tuple[int, List[Tuple[str, int, List[int]]]]:
+    # Rewrites the shards with records that changed, were added or were
+    # removed, and drops the shards of folders (all when None) that the
+    # index no longer holds. Returns the number of records written and
+    # (folder, generation, slots) for each rewritten shard. Reordering
+    # alone does not make a shard dirty.
+    replays = index.get("replays", [])
+    lazy = isinstance(replays, SnapshotReplays)
+    shards: Dict[str, List[int]] = {}
+    dirty = set()
+    for slot in range(len(replays)):
+        # Snapshot rows nobody has read are unchanged since they were synced.
+        record = replays.peek(slot) if lazy else replays[slot]
+        folder = replays.part_meta(slot).get("folder", "") if record is None else shard_folder(record)
+        shards.setdefault(folder, []).append(slot)
+        if record is not None and folder not in dirty:
+            previous = synced.get(record.get("path"))
+            if previous is None or not (previous is record or previous == record):
+                dirty.add(folder)
+    counts = dict(conn.execute("SELECT folder, count FROM shards"))
+    dirty.update(folder for folder, slots in shards.items() if counts.get(folder) != len(slots))
+
+    strings = _StringIds(conn)
+    written = 0
+    rewritten = []
+    kept: Set[str] = set()
+    added = False
+    for folder in [folder for folder in shards if folder in dirty]:
+        stored = {
+            prefix + name: (replay_id, position)
+            for replay_id, prefix, name, position in conn.execute(
+                "SELECT replays.id, strings.text, name, position FROM replays JOIN strings ON strings.id = folder_id"
+                " WHERE source_folder_id = ?",
+                (strings.get(folder),),
+            )
+        }
+        slots = []
+        for slot in shards[folder]:
+            record = replays.peek(slot) if lazy else replays[slot]
+            path = record.get("path") if record is not None else replays.path(slot)
+            if not path or path in kept:
+                continue
+            kept.add(path)
+            position = len(slots)
+            slots.append(slot)
+            if record is None and path not in stored:
+                record = replays[slot]
+            if record is not None:
+                previous = synced.get(path)
+                if path not in stored or previous is None or not (previous is record or previous == record):
+                    added = added or path not in stored
+                    _upsert_replay(conn, strings, record, position)
+                    written += 1
+                    continue
+            replay_id, stored_position = stored[path]
+            if stored_position != position:
+                conn.execute("UPDATE replays SET position = ? WHERE id = ?", (position, replay_id))
+        gone = [(replay_id,) for path, (replay_id, _position) in stored.items() if path not in kept]
+        conn.executemany("DELETE FROM replays WHERE id = ?", gone)
+        generation = _next_generation(conn)
+        conn.execute(
+            """
+            INSERT INTO shards (folder, position, generation, count)
+            VALUES (?, (SELECT COALESCE(MAX(position) + 1, 0) FROM shards), ?, ?)
+            ON CONFLICT(folder) DO UPDATE SET generation = excluded.generation, count = excluded.count
+            """,
+            (folder, generation, len(slots)),
+        )
+        rewritten.append((folder, generation, slots))
+
+    dropped = set(counts) if folders is None else set(folders) & set(counts)
+    for folder in dropped - set(shards):
+        conn.execute("DELETE FROM replays WHERE source_folder_id = ?", (strings.get(folder),))
+        conn.execute("DELETE FROM shards WHERE folder = ?", (folder,))
+    if added:
+        # A path filed under another folder moves its row out of that
+        # folder's shard; a new generation makes its snapshot stale.
+        actual = dict(
+            conn.execute(
+                "SELECT strings.text, COUNT(*) FROM replays JOIN strings ON strings.id = source_folder_id"
+                " GROUP BY source_folder_id"
+            )
+        )
+        for folder, count in conn.execute("SELECT folder, count FROM shards").fetchall():
+            if actual.get(folder, 0) != count:
+                conn.execute(
+                    "UPDATE shards SET generation = ?, count = ? WHERE folder = ?",
+                    (_next_generation(conn), actual.get(folder, 0), folder),
+                )
+
+    meta = {key: _dumps(value) for key, value in index.items() if key != "replays"}
+    stored_meta = dict(conn.execute("SELECT key, value FROM meta"))
+    conn.executemany("DELETE FROM meta WHERE key = ?", [(key,) for key in stored_meta if key not in meta])
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+        [(key, value) for key, value in meta.items() if stored_meta.get(key) != value],
+    )
+    return written, rewritten
+
+
+def _remember(replays: Any) -> None:
+    global _synced, _synced_db, _synced_snapshot
+    lazy = isinstance(replays, SnapshotReplays)
+    records = (replays.peek(slot) for slot in range(len(replays))) if lazy else iter(replays)
+    with _lock:
+        _synced = {record["path"]: record for record in records if record is not None and record.get("path")}
+        _synced_snapshot = replays if lazy else None
+        _synced_db = str(index_db_path())
+
+
+def _synced_records() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        if _synced_db != str(index_db_path()):
+            return {}
+        if _synced_snapshot is None:
+            return dict(_synced)
+        return {**_synced_snapshot.decoded, **_synced}
+
+
+def _generation(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM state WHERE key = 'generation'").fetchone()
+    return row[0] if row else 0
+
+
+def _next_generation(conn: sqlite3.Connection) -> int:
+    generation = _generation(conn) + 1
+    conn.execute("INSERT OR REPLACE INTO state VALUES ('generation', ?)", (generation,))
+    return generation
+
+
+def _save_snapshot(folder: str, generation: int, records: List[Dict[str, Any]]) -> bool:
+    # Best effort: a missing or stale snapshot only means the next start
+    # reads the shard's rows instead.
+    path = snapshot_path(generation)
+    try:
+        write_snapshot(path, {"folder": folder}, records, generation)
+    except (OSError, TypeError, ValueError) as exc:
+        logging.debug("Could not write index snapshot %s: %s", path, exc)
+        return False
+    return True
+
+
+def _close_snapshots(replays: Any, live: Set[int]) -> None:
+    # Unmaps the snapshots of superseded generations that this list or the
+    # last synced one were read from, so that they can be deleted.
+    with _lock:
+        lists = [replays, _synced_snapshot]
+    for item in lists:
+        if isinstance(item, SnapshotReplays):
+            for part in item.parts():
+                if part.generation not in live:
+                    part.close()
+
+
+def _drop_snapshots(live: Set[int]) -> None:
+    # Snapshots of superseded generations, once they are no longer mapped
+    # (Windows refuses to delete them while they are).
+    for path in get_data_dir().glob(f"{SNAPSHOT_PREFIX}*{SNAPSHOT_SUFFIX}"):
+        generation = path.name[len(SNAPSHOT_PREFIX) : -len(SNAPSHOT_SUFFIX)]
+        if generation.isdigit() and int(generation) in live:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _read_meta(conn: sqlite3.Connection) -> Dict[str, Any]:
+    return {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+
+
+def _read_records(conn: sqlite3.Connection, folder: Optional[str] = None) -> List[Dict[str, Any]]:
+    # One shard's records, or every record when folder is None.
+    where, params = "", ()
+    if folder is not None:
+        where, params = "WHERE source_folder_id = (SELECT id FROM strings WHERE text = ?)", (folder,)
+    texts = _read_strings(conn)
+    entries: Dict[str, Dict[int, List[Dict[str, Any]]]] = {"players": {}, "bo_sequences": {}}
+    for key, keys, refs, lists in (
+        ("players", _PLAYER_KEYS, _PLAYER_REFS, ()),
+        ("bo_sequences", _SEQUENCE_KEYS, _SEQUENCE_REFS, _SEQUENCE_LISTS),
+    ):
+        columns = ", ".join(_column_name(column, refs) for column in keys)
+        for replay_id, *row in conn.execute(
+            f"SELECT replay_id, {columns} FROM {key} WHERE replay_id IN (SELECT id FROM replays {where})"
+            " ORDER BY replay_id, slot",
+            params,
+        ):
+            entries[key].setdefault(replay_id, []).append(_entry(row, keys, refs, lists, texts))
+    shapes: Dict[int, List[str]] = {}
+    replays = []
+    for replay_id, folder_id, name, shape_id, *columns, data in conn.execute(
+        f"{_SELECT_REPLAYS} {where} ORDER BY position", params
+    ):
+        keys = shapes.get(shape_id)
+        if keys is None:
+            keys = shapes[shape_id] = [sys.intern(key) for key in json.loads(texts[shape_id])]
+        rest = json.loads(data) if data else {}
+        values = dict(zip(_REF_COLUMNS, (None if value is None else texts[value] for value in columns)))
+        values.update(zip(_VALUE_COLUMNS, columns[len(_REF_COLUMNS) :]))
+        record = {}
+        for key in keys:
+            if key in rest:
+                record[key] = rest[key]
+            elif key == "path":
+                record[key] = texts[folder_id] + name
+            elif key in entries:
+                record[key] = entries[key].get(replay_id, [])
+            else:
+                record[key] = values[key]
+        replays.append(record)
+    return replays
+
+
+def _load_shard(shard: Tuple[str, int]) -> Any:
+    # The shard's mapped snapshot; rebuilt from its rows when missing or
+    # stale, and the rows themselves if even that fails.
+    folder, generation = shard
+    part = open_snapshot(snapshot_path(generation), generation)
+    if part is not None and part.meta.get("folder") == folder:
+        return part
+    if part is not None:
+        part.close()
+    with _connect() as conn:
+        conn.execute("BEGIN")
+        row = conn.execute("SELECT generation FROM shards WHERE folder = ?", (folder,)).fetchone()
+        records = _read_records(conn, folder)
+    if row is not None and _save_snapshot(folder, row[0], records):
+        part = open_snapshot(snapshot_path(row[0]), row[0])
+        if part is not None:
+            return part
+    return records
+
+
+def read_index() -> Dict[str, Any]:
+    # Shards are mapped from their snapshots (records then decode on first
+    # access), several at a time.
+    with _connect() as conn:
+        index = _read_meta(conn)
+        shards = conn.execute("SELECT folder, generation FROM shards ORDER BY position").fetchall()
+    workers = min(SHARD_LOAD_WORKERS, len(shards))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_load_shard, shards))
+    else:
+        parts = [_load_shard(shard) for shard in shards]
+    index["replays"] = SnapshotReplays(parts)
+    _remember(index["replays"])
+    return index
+
+
+def write_index(index: Dict[str, Any], folders: Optional[Iterable[Any]] = None) -> int:
+    # Writes the shards whose records differ from what was last read or
+    # written. With folders, shards of other folders that the index does not
+    # hold are left alone. Returns the number of records written.
+    synced = _synced_records()
+    with _connect() as conn:
+        written, rewritten = _write_index(conn, index, synced, None if folders is None else map(str, folders))
+        live = {generation for (generation,) in conn.execute("SELECT generation FROM shards")}
+    replays = index.get("replays", [])
+    for folder, generation, slots in rewritten:
+        if generation in live:
+            _save_snapshot(folder, generation, [replays[slot] for slot in slots])
+    if rewritten:
+        _close_snapshots(replays, live)
+        _drop_snapshots(live)
+    _remember(replays)
+    return written
+
+
+def query_replay_paths(
+    *,
+    matchup: Optional[str] = None,
+    map_text: str = "",
+    player_text: str = "",
+) -> Set[str]:
+    # Paths of the stored records matching the filters: matchup exactly, map
+    # and player names by lowercase substring. Names are matched once in the
+    # strings table, then the matchup, map and player name indexes pick the
+    # records.
+    clauses: List[str] = []
+    params: List[Any] = []
+    if matchup is not None:
+        clauses.append("matchup_id = (SELECT id FROM strings WHERE text = ?)")
+        params.append(matchup)
+    if map_text:
+        clauses.append("map_id IN (SELECT id FROM strings WHERE instr(lower_text(text), ?))")
+        params.append(map_text)
+    if player_text:
+        clauses.append(
+            "id IN (SELECT replay_id FROM players WHERE name_id IN"
+            " (SELECT id FROM strings WHERE instr(lower_text(text), ?)))"
+        )
+        params.append(player_text)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _connect() as conn:
+        # SQLite's lower() only folds ASCII.
+        conn.create_function("lower_text", 1, str.lower, deterministic=True)
+        return {
+            folder + name
+            for folder, name in conn.execute(
+                f"SELECT (SELECT text FROM strings WHERE id = folder_id), name FROM replays {where}", params
+            )
+        }
+
+
+def _record_matches(record: Dict[str, Any], matchup: Optional[str], map_text: str, player_text: str) -> bool:
+    if matchup is not None and record.get("matchup") != matchup:
+        return False
+    if map_text and map_text not in str(record.get("map", "")).lower():
+        return False
+    if player_text:
+        return any(player_text in str(p.get("name", "")).lower() for p in record.get("players", []))
+    return True
+
+
+def filter_replays(
+    replays: Any,
+    *,
+    matchup: Optional[str] = None,
+    map_text: str = "",
+    player_text: str = "",
+) -> Iterator[Dict[str, Any]]:
+    # The records of an index's replays list that match the filters, in list
+    # order, decoded as they are consumed. Records still as last read or
+    # written are looked up through query_replay_paths, so only the matches
+    # of a mapped snapshot are decoded; records journaled or replaced since
+    # are matched one by one.
+    map_text, player_text = map_text.lower(), player_text.lower()
+    if matchup is None and not map_text and not player_text:
+        yield from replays
+        return
+    matches = query_replay_paths(matchup=matchup, map_text=map_text, player_text=player_text)
+    synced = _synced_records()
+    lazy = isinstance(replays, SnapshotReplays)
+    with _lock:
+        # Copies of the synced list share its rows and decoded map.
+        stored_rows = (
+            lazy
+            and _synced_snapshot is not None
+            and replays.decoded is _synced_snapshot.decoded
+            and _synced_db == str(index_db_path())
+        )
+    for slot in range(len(replays)):
+        record = replays.peek(slot) if lazy else replays[slot]
+        if record is None and stored_rows:
+            if replays.path(slot) in matches:
+                yield replays[slot]
+            continue
+        if record is None:
+            record = replays[slot]
+        path = record.get("path")
+        if path and record is synced.get(path):
+            if path in matches:
+                yield record
+        elif _record_matches(record, matchup, map_text, player_text):
+            yield record
+
+
+def _write_tags(conn: sqlite3.Connection, tags: Dict[str, Any]) -> None:
+    # Applies the difference to the stored rows only.
+    favorites = set(tags.get("favorites", []))
+    stored_favorites = {path for (path,) in conn.execute("SELECT path FROM favorites")}
+    conn.executemany("DELETE FROM favorites WHERE path = ?", [(p,) for p in stored_favorites - favorites])
+    conn.executemany("INSERT INTO favorites VALUES (?)", [(p,) for p in favorites - stored_favorites])
+
+    pairs = {(path, tag) for path, tag_list in tags.get("tags", {}).items() for tag in tag_list}
+    stored_pairs = set(conn.execute("SELECT path, tag FROM tags"))
+    conn.executemany("DELETE FROM tags WHERE path = ? AND tag = ?", stored_pairs - pairs)
+    conn.executemany("INSERT INTO tags VALUES (?, ?)", pairs - stored_pairs)
+
+    build_orders = dict(tags.get("build_orders", {}))
+    stored_orders = dict(conn.execute("SELECT path, build_order FROM build_orders"))
+    conn.executemany("DELETE FROM build_orders WHERE path = ?", [(p,) for p in stored_orders if p not in build_orders])
+    conn.executemany(
+        "INSERT OR REPLACE INTO build_orders VALUES (?, ?)",
+        [(p, value) for p, value in build_orders.items() if stored_orders.get(p) != value],
+    )
+
+
+def read_tags() -> Dict[str, Any]:
+    with _connect() as conn:
+        tags_map: Dict[str, List[str]] = {}
+        for path, tag in conn.execute("SELECT path, tag FROM tags ORDER BY path, tag"):
+            tags_map.setdefault(path, []).append(tag)
+        return {
+            "favorites": [path for (path,) in conn.execute("SELECT path FROM favorites ORDER BY path")],
+            "build_orders": dict(conn.execute("SELECT path, build_order FROM build_orders")),
+            "tags": tags_map,
+        }
+
+
+def write_tags(tags: Dict[str, Any]) -> None:
+    with _connect() as conn:
+        _write_tags(conn, tags)
+
+
+def write_tag_entries(entries: Iterable[Dict[str, Any]]) -> None:
+    # Replaces the favorite flag, tags and build order of each entry's
+    # replay; the last entry for a path wins.
+    latest = {entry["path"]: entry for entry in entries if entry.get("path")}
+    with _connect() as conn:
+        for path, entry in latest.items():
+            conn.execute("DELETE FROM favorites WHERE path = ?", (path,))
+            if entry.get("favorite"):
+                conn.execute("INSERT INTO favorites VALUES (?)", (path,))
+            conn.execute("DELETE FROM tags WHERE path = ?", (path,))
+            conn.executemany("INSERT OR IGNORE INTO tags VALUES (?, ?)", [(path, tag) for tag in entry.get("tags", [])])
+            if entry.get("build_order"):
+                conn.execute("INSERT OR REPLACE INTO build_orders VALUES (?, ?)", (path, entry["build_order"]))
+            else:
+                conn.execute("DELETE FROM build_orders WHERE path = ?", (path,))
+
+
+def clear_index_store() -> None:
+    with _connect() as conn:
+        for table in ("replays", "shards", "strings", "meta", "favorites", "tags", "build_orders"):
+            conn.execute(f"DELETE FROM {table}")
+    _close_snapshots([], set())
+    _drop_snapshots(set())
+    _remember([])
@@ -0,0 +1,540 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import MutableSequence
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from weakref import WeakSet
+
+
+# A columnar copy of the index that startup maps instead of reading every
+# row back out of SQLite. Strings are dictionary-encoded into one table,
+# numbers sit in fixed-width arrays and player and build order lists are
+# addressed through offsets arrays. Anything a column cannot reproduce
+# exactly (odd types, unparseable dates, extra keys) goes into a small
+# per-record JSON blob.
+SNAPSHOT_MAGIC = b"SC2SNAP\0"
+SNAPSHOT_VERSION = 3
+_HEADER = struct.Struct("<8sIQQ")
+
+_MISSING_STRING = 0xFFFFFFFF
+_MISSING_INT = -(2**63)
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+_STRING_COLUMNS = (
+    "filename",
+    "source_folder",
+    "map",
+    "matchup",
+    "game_type",
+    "speed",
+    "analysis_status",
+    "build_order_auto",
+    "content_hash",
+)
+_FLOAT_COLUMNS = ("mtime", "proxy_distance_max", "proxy_threshold")
+
+# Entry lists: (keys in order, string keys, int keys, string-list keys).
+_ENTRY_LISTS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]] = {
+    "players": (("name", "race", "result", "team_id", "pid"), ("name", "race", "result"), ("team_id", "pid"), ()),
+    "bo_sequences": (
+        ("pid", "race", "name", "seq_tech", "seq_general"),
+        ("race", "name"),
+        ("pid",),
+        ("seq_tech", "seq_general"),
+    ),
+}
+
+
+def split_path(path: str) -> Tuple[str, str]:
+    # (folder with its trailing separator, name); the two concatenate back.
+    cut = max(path.rfind("/"), path.rfind("\\")) + 1
+    return path[:cut], path[cut:]
+
+
+def _time_value(text: Any) -> Optional[int]:
+    if type(text) is not str:
+        return None
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        return None
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _time_text(value: int) -> str:
+    return (_EPOCH + value * _MICROSECOND).isoformat()
+
+
+def _length_value(text: Any) -> Optional[int]:
+    # Lengths are stored as sc2reader prints them: "MM.SS" or "HH.MM.SS".
+    if type(text) is not str:
+        return None
+    parts = text.split(".")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        return None
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def _length_text(value: int) -> str:
+    hours, rest = divmod(value, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours:02}.{minutes:02}.{secs:02}"
+    return f"{minutes:02}.{secs:02}"
+
+
+def _size_value(value: Any) -> Optional[int]:
+    return value if type(value) is int else None
+
+
+_INT_COLUMNS: Dict[str, Tuple[Callable[[Any], Optional[int]], Callable[[int], Any]]] = {
+    "start_time": (_time_value, _time_text),
+    "length": (_length_value, _length_text),
+    "size": (_size_value, int),
+}
+_COLUMN_KEYS = frozenset(("path", *_STRING_COLUMNS, *_INT_COLUMNS, *_FLOAT_COLUMNS, *_ENTRY_LISTS))
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+
+    def add(self, text: Optional[str]) -> int:
+        if text is None:
+            return _MISSING_STRING
+        found = self.ids.get(text)
+        if found is None:
+            found = self.ids[text] = len(self.ids)
+        return found
+
+
+class _EntryColumns:
+    # One entry list (players, build order sequences) for all records: an
+    # offsets array into fixed-width string-id and int rows, plus offsets
+    # into one array of string ids for the lists inside each entry.
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.keys, self.string_keys, self.int_keys, self.list_keys = _ENTRY_LISTS[key]
+        self.offsets = array("I", [0])
+        self.strings = array("I")
+        self.ints = array("q")
+        self.list_offsets = array("Q", [0])
+        self.items = array("I")
+
+    def add(self, entries: Any, strings: _StringTable) -> bool:
+        # False (and nothing added) when an entry does not have the usual shape.
+        if type(entries) is not list:
+            return False
+        for entry in entries:
+            if type(entry) is not dict or tuple(entry) != self.keys:
+                return False
+            if not all(entry[key] is None or type(entry[key]) is str for key in self.string_keys):
+                return False
+            if not all(
+                entry[key] is None or (type(entry[key]) is int and entry[key] != _MISSING_INT) for key in self.int_keys
+            ):
+                return False
+            for key in self.list_keys:
+                if type(entry[key]) is not list or not all(type(item) is str for item in entry[key]):
+                    return False
+        for entry in entries:
+            self.strings.extend(strings.add(entry[key]) for key in self.string_keys)
+            self.ints.extend(_MISSING_INT if entry[key] is None else entry[key] for key in self.int_keys)
+            for key in self.list_keys:
+                self.items.extend(strings.add(item) for item in entry[key])
+                self.list_offsets.append(len(self.items))
+        return True
+
+    def close_record(self) -> None:
+        self.offsets.append(len(self.ints) // len(self.int_keys))
+
+    def sections(self) -> List[Tuple[str, str, bytes]]:
+        return [
+            (self.key, "I", self.offsets.tobytes()),
+            (f"{self.key}:strings", "I", self.strings.tobytes()),
+            (f"{self.key}:ints", "q", self.ints.tobytes()),
+            (f"{self.key}:lists", "Q", self.list_offsets.tobytes()),
+            (f"{self.key}:items", "I", self.items.tobytes()),
+        ]
+
+
+def write_snapshot(path: Path, meta: Dict[str, Any], replays: List[Dict[str, Any]], generation: int) -> None:
+    strings = _StringTable()
+    shapes = array("I")
+    folders = array("I")
+    names = array("I")
+    string_columns = {column: array("I") for column in _STRING_COLUMNS}
+    int_columns = {column: array("q") for column in _INT_COLUMNS}
+    float_columns = {column: array("d") for column in _FLOAT_COLUMNS}
+    entry_columns = [_EntryColumns(key) for key in _ENTRY_LISTS]
+    rest_offsets = array("Q", [0])
+    rest_blob = bytearray()
+
+    for record in replays:
+        rest: Dict[str, Any] = {}
+        shapes.append(strings.add(json.dumps(list(record), ensure_ascii=False)))
+        value = record.get("path")
+        if type(value) is str:
+            folder, name = split_path(value)
+            folders.append(strings.add(folder))
+            names.append(strings.add(name))
+        else:
+            folders.append(_MISSING_STRING)
+            names.append(_MISSING_STRING)
+            if "path" in record:
+                rest["path"] = value
+        for column, values in string_columns.items():
+            value = record.get(column)
+            if value is None or type(value) is str:
+                values.append(strings.add(value))
+            else:
+                values.append(_MISSING_STRING)
+                rest[column] = value
+        for column, values in int_columns.items():
+            encode, decode = _INT_COLUMNS[column]
+            value = record.get(column)
+            number = encode(value)
+            if number is not None and number != _MISSING_INT and decode(number) == value:
+                values.append(number)
+            else:
+                values.append(_MISSING_INT)
+                if column in record:
+                    rest[column] = value
+        for column, values in float_columns.items():
+            value = record.get(column)
+            if type(value) is float and not math.isnan(value):
+                values.append(value)
+            else:
+                values.append(math.nan)
+                if column in record:
+                    rest[column] = value
+        for entries in entry_columns:
+            if entries.key in record and not entries.add(record[entries.key], strings):
+                rest[entries.key] = record[entries.key]
+            entries.close_record()
+        for key, value in record.items():
+            if key not in rest and key not in _COLUMN_KEYS:
+                rest[key] = value
+        if rest:
+            rest_blob += json.dumps(rest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        rest_offsets.append(len(rest_blob))
+
+    string_offsets = array("Q", [0])
+    string_blob = bytearray()
+    for text in strings.ids:
+        string_blob += text.encode("utf-8")
+        string_offsets.append(len(string_blob))
+
+    sections: List[Tuple[str, str, bytes]] = [
+        ("strings", "Q", string_offsets.tobytes()),
+        ("string_blob", "B", bytes(string_blob)),
+        ("shape", "I", shapes.tobytes()),
+        ("path_folder", "I", folders.tobytes()),
+        ("path_name", "I", names.tobytes()),
+        *((f"str:{column}", "I", values.tobytes()) for column, values in string_columns.items()),
+        *((f"int:{column}", "q", values.tobytes()) for column, values in int_columns.items()),
+        *((f"float:{column}", "d", values.tobytes()) for column, values in float_columns.items()),
+        *(section for entries in entry_columns for section in entries.sections()),
+        ("rest", "Q", rest_offsets.tobytes()),
+        ("rest_blob", "B", bytes(rest_blob)),
+    ]
+    # Section offsets are relative to the 8-byte aligned start of the data.
+    layout: Dict[str, Any] = {"count": len(replays), "byteorder": sys.byteorder, "meta": meta, "sections": {}}
+    offset = 0
+    for name, typecode, data in sections:
+        layout["sections"][name] = [offset, len(data), typecode]
+        offset += len(data) + (-len(data) % 8)
+    layout_bytes = json.dumps(layout, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    layout_bytes += b" " * (-(_HEADER.size + len(layout_bytes)) % 8)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, generation, len(layout_bytes)))
+        f.write(layout_bytes)
+        for _name, _typecode, data in sections:
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    os.replace(tmp_path, path)
+
+
+def open_snapshot(path: Path, generation: int) -> Optional["SnapshotPart"]:
+    # None when the file is missing, from another generation or unreadable.
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    # The whole-file view and each section's slice; only the casts are kept.
+    views: List[memoryview] = []
+    sections: Dict[str, memoryview] = {}
+    try:
+        magic, version, stored_generation, layout_size = _HEADER.unpack_from(mapped)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or stored_generation != generation:
+            mapped.close()
+            return None
+        layout = json.loads(bytes(mapped[_HEADER.size : _HEADER.size + layout_size]))
+        if layout.get("byteorder") != sys.byteorder:
+            mapped.close()
+            return None
+        base = _HEADER.size + layout_size
+        views.append(memoryview(mapped))
+        for name, (offset, size, typecode) in layout["sections"].items():
+            if base + offset + size > len(mapped):
+                raise ValueError(f"section {name} runs past the end of the file")
+            views.append(views[0][base + offset : base + offset + size])
+            sections[name] = views[-1].cast(typecode)
+        part = SnapshotPart(layout["count"], layout.get("meta", {}), sections)
+    except (ValueError, TypeError, KeyError, struct.error) as exc:
+        logging.debug("Ignoring unreadable index snapshot %s: %s", path, exc)
+        _unmap(mapped, views + list(sections.values()))
+        return None
+    for view in views:
+        view.release()
+    part.generation = generation
+    part._mapped = mapped
+    return part
+
+
+def _unmap(mapped: mmap.mmap, views: List[memoryview]) -> None:
+    # An mmap cannot close while views of it are still held.
+    for view in views:
+        view.release()
+    try:
+        mapped.close()
+    except BufferError as exc:
+        logging.debug("Index snapshot is still in use: %s", exc)
+
+
+class SnapshotPart:
+    # The records of one mapped snapshot file, decoded row by row.
+    def __init__(self, count: int, meta: Dict[str, Any], sections: Dict[str, memoryview]) -> None:
+        self.count = count
+        self.meta = meta
+        self.generation: Optional[int] = None
+        self._sections = sections
+        self._mapped: Optional[mmap.mmap] = None
+        # Replays lists with slots over this part's rows.
+        self._owners: "WeakSet[SnapshotReplays]" = WeakSet()
+        self._strings: List[Optional[str]] = [None] * (len(sections["strings"]) - 1)
+        self._shapes: Dict[int, List[str]] = {}
+        self._readers: Dict[str, Callable[[int], Any]] = {"path": self.path}
+        for column in _STRING_COLUMNS:
+            self._readers[column] = lambda row, ids=sections[f"str:{column}"]: self._string(ids[row])
+        for column, (_encode, decode) in _INT_COLUMNS.items():
+            self._readers[column] = lambda row, values=sections[f"int:{column}"], decode=decode: decode(values[row])
+        for column in _FLOAT_COLUMNS:
+            self._readers[column] = sections[f"float:{column}"].__getitem__
+        for key in _ENTRY_LISTS:
+            self._readers[key] = lambda row, key=key: self._entries(key, row)
+
+    def close(self) -> None:
+        # Unmaps the file (Windows cannot replace or delete it while it is
+        # mapped). Lists still holding unread rows of it decode them first.
+        if self._mapped is None:
+            return
+        for owner in list(self._owners):
+            owner._detach(self)
+        self._owners.clear()
+        mapped, self._mapped = self._mapped, None
+        _unmap(mapped, list(self._sections.values()))
+        self._readers = {}
+
+    def _string(self, string_id: int) -> Optional[str]:
+        # Interned, so every record shares one object per map, name or unit.
+        if string_id == _MISSING_STRING:
+            return None
+        text = self._strings[string_id]
+        if text is None:
+            offsets = self._sections["strings"]
+            text = sys.intern(str(self._sections["string_blob"][offsets[string_id] : offsets[string_id + 1]], "utf-8"))
+            self._strings[string_id] = text
+        return text
+
+    def path(self, row: int) -> Optional[str]:
+        folder = self._string(self._sections["path_folder"][row])
+        return None if folder is None else folder + self._string(self._sections["path_name"][row])
+
+    def _keys(self, row: int) -> List[str]:
+        shape_id = self._sections["shape"][row]
+        keys = self._shapes.get(shape_id)
+        if keys is None:
+            keys = self._shapes[shape_id] = [sys.intern(key) for key in json.loads(self._string(shape_id))]
+        return keys
+
+    def _rest(self, row: int) -> Dict[str, Any]:
+        start, end = self._sections["rest"][row], self._sections["rest"][row + 1]
+        return json.loads(str(self._sections["rest_blob"][start:end], "utf-8")) if end > start else {}
+
+    def decode(self, row: int) -> Dict[str, Any]:
+        keys = self._keys(row)
+        rest = self._rest(row)
+        # Keys outside the columns are always in rest.
+        readers = self._readers
+        return {key: rest[key] if key in rest else readers[key](row) for key in keys}
+
+    def value(self, row: int, key: str, default: Any = None) -> Any:
+        # One field of a row; only a value kept in rest needs the row's JSON.
+        if key not in self._keys(row):
+            return default
+        if key in self._readers and self._sections["rest"][row] == self._sections["rest"][row + 1]:
+            return self._readers[key](row)
+        rest = self._rest(row)
+        return rest[key] if key in rest else self._readers[key](row)
+
+    def _entries(self, key: str, row: int) -> List[Dict[str, Any]]:
+        sections = self._sections
+        keys, string_keys, int_keys, list_keys = _ENTRY_LISTS[key]
+        strings, ints = sections[f"{key}:strings"], sections[f"{key}:ints"]
+        list_offsets, items = sections[f"{key}:lists"], sections[f"{key}:items"]
+        entries = []
+        for slot in range(sections[key][row], sections[key][row + 1]):
+            values: Dict[str, Any] = {}
+            for i, name in enumerate(string_keys):
+                values[name] = self._string(strings[slot * len(string_keys) + i])
+            for i, name in enumerate(int_keys):
+                value = ints[slot * len(int_keys) + i]
+                values[name] = None if value == _MISSING_INT else value
+            for i, name in enumerate(list_keys):
+                first = slot * len(list_keys) + i
+                values[name] = [self._string(item) for item in items[list_offsets[first] : list_offsets[first + 1]]]
+            entries.append({name: values[name] for name in keys})
+        return entries
+
+
+class SnapshotReplays(MutableSequence):
+    # The index's "replays" list over mapped snapshot parts, one after the
+    # other. A slot holds its row number across the parts until the record
+    # is first read, then the decoded dict; edits (assignment, insert,
+    # delete) only touch the slot list. Parts that could not be mapped are
+    # passed as lists of records.
+    def __init__(self, parts: List[Any]) -> None:
+        self._parts: List[SnapshotPart] = []
+        self._starts: List[int] = []
+        self._slots: List[Any] = []
+        # Records as first decoded, by path: what the database holds for them.
+        self.decoded: Dict[str, Dict[str, Any]] = {}
+        rows = 0
+        for part in parts:
+            if isinstance(part, SnapshotPart):
+                part._owners.add(self)
+                self._parts.append(part)
+                self._starts.append(rows)
+                self._slots.extend(range(rows, rows + part.count))
+                rows += part.count
+                continue
+            for record in part:
+                self._slots.append(record)
+                if record.get("path"):
+                    self.decoded.setdefault(record["path"], record)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._slots)))]
+        value = self._slots[index]
+        if type(value) is int:
+            part, row = self._locate(value)
+            value = part.decode(row)
+            if value.get("path"):
+                self.decoded.setdefault(value["path"], value)
+            self._slots[index] = value
+        return value
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._slots[index] = value
+
+    def __delitem__(self, index: Any) -> None:
+        del self._slots[index]
+
+    def insert(self, index: int, value: Any) -> None:
+        self._slots.insert(index, value)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self._slots)):
+            yield self[i]
+
+    def _locate(self, value: int) -> Tuple[SnapshotPart, int]:
+        at = bisect_right(self._starts, value) - 1
+        return self._parts[at], value - self._starts[at]
+
+    def peek(self, index: int) -> Optional[Dict[str, Any]]:
+        # The record in a slot if it was read or replaced, else None.
+        value = self._slots[index]
+        return None if type(value) is int else value
+
+    def part_meta(self, index: int) -> Dict[str, Any]:
+        # Metadata of the snapshot an unread slot comes from.
+        return self._locate(self._slots[index])[0].meta
+
+    def path(self, index: int) -> Optional[str]:
+        value = self._slots[index]
+        if type(value) is not int:
+            return value.get("path")
+        part, row = self._locate(value)
+        return part.path(row)
+
+    def value(self, index: int, key: str, default: Any = None) -> Any:
+        # A field of the record in a slot, read from its columns if the
+        # record was not decoded yet.
+        value = self._slots[index]
+        if type(value) is not int:
+            return value.get(key, default)
+        part, row = self._locate(value)
+        return part.value(row, key, default)
+
+    def copy(self, slots: Optional[Iterable[int]] = None) -> "SnapshotReplays":
+        # A list of the same records (those at slots, in that order) that
+        # can be edited separately; unread rows stay unread.
+        copy = SnapshotReplays([])
+        copy._parts, copy._starts, copy.decoded = self._parts, self._starts, self.decoded
+        copy._slots = list(self._slots) if slots is None else [self._slots[slot] for slot in slots]
+        for part in copy._parts:
+            part._owners.add(copy)
+        return copy
+
+    def parts(self) -> List[SnapshotPart]:
+        return list(self._parts)
+
+    def _detach(self, part: SnapshotPart) -> None:
+        # Decodes the slots still holding rows of part, which is closing.
+        start = self._starts[self._parts.index(part)]
+        for index, value in enumerate(self._slots):
+            if type(value) is int and start <= value < start + part.count:
+                self[index]
+
+
+def record_value(replays: Any, slot: int, key: str, default: Any = None) -> Any:
+    # record.get(key) for the record at slot of a replays list, without
+    # decoding an unread snapshot row.
+    if isinstance(replays, SnapshotReplays):
+        return replays.value(slot, key, default)
+    return replays[slot].get(key, default)
+
+
+def copy_replays(replays: Any, slots: Optional[Iterable[int]] = None) -> Any:
+    # A copy of a replays list, or of the records at slots; a snapshot list
+    # stays lazy.
+    if isinstance(replays, SnapshotReplays):
+        return replays.copy(slots)
+    return list(replays) if slots is None else [replays[slot] for slot in slots]
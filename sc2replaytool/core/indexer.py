@@ -3,16 +3,152 @@ from __future__ import annotations
 import os
 from pathlib import Path
 import sys
+import heapq
 import importlib
 import importlib.util
 import logging
-from typing import Dict, List, Any, Iterable, Optional, Tuple
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+from types import SimpleNamespace
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
 
-from .storage import load_json, save_json
 from .paths import get_data_dir
-
-
-INDEX_FILENAME = "replay_index.json"
+from .index_db import query_replay_paths, read_index, write_index
+from .index_snapshot import SnapshotReplays, copy_replays, record_value
+from .event_cache import discard_event_subset, load_event_subset, prune_event_cache, save_event_subset
+from .journal import append_journal, clear_journal, load_journal, replace_journal
+from .scan_job import ScanCancelled, ScanJob
+from .governor import ScanGovernor
+from .header import load_replay_header
+from .dedup import RecordsByHash, records_by_hash, try_content_hash, try_source_hash
+from .archives import (
+    is_archive,
+    list_replay_members,
+    member_path,
+    open_replay,
+    read_size,
+    replay_exists,
+    replay_name,
+    replay_stat,
+    split_member_path,
+)
+from .workers import get_parse_pool, prewarm_parse_pool
+from .listing_cache import DISCOVERY_WORKERS, load_listing_cache, save_listing_cache, iter_replay_files
+from .failures import (
+    load_failures,
+    save_failures,
+    get_failure,
+    record_failure,
+    clear_failure,
+    prune_failures,
+    failure_text,
+)
+
+
+# Phase one of a two-phase scan only decodes header/details data (sc2reader
+# builds the player list at level 2); the tracker based fields are filled in
+# later by analyze_partial_replays().
+HEADER_LOAD_LEVEL = 2
+FULL_LOAD_LEVEL = 3
+ANALYSIS_PARTIAL = "partial"
+ANALYSIS_COMPLETE = "complete"
+ANALYSIS_FAILED = "failed"
+
+# Parsed records are appended to the scan journal as they are ready and
+# folded into the index at checkpoints, so an interrupted scan resumes from
+# the journal instead of parsing those replays again. Appends are synced in
+# batches: a crash loses at most one batch.
+JOURNAL_CHECKPOINT_SECONDS = 60.0
+JOURNAL_BATCH_RECORDS = 32
+JOURNAL_BATCH_SECONDS = 2.0
+# Parse tasks queued per worker while discovery is still streaming in.
+PARSE_QUEUE_PER_WORKER = 4
+# Discovered replays held back to put the newest first in a newest-first scan.
+SCHEDULE_LOOKAHEAD = 256
+
+TOWNHALLS = [
+    "Command Center",
+    "Orbital Command",
+    "Planetary Fortress",
+    "Nexus",
+    "Hatchery",
+    "Lair",
+    "Hive",
+]
+
+PROXY_BUILDINGS = [
+    "Supply Depot",
+    "Barracks",
+    "Refinery",
+    "Factory",
+    "Starport",
+    "Engineering Bay",
+    "Bunker",
+    "Missile Turret",
+    "Armory",
+    "Fusion Core",
+    "Command Center",
+    "Orbital Command",
+    "Planetary Fortress",
+    "Pylon",
+    "Gateway",
+    "Assimilator",
+    "Cybernetics Core",
+    "Robotics Facility",
+    "Stargate",
+    "Twilight Council",
+    "Templar Archives",
+    "Dark Shrine",
+    "Forge",
+    "Photon Cannon",
+    "Nexus",
+    "Spawning Pool",
+    "Extractor",
+    "Roach Warren",
+    "Baneling Nest",
+    "Lair",
+    "Hydralisk Den",
+    "Spire",
+    "Hive",
+    "Infestation Pit",
+    "Evolution Chamber",
+    "Spine Crawler",
+    "Spore Crawler",
+    "Ultralisk Cavern",
+]
+
+TECH_BUILDINGS = [
+    "Barracks",
+    "Factory",
+    "Starport",
+    "Command Center",
+    "Orbital Command",
+    "Planetary Fortress",
+    "Gateway",
+    "Cybernetics Core",
+    "Robotics Facility",
+    "Stargate",
+    "Twilight Council",
+    "Templar Archives",
+    "Dark Shrine",
+    "Nexus",
+    "Spawning Pool",
+    "Roach Warren",
+    "Baneling Nest",
+    "Lair",
+    "Hydralisk Den",
+    "Spire",
+    "Hive",
+    "Infestation Pit",
+]
+
+WORKERS = {"SCV", "Probe", "Drone"}
+
+# Opening quotas: build-order sequences keep this many steps per player and
+# the proxy check looks at this many non-townhall buildings per player.
+SEQUENCE_STEPS = 8
+PROXY_BUILDING_COUNT = 4
 
 
 def _canonical_unit_name(name: str) -> str:
@@ -30,15 +166,41 @@ def _normalize_unit_name(name: str, mapping: Dict[str, str]) -> Optional[str]:
     return mapping.get(_canonical_unit_name(name))
 
 
-def index_path() -> Path:
-    return get_data_dir() / INDEX_FILENAME
+def _per_replay(calls: int, replays: int) -> float:
+    return round(calls / replays, 2) if replays else 0.0
+
 
+# Discovered replays travel as (path, source_folder, stat) so each file is
+# stat'ed once; paths are built from the resolved folder and need no resolve().
+ReplayFile = Tuple[Path, Path, os.stat_result]
 
-def _iter_replay_files(folder: Path) -> Iterable[Path]:
-    for root, _dirs, files in os.walk(folder):
-        for name in files:
-            if name.lower().endswith(".sc2replay"):
-                yield Path(root) / name
+
+def _discover_replay_files(
+    folders: List[Path],
+    counts: Dict[str, Any],
+    *,
+    workers: int = DISCOVERY_WORKERS,
+) -> Iterator[ReplayFile]:
+    # Streams replays as the discovery threads find them. Directory listings
+    # are cached by directory mtime, so a warm walk only stats directories
+    # and re-lists the ones that changed. counts is complete once the stream
+    # is exhausted.
+    cache = load_listing_cache()
+    found = 0
+    replay_iter = iter_replay_files(folders, cache, counts, workers=workers)
+    try:
+        while True:
+            replay_file = next(replay_iter)
+            found += 1
+            yield replay_file
+    except StopIteration as stop:
+        changed = stop.value
+    counts["fs_calls_per_replay"] = _per_replay(counts.get("fs_calls", 0), found)
+    if changed:
+        try:
+            save_listing_cache(cache)
+        except OSError as exc:
+            logging.debug("Could not save directory listing cache: %s", exc)
 
 
 def _safe_race(player: Any) -> str:
@@ -99,230 +261,333 @@ def _distance(a: Tuple[float, float], b: Tuple[float, float]) -> float:
     return (dx * dx + dy * dy) ** 0.5
 
 
-def _proxy_info(replay: Any, threshold: float = 35.0) -> Dict[str, Any]:
-    events = getattr(replay, "tracker_events", None)
-    if not events:
-        logging.debug("No tracker events for replay")
-        return {"proxy_flag": False, "proxy_distance_max": None, "proxy_distances": {}}
-
-    players = {}
+def _player_map(replay: Any) -> Dict[int, Any]:
+    players: Dict[int, Any] = {}
     for p in getattr(replay, "players", []):
         pid = getattr(p, "pid", None) or getattr(p, "player_id", None) or getattr(p, "id", None)
         if pid is not None:
             players[pid] = p
+    return players
 
-    townhalls = [
-        "Command Center",
-        "Orbital Command",
-        "Planetary Fortress",
-        "Nexus",
-        "Hatchery",
-        "Lair",
-        "Hive",
-    ]
-    buildings = [
-        "Supply Depot",
-        "Barracks",
-        "Refinery",
-        "Factory",
-        "Starport",
-        "Engineering Bay",
-        "Bunker",
-        "Missile Turret",
-        "Armory",
-        "Fusion Core",
-        "Command Center",
-        "Orbital Command",
-        "Planetary Fortress",
-        "Pylon",
-        "Gateway",
-        "Assimilator",
-        "Cybernetics Core",
-        "Robotics Facility",
-        "Stargate",
-        "Twilight Council",
-        "Templar Archives",
-        "Dark Shrine",
-        "Forge",
-        "Photon Cannon",
-        "Nexus",
-        "Spawning Pool",
-        "Extractor",
-        "Roach Warren",
-        "Baneling Nest",
-        "Lair",
-        "Hydralisk Den",
-        "Spire",
-        "Hive",
-        "Infestation Pit",
-        "Evolution Chamber",
-        "Spine Crawler",
-        "Spore Crawler",
-        "Ultralisk Cavern",
-    ]
-    townhall_set = set(townhalls)
-    building_map = _build_unit_name_map(buildings)
 
-    start_pos: Dict[int, Tuple[float, float]] = {}
-    building_events: Dict[int, List[Tuple[int, Tuple[float, float], str, bool]]] = {pid: [] for pid in players}
+class _TrackerAnalyzer(ABC):
+    # Subclasses list the tracker event classes they need in event_classes and
+    # are fed those events, in game-loop order, by _run_tracker_analyzers.
+    # Bump version whenever the fields an analyzer produces would change for
+    # the same replay; scans then rerun only that analyzer on stored records.
+    name = ""
+    version = 1
+    event_classes: Tuple[str, ...] = ()
 
-    for event in events:
-        unit_type = getattr(event, "unit_type_name", None)
-        if not unit_type:
-            continue
-        unit_name = _normalize_unit_name(unit_type, building_map)
-        if not unit_name:
-            continue
-        pid = _event_player_id(event)
-        if pid is None or pid not in players:
-            continue
-        pos = _extract_position(event)
-        if pos is None:
-            continue
-        frame = getattr(event, "frame", None)
-        if frame is None:
-            frame = getattr(event, "gameloop", 0)
+    def __init__(self, replay: Any, parse_options: Dict[str, Any]) -> None:
+        self.players = _player_map(replay)
 
-        is_townhall = unit_name in townhall_set
-        building_events[pid].append((frame, pos, unit_name, is_townhall))
+    @property
+    def done(self) -> bool:
+        return False
 
-        if is_townhall and pid not in start_pos:
-            start_pos[pid] = pos
-            continue
-
-    for pid, events_list in building_events.items():
-        if not events_list:
-            logging.debug("No building events for pid=%s", pid)
-            continue
-        events_list.sort(key=lambda e: e[0])
-        if pid not in start_pos:
-            start_pos[pid] = events_list[0][1]
-    distances: Dict[str, float] = {}
-    max_dist: Optional[float] = None
-    for pid, start in start_pos.items():
-        events_list = building_events.get(pid, [])
-        if not events_list:
-            logging.debug("No building events for pid=%s", pid)
-            continue
-        first_four: List[float] = []
-        for frame, pos, unit_type, is_townhall in events_list:
-            if is_townhall:
-                continue
-            first_four.append(_distance(start, pos))
-            if len(first_four) >= 4:
-                break
-        if not first_four:
-            logging.debug("No non-townhall building found for pid=%s", pid)
-            continue
-        dist = max(first_four)
-        distances[str(pid)] = dist
-        if max_dist is None or dist > max_dist:
-            max_dist = dist
+    @abstractmethod
+    def feed(self, event: Any) -> None:
+        ...
 
-    proxy_flag = max_dist is not None and max_dist > threshold
-    return {
-        "proxy_flag": proxy_flag,
-        "proxy_distance_max": max_dist,
-        "proxy_distances": distances,
-        "proxy_threshold": threshold,
-    }
+    @abstractmethod
+    def result(self, events_seen: int) -> Dict[str, Any]:
+        ...
 
 
-def _collect_sequences(replay: Any) -> List[Dict[str, Any]]:
-    events = getattr(replay, "tracker_events", None)
-    if not events:
-        return []
+TRACKER_ANALYZERS: List[type] = []
 
-    players: Dict[int, Any] = {}
-    for p in getattr(replay, "players", []):
-        pid = getattr(p, "pid", None) or getattr(p, "player_id", None) or getattr(p, "id", None)
-        if pid is not None:
-            players[pid] = p
 
-    tech_buildings = [
-        "Barracks",
-        "Factory",
-        "Starport",
-        "Command Center",
-        "Orbital Command",
-        "Planetary Fortress",
-        "Gateway",
-        "Cybernetics Core",
-        "Robotics Facility",
-        "Stargate",
-        "Twilight Council",
-        "Templar Archives",
-        "Dark Shrine",
-        "Nexus",
-        "Spawning Pool",
-        "Roach Warren",
-        "Baneling Nest",
-        "Lair",
-        "Hydralisk Den",
-        "Spire",
-        "Hive",
-        "Infestation Pit",
-    ]
+def register_analyzer(cls: type) -> type:
+    TRACKER_ANALYZERS.append(cls)
+    return cls
 
-    townhalls = [
-        "Command Center",
-        "Orbital Command",
-        "Planetary Fortress",
-        "Nexus",
-        "Hatchery",
-        "Lair",
-        "Hive",
-    ]
 
-    tech_map = _build_unit_name_map(tech_buildings)
-    townhall_map = _build_unit_name_map(townhalls)
-    townhall_set = set(townhalls)
+@register_analyzer
+class _SequenceAnalyzer(_TrackerAnalyzer):
+    name = "sequences"
+    version = 1
+    event_classes = ("UnitInitEvent", "UnitBornEvent")
 
-    workers = {"SCV", "Probe", "Drone"}
+    def __init__(self, replay: Any, parse_options: Dict[str, Any]) -> None:
+        super().__init__(replay, parse_options)
+        self._tech_map = _build_unit_name_map(TECH_BUILDINGS)
+        self._townhall_map = _build_unit_name_map(TOWNHALLS)
+        self._townhall_set = set(TOWNHALLS)
+        self._seq_tech: Dict[int, List[str]] = {pid: [] for pid in self.players}
+        self._seq_general: Dict[int, List[str]] = {pid: [] for pid in self.players}
+        self._skipped_start_townhall: Dict[int, bool] = {pid: False for pid in self.players}
+        self._pending = set(self.players)
 
-    seq_tech: Dict[int, List[str]] = {pid: [] for pid in players}
-    seq_general: Dict[int, List[str]] = {pid: [] for pid in players}
-    skipped_start_townhall: Dict[int, bool] = {pid: False for pid in players}
+    @property
+    def done(self) -> bool:
+        return not self._pending
 
-    events = sorted(events, key=lambda e: getattr(e, "frame", getattr(e, "gameloop", 0)))
-    max_steps = 8
-    for event in events:
-        class_name = event.__class__.__name__
-        if class_name not in {"UnitInitEvent", "UnitBornEvent"}:
-            continue
+    def feed(self, event: Any) -> None:
         unit_type = getattr(event, "unit_type_name", None)
         if not unit_type:
-            continue
+            return
         pid = _event_player_id(event)
-        if pid is None or pid not in players:
-            continue
+        if pid is None or pid not in self.players:
+            return
 
-        unit_name_tech = _normalize_unit_name(unit_type, tech_map)
-        if unit_name_tech and len(seq_tech[pid]) < max_steps:
-            seq_tech[pid].append(unit_name_tech)
+        seq_tech = self._seq_tech[pid]
+        seq_general = self._seq_general[pid]
+        unit_name_tech = _normalize_unit_name(unit_type, self._tech_map)
+        if unit_name_tech and len(seq_tech) < SEQUENCE_STEPS:
+            seq_tech.append(unit_name_tech)
 
-        unit_name_townhall = _normalize_unit_name(unit_type, townhall_map)
+        unit_name_townhall = _normalize_unit_name(unit_type, self._townhall_map)
         unit_name_general = unit_name_tech or unit_name_townhall or unit_type
-        if unit_type not in workers:
-            if unit_name_townhall in townhall_set and not skipped_start_townhall[pid]:
-                skipped_start_townhall[pid] = True
-            else:
-                if len(seq_general[pid]) < max_steps:
-                    seq_general[pid].append(unit_name_general)
+        if unit_type not in WORKERS:
+            if unit_name_townhall in self._townhall_set and not self._skipped_start_townhall[pid]:
+                self._skipped_start_townhall[pid] = True
+            elif len(seq_general) < SEQUENCE_STEPS:
+                seq_general.append(unit_name_general)
+
+        if len(seq_tech) >= SEQUENCE_STEPS and len(seq_general) >= SEQUENCE_STEPS:
+            self._pending.discard(pid)
+
+    def result(self, events_seen: int) -> Dict[str, Any]:
+        sequences: List[Dict[str, Any]] = []
+        if events_seen:
+            for pid, p in self.players.items():
+                sequences.append(
+                    {
+                        "pid": pid,
+                        "race": _safe_race(p),
+                        "name": getattr(p, "name", "Unknown"),
+                        "seq_tech": self._seq_tech.get(pid, []),
+                        "seq_general": self._seq_general.get(pid, []),
+                    }
+                )
+        return {
+            "build_order_auto": _build_order_auto_from_sequences(sequences),
+            "bo_sequences": sequences,
+        }
+
+
+@register_analyzer
+class _ProxyAnalyzer(_TrackerAnalyzer):
+    name = "proxy"
+    version = 1
+    event_classes = ("UnitBornEvent", "UnitInitEvent", "UnitTypeChangeEvent")
+
+    def __init__(self, replay: Any, parse_options: Dict[str, Any]) -> None:
+        super().__init__(replay, parse_options)
+        self._threshold = parse_options.get("proxy_threshold", 35.0)
+        self._building_map = _build_unit_name_map(PROXY_BUILDINGS)
+        self._townhall_set = set(TOWNHALLS)
+        self._start_pos: Dict[int, Tuple[float, float]] = {}
+        self._first_pos: Dict[int, Tuple[float, float]] = {}
+        self._buildings: Dict[int, List[Tuple[float, float]]] = {pid: [] for pid in self.players}
+        self._pending = set(self.players)
+
+    @property
+    def done(self) -> bool:
+        return not self._pending
+
+    def feed(self, event: Any) -> None:
+        unit_type = getattr(event, "unit_type_name", None)
+        if not unit_type:
+            return
+        unit_name = _normalize_unit_name(unit_type, self._building_map)
+        if not unit_name:
+            return
+        pid = _event_player_id(event)
+        if pid is None or pid not in self.players:
+            return
+        pos = _extract_position(event)
+        if pos is None:
+            return
 
-    sequences: List[Dict[str, Any]] = []
-    for pid, p in players.items():
-        sequences.append(
-            {
-                "pid": pid,
-                "race": _safe_race(p),
-                "name": getattr(p, "name", "Unknown"),
-                "seq_tech": seq_tech.get(pid, []),
-                "seq_general": seq_general.get(pid, []),
-            }
-        )
+        self._first_pos.setdefault(pid, pos)
+        if unit_name in self._townhall_set:
+            self._start_pos.setdefault(pid, pos)
+        elif len(self._buildings[pid]) < PROXY_BUILDING_COUNT:
+            self._buildings[pid].append(pos)
+
+        if pid in self._start_pos and len(self._buildings[pid]) >= PROXY_BUILDING_COUNT:
+            self._pending.discard(pid)
+
+    def result(self, events_seen: int) -> Dict[str, Any]:
+        if not events_seen:
+            logging.debug("No tracker events for replay")
+
+        distances: Dict[str, float] = {}
+        max_dist: Optional[float] = None
+        for pid in self.players:
+            if pid not in self._first_pos:
+                logging.debug("No building events for pid=%s", pid)
+                continue
+            start = self._start_pos.get(pid, self._first_pos[pid])
+            buildings = self._buildings[pid]
+            if not buildings:
+                logging.debug("No non-townhall building found for pid=%s", pid)
+                continue
+            dist = max(_distance(start, pos) for pos in buildings)
+            distances[str(pid)] = dist
+            if max_dist is None or dist > max_dist:
+                max_dist = dist
+
+        return {
+            "proxy_flag": max_dist is not None and max_dist > self._threshold,
+            "proxy_distance_max": max_dist,
+            "proxy_distances": distances,
+            "proxy_threshold": self._threshold,
+        }
+
+
+class _TrackerStream:
+    # Decodes replay.tracker.events one event at a time (mirroring sc2reader's
+    # TrackerEventsReader) so the opening window can stop before the end.
+    def __init__(self, replay: Any) -> None:
+        from sc2reader.decoders import VersionedDecoder
+        from sc2reader.readers import TrackerEventsReader
+
+        self._build = getattr(replay, "build", 0)
+        self._data = replay.archive.read_file("replay.tracker.events") or b""
+        self._decoder = VersionedDecoder(self._data)
+        self._dispatch = TrackerEventsReader().EVENT_DISPATCH
+        self.decoded = 0
+
+    def __iter__(self) -> Iterable[Any]:
+        decoder = self._decoder
+        frames = 0
+        while not decoder.done():
+            frames += decoder.read_struct()
+            event_type = decoder.read_struct()
+            event_data = decoder.read_struct()
+            self.decoded += 1
+            yield self._dispatch[event_type](frames, event_data, self._build)
+
+    def _position(self) -> Optional[int]:
+        # Bytes decoded so far. sc2reader's VersionedDecoder, like
+        # s2protocol's, keeps its offset on a BitPackedBuffer.
+        decoder = self._decoder
+        buffer = getattr(decoder, "_buffer", None)
+        for owner, name, scale in ((decoder, "tell", 1), (buffer, "tell", 1), (buffer, "used_bits", 8)):
+            method = getattr(owner, name, None)
+            if callable(method):
+                return method() // scale
+        used = getattr(buffer, "_used", None)
+        return used if isinstance(used, int) else None
+
+    def _count_rest(self) -> int:
+        # For decoders that do not expose their offset: reads the structs of
+        # the events left without building them.
+        decoder = self._decoder
+        count = 0
+        while not decoder.done():
+            decoder.read_struct()
+            decoder.read_struct()
+            decoder.read_struct()
+            count += 1
+        return count
+
+    def window_stats(self, stop: str, opening_loops: Optional[int]) -> Dict[str, Any]:
+        # Called once the stream is abandoned, so reading on is safe.
+        position = self._position()
+        if position is None:
+            skipped = self._count_rest()
+            total = self.decoded + skipped
+            remaining = round(len(self._data) * skipped / total) if total else 0
+        else:
+            remaining = max(len(self._data) - position, 0)
+            skipped = 0
+            if remaining:
+                # Counting the skipped events exactly would mean decoding
+                # them, so extrapolate from the average size of the events we
+                # did decode.
+                used = len(self._data) - remaining
+                skipped = round(remaining * self.decoded / used) if used > 0 else 0
+        return {
+            "events_decoded": self.decoded,
+            "events_skipped": skipped,
+            "bytes_skipped": remaining,
+            "stop": stop,
+            "opening_loops": opening_loops,
+        }
+
+
+class _SubsetEvent:
+    __slots__ = ("frame", "control_pid", "unit_type_name", "x", "y")
+
+    def __init__(self, frame: int, pid: Optional[int], unit_type_name: Optional[str], x: Any, y: Any) -> None:
+        self.frame = frame
+        self.control_pid = pid
+        self.unit_type_name = unit_type_name
+        self.x = x
+        self.y = y
+
+
+_SUBSET_EVENT_TYPES: Dict[str, type] = {}
+
+
+def _subset_events(rows: List[List[Any]]) -> Iterable[Any]:
+    # Rebuilt events are named after the sc2reader class they came from, so
+    # _run_tracker_analyzers dispatches them exactly like decoded ones.
+    for class_name, frame, pid, unit_type_name, x, y in rows:
+        event_type = _SUBSET_EVENT_TYPES.get(class_name)
+        if event_type is None:
+            event_type = type(class_name, (_SubsetEvent,), {"__slots__": ()})
+            _SUBSET_EVENT_TYPES[class_name] = event_type
+        yield event_type(frame, pid, unit_type_name, x, y)
+
+
+def _opening_loops(parse_options: Dict[str, Any]) -> Optional[int]:
+    return parse_options.get("opening_loops") if parse_options.get("opening_window") else None
+
+
+def _run_tracker_analyzers(
+    replay: Any,
+    events: Optional[Iterable[Any]],
+    parse_options: Dict[str, Any],
+    *,
+    analyzer_classes: Optional[List[type]] = None,
+    capture: Optional[List[List[Any]]] = None,
+) -> Tuple[Dict[str, Any], str]:
+    classes = TRACKER_ANALYZERS if analyzer_classes is None else analyzer_classes
+    analyzers = [cls(replay, parse_options) for cls in classes]
+    dispatch: Dict[str, List[_TrackerAnalyzer]] = {}
+    for analyzer in analyzers:
+        for class_name in analyzer.event_classes:
+            dispatch.setdefault(class_name, []).append(analyzer)
+
+    opening_loops = _opening_loops(parse_options)
+    events_seen = 0
+    stop = "end"
+    for event in events or ():
+        if opening_loops is not None and getattr(event, "frame", 0) > opening_loops:
+            stop = "loop_cap"
+            break
+        events_seen += 1
+        class_name = event.__class__.__name__
+        subscribers = dispatch.get(class_name)
+        if not subscribers:
+            continue
+        if capture is not None:
+            pos = _extract_position(event) or (None, None)
+            capture.append(
+                [
+                    class_name,
+                    getattr(event, "frame", 0),
+                    _event_player_id(event),
+                    getattr(event, "unit_type_name", None),
+                    pos[0],
+                    pos[1],
+                ]
+            )
+        for analyzer in subscribers:
+            analyzer.feed(event)
+        if all(analyzer.done for analyzer in analyzers):
+            stop = "quota"
+            break
 
-    return sequences
+    fields: Dict[str, Any] = {}
+    for analyzer in analyzers:
+        fields.update(analyzer.result(events_seen))
+    return fields, stop
 
 
 def _build_order_auto_from_sequences(sequences: List[Dict[str, Any]]) -> str:
@@ -352,46 +617,916 @@ def _player_summary(players: List[Any]) -> List[Dict[str, Any]]:
     return summary
 
 
-def _serialize_replay(
+def _players_fields(replay: Any) -> Dict[str, Any]:
+    return {"players": _player_summary(getattr(replay, "players", []))}
+
+
+def _matchup_fields(replay: Any) -> Dict[str, Any]:
+    return {"matchup": _matchup_from_players(getattr(replay, "players", []))}
+
+
+# Header based analyzers as name -> (version, fields function); bump a version
+# like _TrackerAnalyzer.version when its output changes.
+METADATA_ANALYZERS: Dict[str, Tuple[int, callable]] = {
+    "matchup": (1, _matchup_fields),
+    "players": (1, _players_fields),
+}
+
+# Records written before analyzers were versioned came from version 1 of these.
+_UNVERSIONED_METADATA_ANALYZERS = ("matchup", "players")
+_UNVERSIONED_TRACKER_ANALYZERS = ("sequences", "proxy")
+
+
+def analyzer_versions(*, tracker: bool = True) -> Dict[str, int]:
+    versions = {name: version for name, (version, _fields) in METADATA_ANALYZERS.items()}
+    if tracker:
+        versions.update({cls.name: cls.version for cls in TRACKER_ANALYZERS})
+    return versions
+
+
+def _recorded_versions(item: Dict[str, Any]) -> Dict[str, int]:
+    recorded = item.get("analyzer_versions")
+    if recorded is None:
+        names = _UNVERSIONED_METADATA_ANALYZERS
+        if not is_partial(item):
+            names += _UNVERSIONED_TRACKER_ANALYZERS
+        return {name: 1 for name in names}
+    return recorded
+
+
+def _stale_analyzers(item: Dict[str, Any], *, tracker: bool = True) -> List[str]:
+    recorded = _recorded_versions(item)
+    current = analyzer_versions(tracker=tracker and not is_partial(item))
+    return [name for name, version in current.items() if recorded.get(name) != version]
+
+
+def needs_analysis(item: Dict[str, Any]) -> bool:
+    if item.get("analysis_status") == ANALYSIS_FAILED:
+        return False
+    return is_partial(item) or bool(_stale_analyzers(item))
+
+
+def _serialize_replay_metadata(
     replay: Any,
     path: Path,
     *,
-    proxy_threshold: float = 35.0,
     source_folder: Optional[Path] = None,
+    stat: Optional[os.stat_result] = None,
 ) -> Dict[str, Any]:
+    # Scans pass the canonical path with the stat taken during discovery.
+    if stat is None:
+        path = path.resolve()
+        stat = replay_stat(path)
     start_time = getattr(replay, "start_time", None) or getattr(replay, "date", None)
     length = getattr(replay, "length", None)
-
-    sequences = _collect_sequences(replay)
-    proxy_info = _proxy_info(replay, threshold=proxy_threshold)
-    return {
-        "path": str(path.resolve()),
-        "filename": path.name,
+    record = {
+        "path": str(path),
+        "filename": replay_name(path),
         "source_folder": str(source_folder) if source_folder else "",
         "map": getattr(replay, "map_name", None) or getattr(replay, "map", None) or "Unknown",
         "start_time": start_time.isoformat() if start_time else "",
         "length": str(length) if length else "",
         "game_type": getattr(replay, "game_type", ""),
         "speed": getattr(replay, "speed", ""),
-        "matchup": _matchup_from_players(getattr(replay, "players", [])),
-        "players": _player_summary(getattr(replay, "players", [])),
-        "build_order_auto": _build_order_auto_from_sequences(sequences),
-        "bo_sequences": sequences,
-        "proxy_flag": proxy_info.get("proxy_flag", False),
-        "proxy_distance_max": proxy_info.get("proxy_distance_max"),
-        "proxy_distances": proxy_info.get("proxy_distances", {}),
-        "proxy_threshold": proxy_info.get("proxy_threshold", 35.0),
-        "mtime": path.stat().st_mtime,
-        "size": path.stat().st_size,
     }
+    for _version, fields in METADATA_ANALYZERS.values():
+        record.update(fields(replay))
+    record.update(
+        {
+            "analysis_status": ANALYSIS_PARTIAL,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "analyzer_versions": analyzer_versions(tracker=False),
+        }
+    )
+    return record
+
+
+def _serialize_replay(
+    replay: Any,
+    path: Path,
+    parse_options: Dict[str, Any],
+    *,
+    source_folder: Optional[Path] = None,
+    events: Optional[Iterable[Any]] = None,
+    capture: Optional[Dict[str, Any]] = None,
+    stat: Optional[os.stat_result] = None,
+) -> Dict[str, Any]:
+    record = _serialize_replay_metadata(replay, path, source_folder=source_folder, stat=stat)
+    if events is None:
+        events = getattr(replay, "tracker_events", None)
+    rows: Optional[List[List[Any]]] = [] if capture is not None else None
+    analysis, stop = _run_tracker_analyzers(replay, events, parse_options, capture=rows)
+    record.update(analysis)
+    record["analysis_status"] = ANALYSIS_COMPLETE
+    record["analyzer_versions"] = analyzer_versions()
+    if capture is not None:
+        capture.update(
+            {
+                "classes": sorted({name for cls in TRACKER_ANALYZERS for name in cls.event_classes}),
+                "stop": stop,
+                "opening_loops": _opening_loops(parse_options),
+                "events": rows,
+            }
+        )
+    if isinstance(events, _TrackerStream):
+        record["tracker_window"] = events.window_stats(stop, parse_options.get("opening_loops"))
+    return record
+
+
+def is_partial(item: Dict[str, Any]) -> bool:
+    # Records written before two-phase scans existed carry no status and are complete.
+    return item.get("analysis_status", ANALYSIS_COMPLETE) != ANALYSIS_COMPLETE
+
+
+def _max_distance(distances: Dict[str, Any]) -> Optional[float]:
+    max_dist: Optional[float] = None
+    for value in distances.values():
+        try:
+            dist = float(value)
+        except (TypeError, ValueError):
+            continue
+        if max_dist is None or dist > max_dist:
+            max_dist = dist
+    return max_dist
+
+
+def apply_proxy_threshold(index: Dict[str, Any], threshold: float) -> int:
+    # Updated records are replaced rather than edited in place: scans may
+    # share record dicts with the index the GUI is displaying.
+    changed = 0
+    replays = index.get("replays", [])
+    lazy = isinstance(replays, SnapshotReplays)
+    for slot in range(len(replays)):
+        if record_value(replays, slot, "analysis_status", ANALYSIS_COMPLETE) != ANALYSIS_COMPLETE:
+            continue
+        # Stored rows were saved with the flags of their threshold.
+        if lazy and replays.peek(slot) is None and replays.value(slot, "proxy_threshold") == threshold:
+            continue
+        item = replays[slot]
+        max_dist = _max_distance(item.get("proxy_distances") or {})
+        flag = max_dist is not None and max_dist > threshold
+        if (
+            item.get("proxy_flag") != flag
+            or item.get("proxy_distance_max") != max_dist
+            or item.get("proxy_threshold") != threshold
+        ):
+            updated = dict(item)
+            updated["proxy_flag"] = flag
+            updated["proxy_distance_max"] = max_dist
+            updated["proxy_threshold"] = threshold
+            replays[slot] = updated
+            changed += 1
+    index["proxy_threshold"] = threshold
+    return changed
+
+
+def _fold_journal(index: Dict[str, Any], records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if not records:
+        return index
+    replays = copy_replays(index.get("replays", []))
+    slots = {record_value(replays, slot, "path"): slot for slot in range(len(replays))}
+    for record in records:
+        slot = slots.get(record.get("path"))
+        if slot is None:
+            slots[record.get("path")] = len(replays)
+            replays.append(record)
+        else:
+            replays[slot] = record
+    index = dict(index)
+    index["replays"] = replays
+    return index
 
 
 def load_index() -> Dict[str, Any]:
-    return load_json(index_path(), {"replays": []})
+    return _fold_journal(read_index(), load_journal())
+
+
+def save_index(index: Dict[str, Any], folders: Optional[Iterable[Any]] = None) -> None:
+    # Only the folders' shards holding records that changed since the last
+    # load/save are written. With folders, shards of other folders missing
+    # from the index are kept rather than dropped. Event subsets of replays
+    # no longer stored are dropped.
+    write_index(index, folders)
+    prune_event_cache(query_replay_paths())
+
+
+def _index_changed(existing: Dict[str, Any], index: Dict[str, Any], stats: Dict[str, Any]) -> bool:
+    if stats.get("parsed") or stats.get("refreshed") or stats.get("failed") or stats.get("removed"):
+        return True
+    if len(index.get("replays", [])) != len(existing.get("replays", [])):
+        return True
+    return any(index.get(key) != existing.get(key) for key in ("errors", "folders", "folder", "proxy_threshold"))
+
+
+def _save_scan_index(
+    index: Dict[str, Any], changed: bool = True, folders: Optional[Iterable[Any]] = None
+) -> bool:
+    # The finished index supersedes everything journaled during the scan. An
+    # unchanged index is not rewritten, so idle watch ticks stay cheap.
+    if not changed:
+        _prune_journal(index)
+        return False
+    save_index(index, folders)
+    clear_journal()
+    return True
+
+
+def _prune_journal(index: Dict[str, Any]) -> None:
+    # Entries an earlier, interrupted scan left for replays this scan
+    # dropped would otherwise come back on the next load.
+    records = load_journal()
+    if not records:
+        return
+    replays = index.get("replays", [])
+    paths = {record_value(replays, slot, "path") for slot in range(len(replays))}
+    kept = [record for record in records if record.get("path") in paths]
+    if len(kept) != len(records):
+        replace_journal(kept)
+
+
+class _ScanJournal:
+    # Records a scan parsed, journaled in batches and folded into the index
+    # the scan started from (base) at checkpoints; the journal then starts
+    # over.
+    def __init__(self, base: Dict[str, Any]) -> None:
+        self.index = base
+        self.pending: List[Dict[str, Any]] = []
+        self.synced = 0
+        self.last_sync = self.last_checkpoint = time.monotonic()
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        # True when this record triggered a checkpoint.
+        self.pending.append(record)
+        now = time.monotonic()
+        if now - self.last_checkpoint >= JOURNAL_CHECKPOINT_SECONDS:
+            self.checkpoint()
+            return True
+        if len(self.pending) - self.synced >= JOURNAL_BATCH_RECORDS or now - self.last_sync >= JOURNAL_BATCH_SECONDS:
+            self.flush()
+        return False
+
+    def flush(self) -> None:
+        if self.synced < len(self.pending):
+            append_journal(self.pending[self.synced :])
+            self.synced = len(self.pending)
+        self.last_sync = time.monotonic()
+
+    def checkpoint(self) -> None:
+        self.index = _fold_journal(self.index, self.pending)
+        save_index(self.index)
+        clear_journal()
+        self.pending = []
+        self.synced = 0
+        self.last_sync = self.last_checkpoint = time.monotonic()
+
+
+def _resolve_jobs(jobs: int) -> int:
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _parse_options(
+    *,
+    proxy_threshold: float = 35.0,
+    two_phase: bool = False,
+    opening_window: bool = False,
+    opening_loops: Optional[int] = None,
+) -> Dict[str, Any]:
+    return {
+        "proxy_threshold": proxy_threshold,
+        "header_only": two_phase,
+        "opening_window": opening_window,
+        "opening_loops": opening_loops,
+    }
+
+
+def _is_cache_hit(
+    cached: Optional[Dict[str, Any]],
+    stat: os.stat_result,
+    parse_options: Dict[str, Any],
+    source_folder: Optional[Path] = None,
+) -> bool:
+    if not cached:
+        return False
+    if cached.get("mtime") != stat.st_mtime or cached.get("size") != stat.st_size:
+        return False
+    # A partial record is good enough for phase one; a single-phase scan has to
+    # finish the analysis itself. The proxy threshold is not part of the key:
+    # apply_proxy_threshold() re-derives the flags from the stored distances.
+    if is_partial(cached) and not parse_options["header_only"]:
+        return False
+    if source_folder is not None and cached.get("source_folder") != str(source_folder):
+        return False
+    return True
+
+
+def _load_header(load_replay: callable, source: Any) -> Any:
+    # The metadata fields only need the MPQ header, replay.details and the
+    # attribute events, which mpyq reads far faster than sc2reader builds a
+    # level 2 replay; anything it cannot decode goes through sc2reader.
+    try:
+        return load_replay_header(source)
+    except Exception as exc:  # noqa: BLE001
+        logging.debug("Header reader failed for %s, using sc2reader: %s", getattr(source, "name", source), exc)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return load_replay(source, load_level=HEADER_LOAD_LEVEL)
+
+
+def _load_replay(
+    load_replay: callable,
+    source: Any,
+    parse_options: Dict[str, Any],
+) -> Tuple[Any, Optional[Iterable[Any]]]:
+    # source is a path, or an in-memory file for replays inside archives.
+    if parse_options["header_only"]:
+        return _load_header(load_replay, source), None
+    if parse_options["opening_window"]:
+        replay = load_replay(source, load_level=HEADER_LOAD_LEVEL)
+        try:
+            return replay, _TrackerStream(replay)
+        except (ImportError, AttributeError):
+            logging.debug("Opening window decode unavailable, falling back to a full load")
+        if hasattr(source, "seek"):
+            source.seek(0)
+    replay = load_replay(source, load_level=FULL_LOAD_LEVEL)
+    return replay, getattr(replay, "tracker_events", None)
+
+
+def _store_event_subset(record: Dict[str, Any], subset: Dict[str, Any]) -> None:
+    try:
+        save_event_subset(record["path"], record["mtime"], record["size"], subset)
+    except OSError as exc:
+        logging.debug("Could not cache tracker events for %s: %s", record["path"], exc)
+
+
+def _parser_version() -> str:
+    _ensure_sc2reader()
+    try:
+        import sc2reader
+    except ImportError:
+        return "unknown"
+    return str(getattr(sc2reader, "__version__", "unknown"))
+
+
+def _failure_info(replay_file: str, exc: Exception, started: float) -> Dict[str, Any]:
+    return {
+        "path": replay_file,
+        "exception": type(exc).__name__,
+        "message": str(exc),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def _parse_replay_file(
+    replay_file: str,
+    source_folder: str,
+    parse_options: Dict[str, Any],
+    file_stat: Optional[os.stat_result] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    # Runs in pool workers too, so it must stay a picklable module-level function.
+    _ensure_sc2reader()
+    from sc2reader import load_replay
+
+    folder = Path(source_folder) if source_folder else None
+    started = time.perf_counter()
+    try:
+        # Hashed from the replay the parse reads, so copies are recognized
+        # without opening it again.
+        source = open_replay(replay_file)
+        digest = try_source_hash(source)
+        replay, events = _load_replay(load_replay, source, parse_options)
+        if parse_options["header_only"]:
+            record = _serialize_replay_metadata(replay, Path(replay_file), source_folder=folder, stat=file_stat)
+        else:
+            subset: Dict[str, Any] = {}
+            record = _serialize_replay(
+                replay,
+                Path(replay_file),
+                parse_options,
+                source_folder=folder,
+                events=events,
+                capture=subset,
+                stat=file_stat,
+            )
+            _store_event_subset(record, subset)
+        if digest:
+            record["content_hash"] = digest
+        return record, None
+    except Exception as exc:  # noqa: BLE001
+        return None, _failure_info(replay_file, exc, started)
+
+
+def _rerun_from_event_subset(
+    record: Dict[str, Any],
+    analyzer_classes: List[type],
+    parse_options: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    subset = load_event_subset(record.get("path", ""), record.get("mtime"), record.get("size"))
+    if subset is None:
+        return None
+    cached_classes = set(subset.get("classes") or ())
+    if any(not cached_classes.issuperset(cls.event_classes) for cls in analyzer_classes):
+        return None
+
+    replay = SimpleNamespace(players=[SimpleNamespace(**player) for player in record.get("players", [])])
+    fields, stop = _run_tracker_analyzers(
+        replay,
+        _subset_events(subset.get("events") or []),
+        parse_options,
+        analyzer_classes=analyzer_classes,
+    )
+    # Running out of cached events only proves something if the original pass
+    # read the whole stream, or stopped at the same (or a later) loop cap.
+    if stop == "end" and subset.get("stop") != "end":
+        current_cap = _opening_loops(parse_options)
+        cached_cap = subset.get("opening_loops")
+        if subset.get("stop") != "loop_cap" or current_cap is None or cached_cap is None or current_cap > cached_cap:
+            return None
+    return fields
+
+
+def _refresh_replay_file(
+    replay_file: str,
+    source_folder: str,
+    parse_options: Dict[str, Any],
+    cached: Dict[str, Any],
+    stale: List[str],
+    file_stat: Optional[os.stat_result] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    # Reruns only the analyzers whose version changed; tracker analyzers are
+    # fed from the cached event subset when it can answer for them.
+    record = dict(cached)
+    metadata_names = [name for name in METADATA_ANALYZERS if name in stale]
+    tracker_classes = [cls for cls in TRACKER_ANALYZERS if cls.name in stale]
+    started = time.perf_counter()
+    try:
+        if metadata_names:
+            _ensure_sc2reader()
+            from sc2reader import load_replay
+
+            replay = _load_header(load_replay, open_replay(replay_file))
+            for name in metadata_names:
+                record.update(METADATA_ANALYZERS[name][1](replay))
+        if tracker_classes:
+            fields = _rerun_from_event_subset(record, tracker_classes, parse_options)
+            if fields is None:
+                return _parse_replay_file(replay_file, source_folder, parse_options, file_stat)
+            record.update(fields)
+    except Exception as exc:  # noqa: BLE001
+        return None, _failure_info(replay_file, exc, started)
+
+    versions = dict(_recorded_versions(cached))
+    current = analyzer_versions()
+    versions.update({name: current[name] for name in stale})
+    record["analyzer_versions"] = versions
+    return record, None
+
+
+def _run_parse_task(
+    replay_file: str,
+    source_folder: str,
+    parse_options: Dict[str, Any],
+    refresh: Optional[Tuple[Dict[str, Any], List[str]]],
+    file_stat: Optional[os.stat_result] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    if refresh is None:
+        return _parse_replay_file(replay_file, source_folder, parse_options, file_stat)
+    cached, stale = refresh
+    return _refresh_replay_file(replay_file, source_folder, parse_options, cached, stale, file_stat)
+
+
+def _warm_parse_worker() -> None:
+    # Runs once per pool worker: sc2reader, its datapacks and the readers used
+    # for tracker events are imported before the first replay arrives.
+    _ensure_sc2reader()
+    for name in ("sc2reader", "sc2reader.data", "sc2reader.readers", "sc2reader.decoders"):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def _pool_shape(jobs: int, governor: Optional[ScanGovernor] = None) -> Tuple[int, int]:
+    workers = _resolve_jobs(jobs)
+    if governor is not None:
+        return governor.cap_jobs(workers), governor.nice
+    return workers, 0
+
+
+def prewarm_parse_workers(jobs: int = 0, *, governor: Optional[ScanGovernor] = None) -> None:
+    # Starts the worker pool a scan with these settings would use, so the
+    # next scan (e.g. a watch tick) finds sc2reader already imported.
+    workers, nice = _pool_shape(jobs, governor)
+    prewarm_parse_pool(workers, nice, warm=_warm_parse_worker)
+
+
+def _parse_replays(
+    tasks: Iterable[Tuple[int, Path, Any, Any, Optional[os.stat_result]]],
+    parse_options: Dict[str, Any],
+    *,
+    jobs: int,
+    on_result: callable,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
+    sizes: Optional[Dict[int, int]] = None,
+) -> None:
+    # Tasks may be a stream fed by discovery, so they are submitted as they
+    # arrive with a bounded number in flight to the persistent worker pool,
+    # which is only started once there is something to parse. A paused job stops submissions while
+    # finished results keep coming in; a cancelled one drops queued tasks, as
+    # does a governor whose tick budget ran out. Tasks that never reach
+    # on_result were not parsed.
+    workers, nice = _pool_shape(jobs, governor)
+    if governor is not None:
+        governor.start_tick()
+    elif workers <= 1 or (isinstance(tasks, list) and len(tasks) <= 1):
+        for slot, replay_file, source_folder, refresh, file_stat in tasks:
+            if job is not None and not job.proceed():
+                return
+            record, failure = _run_parse_task(str(replay_file), str(source_folder), parse_options, refresh, file_stat)
+            on_result(slot, record, failure)
+        return
+
+    # Governed scans always parse in worker processes, so the nice level
+    # applies to them and never to the calling (GUI) process.
+    pool = None
+    futures: Dict[Any, int] = {}
+    # A governed scan queues nothing beyond its workers, so what is still
+    # queued when the tick budget runs out is at most one replay per worker.
+    limit = workers if governor is not None else workers * PARSE_QUEUE_PER_WORKER
+
+    def collect(done: Iterable[Any]) -> None:
+        for future in done:
+            record, failure = future.result()
+            on_result(futures.pop(future), record, failure)
+
+    def proceed() -> bool:
+        if job is None:
+            return True
+        while job.paused and futures:
+            done, _pending = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+            collect(done)
+        return job.proceed()
+
+    def throttle(slot: int, replay_file: Any, file_stat: Optional[os.stat_result]) -> bool:
+        if governor is None:
+            return True
+        size = file_stat.st_size if file_stat is not None else (sizes or {}).get(slot) or 0
+        size = read_size(replay_file, size)
+        delay = None if governor.expired() else governor.reserve(size)
+        if delay is None:
+            return False
+        end = time.monotonic() + delay
+        remaining = delay
+        while remaining > 0:
+            if futures:
+                done, _pending = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+                collect(done)
+            else:
+                time.sleep(remaining)
+            remaining = end - time.monotonic()
+        return True
+
+    stopped = False
+    try:
+        for slot, replay_file, source_folder, refresh, file_stat in tasks:
+            if not proceed() or not throttle(slot, replay_file, file_stat):
+                stopped = True
+                break
+            if pool is None:
+                pool = get_parse_pool(workers, nice, warm=_warm_parse_worker)
+            future = pool.submit(_run_parse_task, str(replay_file), str(source_folder), parse_options, refresh, file_stat)
+            futures[future] = slot
+            done, _pending = wait(futures, timeout=None if len(futures) >= limit else 0, return_when=FIRST_COMPLETED)
+            collect(done)
+        if stopped:
+            for future in futures:
+                future.cancel()
+        collect(as_completed([future for future in futures if not future.cancelled()]))
+    finally:
+        # The pool outlives the scan; only this scan's queued tasks go.
+        for future in futures:
+            future.cancel()
+
+
+def _scheduled(
+    tasks: Iterable[Tuple[int, Path, Any, Any, Optional[os.stat_result]]],
+    mtimes: Optional[Dict[int, float]] = None,
+    lookahead: int = SCHEDULE_LOOKAHEAD,
+) -> Iterator[Tuple[int, Path, Any, Any, Optional[os.stat_result]]]:
+    # Newest-first order among the next lookahead tasks, so the games just
+    # played are indexed (and in the journal) early in a long rescan while
+    # discovery keeps streaming into the parse. Slots keep the final index
+    # order.
+    def mtime(task: Tuple[int, Path, Any, Any, Optional[os.stat_result]]) -> float:
+        if task[4] is not None:
+            return task[4].st_mtime
+        return (mtimes or {}).get(task[0]) or 0.0
+
+    heap: List[Tuple[float, int, Tuple[int, Path, Any, Any, Optional[os.stat_result]]]] = []
+    for order, task in enumerate(tasks):
+        heapq.heappush(heap, (-mtime(task), order, task))
+        if len(heap) > lookahead:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def _raise_if_cancelled(job: Optional[ScanJob], stats: Dict[str, Any]) -> None:
+    if job is not None and job.cancelled:
+        raise ScanCancelled(
+            f"Scan cancelled after {stats['parsed'] + stats['refreshed'] + stats['failed']} replays; "
+            "parsed replays are kept in the scan journal"
+        )
+
+
+def _new_scan_stats() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "cached": 0,
+        "parsed": 0,
+        "refreshed": 0,
+        "failed": 0,
+        "known_failures": 0,
+        "events_decoded": 0,
+        "events_skipped": 0,
+        "bytes_skipped": 0,
+        "deferred": 0,
+        "deduplicated": 0,
+    }
+
+
+def _count_parse(stats: Dict[str, Any], record: Optional[Dict[str, Any]], *, refreshed: bool = False) -> None:
+    if record is None:
+        stats["failed"] += 1
+        return
+    if refreshed:
+        stats["refreshed"] += 1
+        return
+    stats["parsed"] += 1
+    window = record.get("tracker_window") or {}
+    for key in ("events_decoded", "events_skipped", "bytes_skipped"):
+        stats[key] += window.get(key) or 0
+
+
+def _existing_index(index: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Callers holding the index in memory (the GUI) pass it in to skip the
+    # JSON round-trip; it is only read, never modified.
+    return load_index() if index is None else index
+
+
+def _merge_errors(existing: Iterable[str], new_errors: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys([*existing, *new_errors]))
+
+
+def _reusable_record(record: Optional[Dict[str, Any]], parse_options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # An identical replay's record can stand in for a parse when it is as
+    # complete as this scan needs and its analyzers are current.
+    if record is None or record.get("analysis_status") == ANALYSIS_FAILED:
+        return None
+    if is_partial(record) and not parse_options["header_only"]:
+        return None
+    if _stale_analyzers(record, tracker=not parse_options["header_only"]):
+        return None
+    return record
+
 
+def _rebase_record(
+    record: Dict[str, Any],
+    path: Any,
+    source_folder: Any,
+    mtime: Any,
+    size: Any,
+) -> Dict[str, Any]:
+    copy = dict(record)
+    copy.update(
+        {
+            "path": str(path),
+            "filename": replay_name(path),
+            "source_folder": str(source_folder) if source_folder else "",
+            "mtime": mtime,
+            "size": size,
+        }
+    )
+    return copy
+
+
+def _copy_result(
+    record: Optional[Dict[str, Any]],
+    failure: Optional[Dict[str, Any]],
+    replay_file: Path,
+    source_folder: Path,
+    stat: os.stat_result,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    # The parse result of one copy, as it applies to another copy.
+    if record is None:
+        return None, dict(failure or {}, path=str(replay_file))
+    copy = _rebase_record(record, replay_file, source_folder, stat.st_mtime, stat.st_size)
+    _share_event_subset(record, copy)
+    return copy, None
+
+
+def _share_event_subset(record: Dict[str, Any], copy: Dict[str, Any]) -> None:
+    # Lets analyzer reruns on the copy work from the cached events too.
+    if is_partial(record):
+        return
+    subset = load_event_subset(record["path"], record.get("mtime"), record.get("size"))
+    if subset is not None:
+        _store_event_subset(copy, subset)
+
+
+def _scan_files(
+    replay_files: Iterable[ReplayFile],
+    by_path: Dict[str, Dict[str, Any]],
+    parse_options: Dict[str, Any],
+    *,
+    progress_cb: Optional[callable],
+    jobs: int,
+    check_source_folder: bool = True,
+    skip_known_failures: bool = True,
+    newest_first: bool = False,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
+    by_hash: Optional[RecordsByHash] = None,
+    journal_base: Dict[str, Any],
+) -> Tuple[List[Dict[str, Any]], List[str], Dict[str, Any], List[str]]:
+    # replay_files may still be streaming in from discovery; the progress
+    # total grows with it. Results are written into slots so the index keeps
+    # discovery order no matter which worker finishes first. The last value
+    # lists the replays a governed scan deferred to its next tick.
+    # Workers hash the replays they parse. Copies are byte-identical, so only
+    # a replay whose size matches one parsed in this scan or an indexed
+    # replay (by_hash) is hashed here first: a copy of an indexed replay
+    # reuses its record, one of a finished parse gets that result, and later
+    # copies of a replay hashed here wait for its parse. Journal checkpoints
+    # save journal_base with the records parsed so far.
+    slots: List[Optional[Dict[str, Any]]] = []
+    slot_errors: Dict[int, str] = {}
+    slot_files: Dict[int, Tuple[str, os.stat_result]] = {}
+    refresh_slots: set = set()
+    unfinished: Dict[int, str] = {}
+    hashes: Dict[int, str] = {}
+    leaders: Dict[str, int] = {}
+    copies: Dict[int, List[Tuple[int, Path, Path, os.stat_result]]] = {}
+    results: Dict[str, Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = {}
+    sizes: set = set()
+    by_hash = by_hash if by_hash is not None else records_by_hash([])
+    indexed_sizes = by_hash.sizes
+    stats = _new_scan_stats()
+    done = 0
+    registry = load_failures()
+    registry_changed = prune_failures(registry) > 0
+    parser_version = _parser_version()
+    journal = _ScanJournal(journal_base)
+
+    def report() -> None:
+        if progress_cb:
+            progress_cb(done, len(slots))
+
+    def charge(nbytes: int) -> bool:
+        # Hash reads count against a governed tick's read budget; the wait
+        # they add falls on the next parse.
+        return governor is None or (not governor.expired() and governor.reserve(nbytes) is not None)
+
+    def tasks() -> Iterator[Tuple[int, Path, Path, Any, Optional[os.stat_result]]]:
+        nonlocal done
+        for replay_file, source_folder, stat in replay_files:
+            if job is not None and job.cancelled:
+                return
+            slot = len(slots)
+            slots.append(None)
+            resolved = str(replay_file)
+            cached = by_path.get(resolved)
+            expected_folder = source_folder if check_source_folder else None
+            if _is_cache_hit(cached, stat, parse_options, expected_folder):
+                # Keep the cached record while stale analyzers are rerun, so
+                # a failed refresh does not drop it from the index.
+                slots[slot] = cached
+                stale = _stale_analyzers(cached, tracker=not parse_options["header_only"])
+                if stale:
+                    refresh_slots.add(slot)
+                    unfinished[slot] = resolved
+                    yield slot, replay_file, source_folder, (cached, stale), stat
+                    continue
+                stats["cached"] += 1
+                done += 1
+                report()
+                continue
+            known = get_failure(registry, resolved, stat, parser_version) if skip_known_failures else None
+            if known:
+                # Header-only records whose analysis failed stay listed as failed.
+                if cached and cached.get("mtime") == stat.st_mtime and cached.get("size") == stat.st_size:
+                    slots[slot] = cached
+                slot_errors[slot] = failure_text(known)
+                stats["known_failures"] += 1
+                done += 1
+                report()
+                continue
+            slot_files[slot] = (resolved, stat)
+            unfinished[slot] = resolved
+            yield slot, replay_file, source_folder, None, stat
+
+    def unique(
+        stream: Iterable[Tuple[int, Path, Path, Any, Optional[os.stat_result]]],
+    ) -> Iterator[Tuple[int, Path, Path, Any, Optional[os.stat_result]]]:
+        # Pulled right before each submission, so only replays about to be
+        # parsed are hashed, in parse order. A replay whose hash read does not
+        # fit in the tick budget is deferred.
+        for task in stream:
+            slot, replay_file, source_folder, refresh, stat = task
+            if refresh is not None:
+                yield task
+                continue
+            resolved = str(replay_file)
+            size = read_size(resolved, stat.st_size)
+            if size in sizes or stat.st_size in indexed_sizes or size in indexed_sizes:
+                if not charge(size):
+                    continue
+                digest = try_content_hash(resolved)
+                if digest in results:
+                    finish(slot, *_copy_result(*results[digest], replay_file, source_folder, stat))
+                    continue
+                if digest in leaders:
+                    copies.setdefault(leaders[digest], []).append((slot, replay_file, source_folder, stat))
+                    continue
+                reused = _reusable_record(by_hash.get(digest), parse_options) if digest else None
+                if reused is not None:
+                    finish(slot, _rebase_record(reused, replay_file, source_folder, stat.st_mtime, stat.st_size), None)
+                    continue
+                if digest:
+                    hashes[slot] = digest
+                    leaders[digest] = slot
+            sizes.add(size)
+            yield task
+
+    def on_result(slot: int, record: Optional[Dict[str, Any]], failure: Optional[Dict[str, Any]]) -> None:
+        # Refreshes that fell back to a full parse keep the cached hash.
+        digest = hashes.get(slot) or (record or {}).get("content_hash") or (slots[slot] or {}).get("content_hash")
+        if record is not None and digest:
+            record["content_hash"] = digest
+        if digest and slot not in refresh_slots:
+            results[digest] = (record, failure)
+        for copy_slot, replay_file, source_folder, stat in copies.pop(slot, []):
+            finish(copy_slot, *_copy_result(record, failure, replay_file, source_folder, stat))
+        finish(slot, record, failure, parsed=True)
+
+    def finish(
+        slot: int,
+        record: Optional[Dict[str, Any]],
+        failure: Optional[Dict[str, Any]],
+        *,
+        parsed: bool = False,
+    ) -> None:
+        nonlocal done, registry_changed
+        unfinished.pop(slot, None)
+        if failure:
+            slot_errors[slot] = failure_text(failure)
+        if slot in slot_files:
+            resolved, stat = slot_files[slot]
+            if failure:
+                record_failure(registry, resolved, stat, parser_version, failure)
+                registry_changed = True
+            elif clear_failure(registry, resolved):
+                registry_changed = True
+        if record is not None:
+            slots[slot] = record
+            if journal.add(record) and registry_changed:
+                save_failures(registry)
+                registry_changed = False
+        if parsed or record is None:
+            _count_parse(stats, record, refreshed=slot in refresh_slots)
+        else:
+            stats["deduplicated"] += 1
+        done += 1
+        report()
+
+    task_iter = tasks()
+    task_stream = _scheduled(task_iter) if newest_first else task_iter
+    try:
+        _parse_replays(unique(task_stream), parse_options, jobs=jobs, on_result=on_result, job=job, governor=governor)
+    finally:
+        # A cancelled or failed scan resumes from its last batch too.
+        journal.flush()
+    if registry_changed:
+        save_failures(registry)
+    _raise_if_cancelled(job, stats)
+    # Whatever discovery still holds after the tick budget ran out is
+    # deferred too, without being read; a deferred replay keeps its previous
+    # record meanwhile.
+    for _task in task_iter:
+        pass
+    for slot, path in unfinished.items():
+        if slots[slot] is None:
+            slots[slot] = by_path.get(path)
+    stats["deferred"] = len(unfinished)
 
-def save_index(index: Dict[str, Any]) -> None:
-    save_json(index_path(), index)
+    stats["total"] = len(slots)
+    updated = [record for record in slots if record is not None]
+    errors = [slot_errors[slot] for slot in sorted(slot_errors)]
+    return updated, errors, stats, [unfinished[slot] for slot in sorted(unfinished)]
 
 
 def scan_replays(
@@ -400,52 +1535,56 @@ def scan_replays(
     use_cache: bool = True,
     proxy_threshold: float = 35.0,
     progress_cb: Optional[callable] = None,
+    jobs: int = 1,
+    two_phase: bool = False,
+    opening_window: bool = False,
+    opening_loops: Optional[int] = None,
+    index: Optional[Dict[str, Any]] = None,
+    discovery_jobs: int = DISCOVERY_WORKERS,
+    newest_first: bool = False,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
 ) -> Dict[str, Any]:
-    _ensure_sc2reader()
-    from sc2reader import load_replay
-
     folder = folder.resolve()
-    existing = load_index() if use_cache else {"replays": []}
+    stored = _existing_index(index)
+    existing = stored if use_cache else {"replays": []}
     by_path = {item["path"]: item for item in existing.get("replays", [])}
+    parse_options = _parse_options(
+        proxy_threshold=proxy_threshold,
+        two_phase=two_phase,
+        opening_window=opening_window,
+        opening_loops=opening_loops,
+    )
 
-    updated: List[Dict[str, Any]] = []
-    errors: List[str] = []
-
-    replay_files = list(_iter_replay_files(folder))
-    total = len(replay_files)
-    for idx, replay_file in enumerate(replay_files, start=1):
-        resolved = str(replay_file.resolve())
-        stat = replay_file.stat()
-        cached = by_path.get(resolved)
-        if (
-            cached
-            and cached.get("mtime") == stat.st_mtime
-            and cached.get("size") == stat.st_size
-            and cached.get("proxy_threshold") == proxy_threshold
-        ):
-            updated.append(cached)
-            if progress_cb:
-                progress_cb(idx, total)
-            continue
-
-        try:
-            replay = load_replay(str(replay_file), load_level=3)
-            updated.append(_serialize_replay(replay, replay_file, proxy_threshold=proxy_threshold, source_folder=folder))
-            if progress_cb:
-                progress_cb(idx, total)
-        except Exception as exc:  # noqa: BLE001
-            errors.append(f"{replay_file}: {exc}")
-            if progress_cb:
-                progress_cb(idx, total)
+    discovery: Dict[str, Any] = {}
+    updated, errors, stats, deferred = _scan_files(
+        _discover_replay_files([folder], discovery, workers=discovery_jobs),
+        by_path,
+        parse_options,
+        progress_cb=progress_cb,
+        jobs=jobs,
+        check_source_folder=False,
+        skip_known_failures=use_cache,
+        newest_first=newest_first,
+        job=job,
+        governor=governor,
+        by_hash=records_by_hash(existing.get("replays", [])),
+        journal_base=stored,
+    )
+    stats.update(discovery)
 
     index = {
-        "replays": updated,
+        "replays": _with_other_folders(stored, updated, [folder]),
         "errors": errors,
         "folder": str(folder),
         "folders": [str(folder)],
         "proxy_threshold": proxy_threshold,
+        "stats": stats,
     }
-    save_index(index)
+    if deferred:
+        index["deferred"] = deferred
+    threshold_changes = apply_proxy_threshold(index, proxy_threshold)
+    _save_scan_index(index, threshold_changes > 0 or _index_changed(existing, index, stats), [folder])
     return index
 
 
@@ -455,134 +1594,526 @@ def scan_replays_multi(
     use_cache: bool = True,
     proxy_threshold: float = 35.0,
     progress_cb: Optional[callable] = None,
+    jobs: int = 1,
+    two_phase: bool = False,
+    opening_window: bool = False,
+    opening_loops: Optional[int] = None,
+    index: Optional[Dict[str, Any]] = None,
+    discovery_jobs: int = DISCOVERY_WORKERS,
+    newest_first: bool = False,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
 ) -> Dict[str, Any]:
-    _ensure_sc2reader()
-    from sc2reader import load_replay
-
     folder_list = [Path(folder).resolve() for folder in folders if folder]
-    existing = load_index() if use_cache else {"replays": []}
+    stored = _existing_index(index)
+    existing = stored if use_cache else {"replays": []}
     by_path = {item["path"]: item for item in existing.get("replays", [])}
+    parse_options = _parse_options(
+        proxy_threshold=proxy_threshold,
+        two_phase=two_phase,
+        opening_window=opening_window,
+        opening_loops=opening_loops,
+    )
 
-    replay_files: List[Tuple[Path, Path]] = []
-    for folder in folder_list:
-        for replay_file in _iter_replay_files(folder):
-            replay_files.append((replay_file, folder))
-
-    updated: List[Dict[str, Any]] = []
-    errors: List[str] = []
-    total = len(replay_files)
-    for idx, (replay_file, source_folder) in enumerate(replay_files, start=1):
-        resolved = str(replay_file.resolve())
-        stat = replay_file.stat()
-        cached = by_path.get(resolved)
-        if (
-            cached
-            and cached.get("mtime") == stat.st_mtime
-            and cached.get("size") == stat.st_size
-            and cached.get("proxy_threshold") == proxy_threshold
-            and cached.get("source_folder") == str(source_folder)
-        ):
-            updated.append(cached)
-            if progress_cb:
-                progress_cb(idx, total)
-            continue
-
-        try:
-            replay = load_replay(str(replay_file), load_level=3)
-            updated.append(
-                _serialize_replay(
-                    replay,
-                    replay_file,
-                    proxy_threshold=proxy_threshold,
-                    source_folder=source_folder,
-                )
-            )
-            if progress_cb:
-                progress_cb(idx, total)
-        except Exception as exc:  # noqa: BLE001
-            errors.append(f"{replay_file}: {exc}")
-            if progress_cb:
-                progress_cb(idx, total)
+    discovery: Dict[str, Any] = {}
+    updated, errors, stats, deferred = _scan_files(
+        _discover_replay_files(folder_list, discovery, workers=discovery_jobs),
+        by_path,
+        parse_options,
+        progress_cb=progress_cb,
+        jobs=jobs,
+        skip_known_failures=use_cache,
+        newest_first=newest_first,
+        job=job,
+        governor=governor,
+        by_hash=records_by_hash(existing.get("replays", [])),
+        journal_base=stored,
+    )
+    stats.update(discovery)
 
     index = {
-        "replays": updated,
+        "replays": _with_other_folders(stored, updated, folder_list),
         "errors": errors,
         "folders": [str(folder) for folder in folder_list],
         "proxy_threshold": proxy_threshold,
+        "stats": stats,
     }
-    save_index(index)
+    if deferred:
+        index["deferred"] = deferred
+    if len(folder_list) == 1:
+        index["folder"] = str(folder_list[0])
+    threshold_changes = apply_proxy_threshold(index, proxy_threshold)
+    _save_scan_index(index, threshold_changes > 0 or _index_changed(existing, index, stats), folder_list)
     return index
 
 
+def _with_other_folders(
+    existing: Dict[str, Any], updated: List[Dict[str, Any]], folder_list: Iterable[Path]
+) -> List[Dict[str, Any]]:
+    # A scan owns the shards of its folders; other folders' records stay.
+    folder_strs = {str(folder) for folder in folder_list}
+    paths = {item.get("path") for item in updated}
+    replays = existing.get("replays", [])
+    others = copy_replays(
+        replays,
+        [
+            slot
+            for slot in range(len(replays))
+            if not _in_folders(_folder_fields(replays, slot), folder_strs)
+            and record_value(replays, slot, "path") not in paths
+        ],
+    )
+    others.extend(updated)
+    return others
+
+
 def scan_replays_delta(
     folder: Path,
     *,
     use_cache: bool = True,
     proxy_threshold: float = 35.0,
     progress_cb: Optional[callable] = None,
+    jobs: int = 1,
+    two_phase: bool = False,
+    opening_window: bool = False,
+    opening_loops: Optional[int] = None,
+    index: Optional[Dict[str, Any]] = None,
+    discovery_jobs: int = DISCOVERY_WORKERS,
+    newest_first: bool = False,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
 ) -> Dict[str, Any]:
     return scan_replays_multi_delta(
         [folder],
         use_cache=use_cache,
         proxy_threshold=proxy_threshold,
         progress_cb=progress_cb,
+        jobs=jobs,
+        two_phase=two_phase,
+        opening_window=opening_window,
+        opening_loops=opening_loops,
+        index=index,
+        discovery_jobs=discovery_jobs,
+        newest_first=newest_first,
+        job=job,
+        governor=governor,
     )
 
 
+def _in_folders(item: Dict[str, Any], folder_strs: set) -> bool:
+    if item.get("source_folder") in folder_strs:
+        return True
+    path = item.get("path", "")
+    return any(path.startswith(folder + os.sep) for folder in folder_strs)
+
+
+def _folder_fields(replays: Any, slot: int) -> Dict[str, Any]:
+    # What _in_folders() looks at, without decoding a snapshot row.
+    return {"path": record_value(replays, slot, "path", ""), "source_folder": record_value(replays, slot, "source_folder")}
+
+
+def diff_replay_files(
+    replay_files: Iterable[ReplayFile],
+    replays: Any,
+    folders: Iterable[Path],
+) -> Dict[str, List[Any]]:
+    # Compares a directory listing against indexed records by stat data alone:
+    # added/changed hold the discovered (replay_file, source_folder, stat)
+    # entries to parse, removed holds the paths of records under the folders
+    # whose file is gone. Only the path, mtime, size and source folder
+    # columns of snapshot rows are read.
+    folder_strs = {str(folder) for folder in folders}
+    by_path: Dict[str, int] = {}
+    for slot in range(len(replays)):
+        path = record_value(replays, slot, "path")
+        if path:
+            by_path[path] = slot
+    seen: set = set()
+    added: List[ReplayFile] = []
+    changed: List[ReplayFile] = []
+    for replay_file, source_folder, stat in replay_files:
+        path = str(replay_file)
+        seen.add(path)
+        slot = by_path.get(path)
+        if slot is None:
+            added.append((replay_file, source_folder, stat))
+        elif (
+            record_value(replays, slot, "mtime") != stat.st_mtime
+            or record_value(replays, slot, "size") != stat.st_size
+        ):
+            changed.append((replay_file, source_folder, stat))
+    removed = [
+        path
+        for path, slot in by_path.items()
+        if path not in seen and _in_folders(_folder_fields(replays, slot), folder_strs)
+    ]
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+def _drop_errors_for(errors: Iterable[str], paths: set, folder_strs: set) -> List[str]:
+    # Errors of re-parsed replays are superseded by this scan's errors, and
+    # those of deleted files under the scanned folders are no longer relevant.
+    kept = []
+    for error in errors:
+        path = error.partition(": ")[0]
+        if path in paths:
+            continue
+        if _in_folders({"path": path}, folder_strs) and not replay_exists(path):
+            continue
+        kept.append(error)
+    return kept
+
+
 def scan_replays_multi_delta(
     folders: Iterable[Path],
     *,
     use_cache: bool = True,
     proxy_threshold: float = 35.0,
     progress_cb: Optional[callable] = None,
+    jobs: int = 1,
+    two_phase: bool = False,
+    opening_window: bool = False,
+    opening_loops: Optional[int] = None,
+    index: Optional[Dict[str, Any]] = None,
+    discovery_jobs: int = DISCOVERY_WORKERS,
+    newest_first: bool = False,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
 ) -> Dict[str, Any]:
-    _ensure_sc2reader()
-    from sc2reader import load_replay
-
     folder_list = [Path(folder).resolve() for folder in folders if folder]
-    existing = load_index() if use_cache else {"replays": []}
-    by_path = {item["path"]: item for item in existing.get("replays", [])}
+    stored = _existing_index(index)
+    existing = stored if use_cache else {"replays": []}
+    parse_options = _parse_options(
+        proxy_threshold=proxy_threshold,
+        two_phase=two_phase,
+        opening_window=opening_window,
+        opening_loops=opening_loops,
+    )
 
-    replay_files: List[Tuple[Path, Path]] = []
-    for folder in folder_list:
-        for replay_file in _iter_replay_files(folder):
-            replay_files.append((replay_file, folder))
-
-    candidates: List[Tuple[Path, Path]] = []
-    for replay_file, source_folder in replay_files:
-        resolved = str(replay_file.resolve())
-        if resolved not in by_path:
-            candidates.append((replay_file, source_folder))
-
-    updated: List[Dict[str, Any]] = list(existing.get("replays", []))
-    errors: List[str] = list(existing.get("errors", []))
-    total = len(candidates)
-    for idx, (replay_file, source_folder) in enumerate(candidates, start=1):
-        try:
-            replay = load_replay(str(replay_file), load_level=3)
-            updated.append(
-                _serialize_replay(
-                    replay,
-                    replay_file,
-                    proxy_threshold=proxy_threshold,
-                    source_folder=source_folder,
-                )
-            )
-            if progress_cb:
-                progress_cb(idx, total)
-        except Exception as exc:  # noqa: BLE001
-            errors.append(f"{replay_file}: {exc}")
-            if progress_cb:
-                progress_cb(idx, total)
+    # Removals are only known once the listing is complete, so the delta is
+    # taken over the whole stream before anything is parsed.
+    discovery: Dict[str, Any] = {}
+    replay_files = _discover_replay_files(folder_list, discovery, workers=discovery_jobs)
+    delta = diff_replay_files(replay_files, existing.get("replays", []), folder_list)
+    return _scan_delta(
+        existing,
+        delta,
+        folder_list,
+        parse_options,
+        use_cache=use_cache,
+        progress_cb=progress_cb,
+        jobs=jobs,
+        discovery=discovery,
+        newest_first=newest_first,
+        job=job,
+        governor=governor,
+        journal_base=stored,
+    )
+
+
+def _scan_delta(
+    existing: Dict[str, Any],
+    delta: Dict[str, List[Any]],
+    folder_list: List[Path],
+    parse_options: Dict[str, Any],
+    *,
+    use_cache: bool,
+    progress_cb: Optional[callable],
+    jobs: int,
+    discovery: Optional[Dict[str, int]] = None,
+    newest_first: bool = False,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
+    journal_base: Dict[str, Any],
+) -> Dict[str, Any]:
+    proxy_threshold = parse_options["proxy_threshold"]
+    candidates = delta["added"] + delta["changed"]
+    parsed, new_errors, stats, deferred = _scan_files(
+        candidates,
+        {},
+        parse_options,
+        progress_cb=progress_cb,
+        jobs=jobs,
+        skip_known_failures=use_cache,
+        newest_first=newest_first,
+        job=job,
+        governor=governor,
+        by_hash=records_by_hash(existing.get("replays", [])),
+        journal_base=journal_base,
+    )
+    stats.update({name: len(paths) for name, paths in delta.items()})
+    stats.update(discovery or {})
+
+    # Changed replays keep their position (or drop out if they no longer
+    # parse, or keep the old record if deferred); removed ones drop out and
+    # new ones are appended.
+    parsed_by_path = {record["path"]: record for record in parsed}
+    changed_paths = {str(replay_file) for replay_file, _folder, _stat in delta["changed"]}
+    changed_paths.difference_update(deferred)
+    removed_paths = set(delta["removed"])
+    replays = existing.get("replays", [])
+    kept: List[int] = []
+    replaced: Dict[int, Dict[str, Any]] = {}
+    for slot in range(len(replays)):
+        path = record_value(replays, slot, "path")
+        if path in removed_paths:
+            continue
+        if path in changed_paths:
+            if path in parsed_by_path:
+                replaced[len(kept)] = parsed_by_path.pop(path)
+                kept.append(slot)
+            continue
+        kept.append(slot)
+    # Untouched snapshot rows are carried over without being decoded.
+    updated = copy_replays(replays, kept)
+    for position, record in replaced.items():
+        updated[position] = record
+    updated.extend(record for record in parsed if record["path"] in parsed_by_path)
+    for path in removed_paths:
+        discard_event_subset(path)
+
+    touched = changed_paths | removed_paths | {str(replay_file) for replay_file, _folder, _stat in delta["added"]}
+    touched.difference_update(deferred)
+    folder_strs = {str(folder) for folder in folder_list}
+    errors = _merge_errors(_drop_errors_for(existing.get("errors", []), touched, folder_strs), new_errors)
 
     index = dict(existing)
+    index.pop("deferred", None)
+    if deferred:
+        index["deferred"] = deferred
     index["replays"] = updated
     index["errors"] = errors
     index["folders"] = [str(folder) for folder in folder_list]
     index["proxy_threshold"] = proxy_threshold
+    index["stats"] = stats
     if len(folder_list) == 1:
         index["folder"] = str(folder_list[0])
-    save_index(index)
+    threshold_changes = apply_proxy_threshold(index, proxy_threshold)
+    _save_scan_index(index, threshold_changes > 0 or _index_changed(existing, index, stats), folder_list)
+    return index
+
+
+def scan_replay_paths(
+    paths: Iterable[Any],
+    folders: Iterable[Path],
+    *,
+    use_cache: bool = True,
+    proxy_threshold: float = 35.0,
+    progress_cb: Optional[callable] = None,
+    jobs: int = 1,
+    two_phase: bool = False,
+    opening_window: bool = False,
+    opening_loops: Optional[int] = None,
+    index: Optional[Dict[str, Any]] = None,
+    newest_first: bool = False,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
+) -> Dict[str, Any]:
+    # Delta scan limited to the given paths (e.g. reported by a folder
+    # watcher): existing files are parsed when new or changed, missing ones
+    # are dropped from the index. Paths outside the folders are ignored.
+    folder_list = [Path(folder).resolve() for folder in folders if folder]
+    stored = _existing_index(index)
+    existing = stored if use_cache else {"replays": []}
+    parse_options = _parse_options(
+        proxy_threshold=proxy_threshold,
+        two_phase=two_phase,
+        opening_window=opening_window,
+        opening_loops=opening_loops,
+    )
+
+    replays = existing.get("replays", [])
+    indexed = {record_value(replays, slot, "path") for slot in range(len(replays))}
+    replay_files: List[ReplayFile] = []
+    gone: List[str] = []
+    archives: set = set()
+    fs_calls = 0
+    for path in sorted({str(path) for path in paths}):
+        # A reported archive, or a member of one (deferred by a governed
+        # scan), stands for all replays currently in that archive.
+        split = split_member_path(path)
+        replay_file = Path(split[0] if split else path).resolve()
+        source_folder = next((folder for folder in folder_list if folder in replay_file.parents), None)
+        if source_folder is None or str(replay_file) in archives:
+            continue
+        fs_calls += 2
+        if is_archive(replay_file.name):
+            archives.add(str(replay_file))
+            prefix = member_path(replay_file, "")
+            try:
+                stat = replay_file.stat()
+                members = [Path(member_path(replay_file, member)) for member in list_replay_members(replay_file)]
+                fs_calls += 1
+            except OSError:
+                stat, members = None, []
+            replay_files.extend((member, source_folder, stat) for member in members)
+            listed = {str(member) for member in members}
+            gone.extend(item for item in indexed if item and item.startswith(prefix) and item not in listed)
+            continue
+        if not replay_file.name.lower().endswith(".sc2replay"):
+            continue
+        try:
+            replay_files.append((replay_file, source_folder, replay_file.stat()))
+        except OSError:
+            gone.append(str(replay_file))
+    # One resolve() and one stat() per reported path, plus one listing per
+    # reported archive.
+    discovery = {"fs_calls": fs_calls}
+    discovery["fs_calls_per_replay"] = _per_replay(fs_calls, len(replay_files) + len(gone))
+
+    delta = diff_replay_files(replay_files, existing.get("replays", []), [])
+    delta["removed"] = [path for path in gone if path in indexed]
+    return _scan_delta(
+        existing,
+        delta,
+        folder_list,
+        parse_options,
+        use_cache=use_cache,
+        progress_cb=progress_cb,
+        jobs=jobs,
+        discovery=discovery,
+        newest_first=newest_first,
+        job=job,
+        governor=governor,
+        journal_base=stored,
+    )
+
+
+_ABSENT = object()
+
+
+def _analysis_fields(replays: Any, slot: int) -> Dict[str, Any]:
+    # What needs_analysis() looks at, without decoding a snapshot row.
+    fields = {}
+    for key in ("analysis_status", "analyzer_versions"):
+        value = record_value(replays, slot, key, _ABSENT)
+        if value is not _ABSENT:
+            fields[key] = value
+    return fields
+
+
+def analyze_partial_replays(
+    *,
+    proxy_threshold: float = 35.0,
+    progress_cb: Optional[callable] = None,
+    jobs: int = 1,
+    opening_window: bool = False,
+    opening_loops: Optional[int] = None,
+    index: Optional[Dict[str, Any]] = None,
+    newest_first: bool = False,
+    job: Optional[ScanJob] = None,
+    governor: Optional[ScanGovernor] = None,
+) -> Dict[str, Any]:
+    existing = _existing_index(index)
+    replays = copy_replays(existing.get("replays", []))
+    parse_options = _parse_options(
+        proxy_threshold=proxy_threshold,
+        opening_window=opening_window,
+        opening_loops=opening_loops,
+    )
+    # Partial records sharing a content hash are analyzed once; the result
+    # is fanned out to the copies.
+    tasks: List[Tuple[int, Path, str, Any, Optional[os.stat_result]]] = []
+    leaders: Dict[str, int] = {}
+    copies: Dict[int, List[int]] = {}
+    for slot in range(len(replays)):
+        if not record_value(replays, slot, "path") or not needs_analysis(_analysis_fields(replays, slot)):
+            continue
+        item = replays[slot]
+        refresh = None if is_partial(item) else (item, _stale_analyzers(item))
+        digest = item.get("content_hash")
+        if refresh is None and digest:
+            if digest in leaders:
+                copies.setdefault(leaders[digest], []).append(slot)
+                continue
+            leaders[digest] = slot
+        tasks.append((slot, Path(item["path"]), item.get("source_folder", ""), refresh, None))
+    refresh_slots = {task[0] for task in tasks if task[3] is not None}
+
+    new_errors: List[str] = []
+    registry = load_failures()
+    registry_changed = False
+    parser_version = _parser_version()
+    journal = _ScanJournal(existing)
+    stats = _new_scan_stats()
+    total = len(tasks) + sum(len(slots) for slots in copies.values())
+    stats["total"] = total
+    done = 0
+
+    def on_result(slot: int, record: Optional[Dict[str, Any]], failure: Optional[Dict[str, Any]]) -> None:
+        if record is not None and replays[slot].get("content_hash"):
+            record.setdefault("content_hash", replays[slot]["content_hash"])
+        for copy_slot in copies.pop(slot, []):
+            item = replays[copy_slot]
+            copy = None
+            if record is not None:
+                copy = _rebase_record(record, item["path"], item.get("source_folder"), item.get("mtime"), item.get("size"))
+                _share_event_subset(record, copy)
+            finish(copy_slot, copy, dict(failure, path=item["path"]) if failure else None)
+        finish(slot, record, failure, parsed=True)
+
+    def finish(
+        slot: int,
+        record: Optional[Dict[str, Any]],
+        failure: Optional[Dict[str, Any]],
+        *,
+        parsed: bool = False,
+    ) -> None:
+        nonlocal done, registry_changed
+        path = replays[slot]["path"]
+        if record is not None:
+            replays[slot] = record
+            if slot not in refresh_slots and clear_failure(registry, path):
+                registry_changed = True
+        elif slot not in refresh_slots:
+            failed = dict(replays[slot])
+            failed["analysis_status"] = ANALYSIS_FAILED
+            replays[slot] = failed
+            try:
+                record_failure(registry, path, replay_stat(path), parser_version, failure or {})
+                registry_changed = True
+            except OSError:
+                pass
+        if record is not None or slot not in refresh_slots:
+            if journal.add(replays[slot]) and registry_changed:
+                save_failures(registry)
+                registry_changed = False
+        if failure:
+            new_errors.append(failure_text(failure))
+        if parsed or record is None:
+            _count_parse(stats, record, refreshed=slot in refresh_slots)
+        else:
+            stats["deduplicated"] += 1
+        done += 1
+        if progress_cb:
+            progress_cb(done, total)
+
+    if newest_first:
+        tasks = list(_scheduled(tasks, {task[0]: replays[task[0]].get("mtime") for task in tasks}, len(tasks)))
+    try:
+        _parse_replays(
+            tasks,
+            parse_options,
+            jobs=jobs,
+            on_result=on_result,
+            job=job,
+            governor=governor,
+            sizes={task[0]: replays[task[0]].get("size") for task in tasks},
+        )
+    finally:
+        journal.flush()
+    if registry_changed:
+        save_failures(registry)
+    _raise_if_cancelled(job, stats)
+    # Replays a governed pass deferred are still partial and are picked up
+    # by the next pass.
+    stats["deferred"] = total - done
+
+    index = dict(existing)
+    index["replays"] = replays
+    index["errors"] = _merge_errors(existing.get("errors", []), new_errors)
+    index["stats"] = stats
+    _save_scan_index(index, _index_changed(existing, index, stats))
     return index
 
 
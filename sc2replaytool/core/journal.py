@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+from .paths import get_data_dir
+
+
+JOURNAL_FILENAME = "scan_journal.jsonl"
+
+
+def journal_path() -> Path:
+    return get_data_dir() / JOURNAL_FILENAME
+
+
+def append_journal(records: Iterable[Dict[str, Any]], path: Optional[Path] = None) -> None:
+    # One JSON record per line, synced before returning so a crash or power
+    # loss can at worst leave a truncated last line behind.
+    path = path or journal_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_journal(path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    path = path or journal_path()
+    if not path.exists():
+        return []
+    records: List[Dict[str, Any]] = []
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.debug("Skipping unreadable journal line in %s", path.name)
+    except OSError:
+        return []
+    return records
+
+
+def clear_journal(path: Optional[Path] = None) -> None:
+    try:
+        (path or journal_path()).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def replace_journal(records: List[Dict[str, Any]], path: Optional[Path] = None) -> None:
+    # Swapped in whole, so a crash leaves either the old or the new journal.
+    path = path or journal_path()
+    if not records:
+        clear_journal(path)
+        return
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    append_journal(records, tmp_path)
+    os.replace(tmp_path, path)
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Generator, List, Optional, Tuple
+
+from .storage import load_json, save_json
+from .paths import get_data_dir
+from .archives import is_archive, list_replay_members, member_path, remember_member_sizes
+
+
+LISTING_CACHE_FILENAME = "dir_listing_cache.json"
+
+# A directory modified this recently may change again within the same mtime
+# tick (coarse on FAT/SMB shares), so its listing is not trusted yet.
+RACY_SECONDS = 2.0
+
+# Listing and stat() calls are latency-bound on network shares, so discovery
+# keeps several in flight at once.
+DISCOVERY_WORKERS = 8
+
+
+def listing_cache_path() -> Path:
+    return get_data_dir() / LISTING_CACHE_FILENAME
+
+
+def load_listing_cache() -> Dict[str, Any]:
+    return load_json(listing_cache_path(), {"roots": {}})
+
+
+def save_listing_cache(cache: Dict[str, Any]) -> None:
+    save_json(listing_cache_path(), cache)
+
+
+# DirEntry.stat() is served from the directory listing on Windows and costs
+# one stat() call elsewhere.
+_ENTRY_STAT_CALLS = 0 if os.name == "nt" else 1
+
+
+# Each directory entry caches its files' stats as [st_mtime, st_mtime_ns,
+# st_size, st_ino]. They are trusted while the directory's mtime is
+# unchanged, and for a file of the same name and inode when it changed, so a
+# warm walk stats directories only. A file rewritten in place without
+# touching its directory is picked up by the watcher, or once the directory
+# changes.
+def _stat_values(stat: os.stat_result) -> List[Any]:
+    return [stat.st_mtime, stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+
+def _cached_stat(values: List[Any]) -> os.stat_result:
+    mtime, mtime_ns, size, ino = values
+    return os.stat_result((0, ino, 0, 0, 0, 0, size, 0, int(mtime), 0), {"st_mtime": mtime, "st_mtime_ns": mtime_ns})
+
+
+def _list_dir(
+    path: str,
+    cached_stats: Dict[str, List[Any]],
+    file_stats: Dict[str, os.stat_result],
+    counts: Dict[str, int],
+) -> Optional[Dict[str, Any]]:
+    # Mirrors os.walk(): symlinked directories are listed but not descended.
+    dirs: List[str] = []
+    replays: List[str] = []
+    archives: List[str] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        dirs.append(entry.name)
+                elif entry.name.lower().endswith(".sc2replay") or is_archive(entry.name):
+                    (archives if is_archive(entry.name) else replays).append(entry.name)
+                    cached = cached_stats.get(entry.name)
+                    # DirEntry.inode() comes with the listing outside Windows.
+                    if _ENTRY_STAT_CALLS and cached is not None and cached[3] == entry.inode():
+                        continue
+                    try:
+                        file_stats[entry.name] = entry.stat()
+                    except OSError:
+                        pass
+                    counts["fs_calls"] += _ENTRY_STAT_CALLS
+    except OSError:
+        return None
+    return {"dirs": dirs, "replays": replays, "archives": archives}
+
+
+def _file_stat(
+    path: str,
+    name: str,
+    file_stats: Dict[str, os.stat_result],
+    cached_stats: Dict[str, List[Any]],
+) -> Tuple[Optional[os.stat_result], int]:
+    # The stat from the listing, else the cached one, else a stat() call.
+    stat = file_stats.get(name)
+    if stat is not None:
+        return stat, 0
+    cached = cached_stats.get(name)
+    if cached is not None:
+        return _cached_stat(cached), 0
+    try:
+        return os.stat(os.path.join(path, name)), 1
+    except OSError:
+        return None, 1
+
+
+def _archive_members(
+    file_path: str,
+    stat: os.stat_result,
+    cached: Optional[List[Any]],
+) -> Tuple[List[Any], bool]:
+    # Cached as [mtime_ns, size, {member: size}]; an archive is only opened
+    # again when it was rewritten. Returns the entry and whether it is new.
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        remember_member_sizes(file_path, cached[2])
+        return cached, False
+    try:
+        members = list_replay_members(file_path)
+    except OSError:
+        members = {}
+    return [stat.st_mtime_ns, stat.st_size, members], True
+
+
+def _read_dir(
+    path: str,
+    old: Dict[str, Any],
+    now: float,
+) -> Tuple[Optional[Dict[str, Any]], bool, List[Tuple[Path, os.stat_result]], int]:
+    # Runs on a discovery thread: everything it touches is local, and the
+    # caller merges the returned entry and call count.
+    calls = 1
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, False, [], calls
+    file_stats: Dict[str, os.stat_result] = {}
+    counts = {"fs_calls": 0}
+    entry = old.get(path)
+    cached_members = (entry or {}).get("members", {})
+    cached_stats = (entry or {}).get("stats", {})
+    listed = False
+    # Entries cached before archives were indexed or file stats were kept
+    # are listed once more.
+    if entry is None or entry.get("mtime_ns") != mtime_ns or "stats" not in entry:
+        calls += 1
+        listing = _list_dir(path, cached_stats, file_stats, counts)
+        if listing is None:
+            return None, False, [], calls + counts["fs_calls"]
+        listed = True
+        racy = now - mtime_ns / 1e9 < RACY_SECONDS
+        entry = dict(listing, mtime_ns=None if racy else mtime_ns)
+    found: List[Tuple[Path, os.stat_result]] = []
+    stats: Dict[str, List[Any]] = {}
+    members: Dict[str, List[Any]] = {}
+    archives = set(entry["archives"])
+    for name in entry["replays"] + entry["archives"]:
+        file_path = os.path.join(path, name)
+        stat, stat_calls = _file_stat(path, name, file_stats, cached_stats)
+        calls += stat_calls
+        if stat is None:
+            continue
+        # A file still being written is stat'ed again next time.
+        if now - stat.st_mtime >= RACY_SECONDS:
+            stats[name] = _stat_values(stat)
+        if name not in archives:
+            found.append((Path(file_path), stat))
+            continue
+        members[name], opened = _archive_members(file_path, stat, cached_members.get(name))
+        calls += opened
+        found.extend((Path(member_path(file_path, member)), stat) for member in sorted(members[name][2]))
+    if members != entry.get("members", {}) or stats != cached_stats:
+        entry = dict(entry, members=members, stats=stats)
+    return entry, listed, found, calls + counts["fs_calls"]
+
+
+def iter_replay_files(
+    folders: List[Path],
+    cache: Dict[str, Any],
+    counts: Optional[Dict[str, int]] = None,
+    *,
+    workers: int = DISCOVERY_WORKERS,
+) -> Generator[Tuple[Path, Path, os.stat_result], None, bool]:
+    # Yields (replay, folder, stat) in os.walk() order, folder by folder,
+    # while up to `workers` threads list and stat directories of every
+    # folder ahead of the consumer. Replays inside .zip/.tar packs come as
+    # "archive!member" paths carrying the archive's stat. Directories are
+    # re-listed only when their mtime differs from the cached one, archives
+    # only when their mtime or size does. Each folder's entry in cache["roots"] is replaced by the
+    # directories seen on this walk; the generator returns whether the cache
+    # changed.
+    roots = cache.setdefault("roots", {})
+    counts = counts if counts is not None else {}
+    for key in ("dirs_listed", "dirs_cached", "fs_calls"):
+        counts.setdefault(key, 0)
+    now = time.time()
+    changed = False
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="replay-discovery")
+
+    def read(path: str, old: Dict[str, Any]):
+        # Subdirectories are queued as soon as a directory is read, so the
+        # threads walk ahead of the consumer instead of waiting for it.
+        entry, listed, found, calls = _read_dir(path, old, now)
+        children = []
+        if entry is not None:
+            for name in entry["dirs"]:
+                child = os.path.join(path, name)
+                children.append((child, pool.submit(read, child, old)))
+        return entry, listed, found, calls, children
+
+    def drain(path: str, future: Future, folder: Path, old: Dict[str, Any], new: Dict[str, Any]):
+        nonlocal changed
+        entry, listed, found, calls, children = future.result()
+        counts["fs_calls"] += calls
+        if entry is None:
+            return
+        counts["dirs_listed" if listed else "dirs_cached"] += 1
+        # A rewritten archive changes the entry without a directory listing.
+        changed = changed or listed or entry is not old.get(path)
+        new[path] = entry
+        for replay_file, stat in found:
+            yield replay_file, folder, stat
+        for child, child_future in children:
+            yield from drain(child, child_future, folder, old, new)
+
+    try:
+        starts = []
+        for folder in folders:
+            old = roots.get(str(folder), {})
+            starts.append((folder, old, pool.submit(read, str(folder), old)))
+        for folder, old, future in starts:
+            new: Dict[str, Any] = {}
+            yield from drain(str(folder), future, folder, old, new)
+            roots[str(folder)] = new
+            changed = changed or new.keys() != old.keys()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return changed
+
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import threading
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+class ScanJob:
+    # Shared between the thread running a scan and whoever controls it (GUI
+    # buttons, CLI signal handlers). The scan checks in between replays, so a
+    # pause or cancel takes effect once the replays already handed to parse
+    # workers have finished; everything parsed so far is in the scan journal.
+    def __init__(self) -> None:
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def pause(self) -> None:
+        if not self._cancelled.is_set():
+            self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        self._running.set()
+
+    def proceed(self) -> bool:
+        # Blocks while paused; False once the job has been cancelled.
+        self._running.wait()
+        return not self._cancelled.is_set()
@@ -1,38 +1,94 @@
 from __future__ import annotations
 
+from bisect import bisect_left
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
 
-from .storage import load_json, save_json
+from .index_db import read_tags, write_tag_entries, write_tags
+from .journal import append_journal, clear_journal, load_journal
 from .paths import get_data_dir
 
 
-TAGS_FILENAME = "replay_tags.json"
+# Edits append each touched replay's favorite flag, tags and build order to
+# the tag journal, one fsynced line per replay. The journal is folded into
+# the tag tables on the next load or once it grows past this size.
+TAG_JOURNAL_FILENAME = "tag_journal.jsonl"
+TAG_JOURNAL_COMPACT_BYTES = 256 * 1024
 
 
-def tags_path() -> Path:
-    return get_data_dir() / TAGS_FILENAME
+def tag_journal_path() -> Path:
+    return get_data_dir() / TAG_JOURNAL_FILENAME
 
 
 def load_tags() -> Dict[str, Any]:
-    return load_json(tags_path(), {"favorites": [], "build_orders": {}, "tags": {}})
+    tags = read_tags()
+    entries = load_journal(tag_journal_path())
+    if entries:
+        for entry in entries:
+            _apply_entry(tags, entry)
+        _compact(entries)
+    return tags
 
 
 def save_tags(tags: Dict[str, Any]) -> None:
-    save_json(tags_path(), tags)
+    # Writes only the favorites, tags and build orders that changed, which
+    # supersedes anything journaled.
+    write_tags(tags)
+    clear_journal(tag_journal_path())
+
+
+def save_tag_edits(tags: Dict[str, Any], replay_paths: Iterable[str]) -> None:
+    # Journals the current state of the edited replays only.
+    path = tag_journal_path()
+    append_journal([_entry(tags, replay_path) for replay_path in dict.fromkeys(replay_paths)], path)
+    try:
+        size = path.stat().st_size
+    except OSError:
+        return
+    if size >= TAG_JOURNAL_COMPACT_BYTES:
+        _compact(load_journal(path))
+
+
+def _entry(tags: Dict[str, Any], replay_path: str) -> Dict[str, Any]:
+    return {
+        "path": replay_path,
+        "favorite": is_favorite(tags, replay_path),
+        "tags": get_tags(tags, replay_path),
+        "build_order": get_build_order(tags, replay_path),
+    }
+
+
+def _apply_entry(tags: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    replay_path = entry.get("path")
+    if not replay_path:
+        return
+    set_favorite(tags, replay_path, bool(entry.get("favorite")))
+    set_tags(tags, replay_path, entry.get("tags") or [])
+    set_build_order(tags, replay_path, entry.get("build_order") or "")
+
+
+def _compact(entries: Iterable[Dict[str, Any]]) -> None:
+    # Entries hold whole states, so folding one twice after a crash between
+    # these two steps is harmless.
+    write_tag_entries(entries)
+    clear_journal(tag_journal_path())
 
 
 def is_favorite(tags: Dict[str, Any], replay_path: str) -> bool:
-    return replay_path in set(tags.get("favorites", []))
+    # Favorites are kept sorted.
+    favorites = tags.get("favorites", [])
+    slot = bisect_left(favorites, replay_path)
+    return slot < len(favorites) and favorites[slot] == replay_path
 
 
 def set_favorite(tags: Dict[str, Any], replay_path: str, value: bool) -> None:
-    favorites = set(tags.get("favorites", []))
-    if value:
-        favorites.add(replay_path)
-    else:
-        favorites.discard(replay_path)
-    tags["favorites"] = sorted(favorites)
+    favorites = tags.setdefault("favorites", [])
+    slot = bisect_left(favorites, replay_path)
+    present = slot < len(favorites) and favorites[slot] == replay_path
+    if value and not present:
+        favorites.insert(slot, replay_path)
+    elif not value and present:
+        del favorites[slot]
 
 
 def get_build_order(tags: Dict[str, Any], replay_path: str) -> str:
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .archives import is_archive
+
+
+REPLAY_SUFFIX = ".sc2replay"
+
+# Events that arrive close together (a replay being moved into place, several
+# games copied at once) are reported as one batch.
+WATCH_SETTLE_SECONDS = 0.25
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _is_replay(name: str) -> bool:
+    # Replay packs are reported as a whole; the scan expands them.
+    return name.lower().endswith(REPLAY_SUFFIX) or is_archive(name)
+
+
+def _walk_replays(folder: str) -> Iterable[str]:
+    for root, _dirs, files in os.walk(folder):
+        for name in files:
+            if _is_replay(name):
+                yield os.path.join(root, name)
+
+
+class ReplayWatcher(ABC):
+    # Runs in a daemon thread and calls on_change with the set of replay paths
+    # that were created, rewritten, moved or deleted under the folders. The
+    # callback runs on the watcher thread.
+    def __init__(self, folders: Iterable[str], on_change: callable) -> None:
+        self.folders = [os.path.abspath(str(folder)) for folder in folders if folder]
+        self._on_change = on_change
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="replay-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _emit(self, paths: Set[str]) -> None:
+        if paths:
+            try:
+                self._on_change(paths)
+            except Exception as exc:  # noqa: BLE001
+                logging.debug("Replay watcher callback failed: %s", exc)
+
+    @abstractmethod
+    def _run(self) -> None:
+        ...
+
+
+class PollingWatcher(ReplayWatcher):
+    # Portable fallback: compares (mtime, size) snapshots every interval.
+    def __init__(self, folders: Iterable[str], on_change: callable, *, interval: float = 15.0) -> None:
+        super().__init__(folders, on_change)
+        self.interval = interval
+
+    def _snapshot(self) -> Dict[str, Tuple[float, int]]:
+        snapshot: Dict[str, Tuple[float, int]] = {}
+        for folder in self.folders:
+            for path in _walk_replays(folder):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+    def _run(self) -> None:
+        previous = self._snapshot()
+        while not self._stop.wait(self.interval):
+            current = self._snapshot()
+            changed = {path for path, key in current.items() if previous.get(path) != key}
+            changed.update(path for path in previous if path not in current)
+            previous = current
+            self._emit(changed)
+
+
+class InotifyWatcher(ReplayWatcher):
+    # Linux inotify through libc; watches are per directory, so every
+    # subdirectory gets its own and new ones are added as they appear.
+    def __init__(self, folders: Iterable[str], on_change: callable) -> None:
+        super().__init__(folders, on_change)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        self._wake_r, self._wake_w = os.pipe()
+        self._dirs: Dict[int, str] = {}
+        try:
+            for folder in self.folders:
+                self._add_tree(folder)
+        except OSError:
+            self._close()
+            raise
+
+    def _add_dir(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOENT:
+                return
+            raise OSError(code, f"{os.strerror(code)}: {path}")
+        self._dirs[wd] = path
+
+    def _add_tree(self, folder: str) -> List[str]:
+        # Returns the replays already present, which were written before the
+        # watch existed (e.g. a folder moved in with its games).
+        found: List[str] = []
+        for root, _dirs, files in os.walk(folder):
+            self._add_dir(root)
+            found.extend(os.path.join(root, name) for name in files if _is_replay(name))
+        return found
+
+    def stop(self) -> None:
+        self._stop.set()
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+        super().stop()
+        self._close()
+
+    def _close(self) -> None:
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._fd = self._wake_r = self._wake_w = -1
+
+    def _read_events(self) -> List[Tuple[int, int, str]]:
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return []
+        events: List[Tuple[int, int, str]] = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def _handle(self, events: List[Tuple[int, int, str]], changed: Set[str]) -> None:
+        for wd, mask, name in events:
+            if mask & _IN_Q_OVERFLOW:
+                # Events were dropped; report everything and let the scan's
+                # stat comparison find what actually changed.
+                for folder in self.folders:
+                    changed.update(_walk_replays(folder))
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    try:
+                        changed.update(self._add_tree(path))
+                    except OSError as exc:
+                        logging.debug("Could not watch %s: %s", path, exc)
+                continue
+            # A bare IN_CREATE is skipped: the replay is reported once it has
+            # been closed after writing.
+            if _is_replay(name) and mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_DELETE):
+                changed.add(path)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            readable, _w, _x = select.select([self._fd, self._wake_r], [], [])
+            if self._wake_r in readable:
+                return
+            changed: Set[str] = set()
+            self._handle(self._read_events(), changed)
+            while not self._stop.is_set():
+                readable, _w, _x = select.select([self._fd, self._wake_r], [], [], WATCH_SETTLE_SECONDS)
+                if self._wake_r in readable:
+                    return
+                if not readable:
+                    break
+                self._handle(self._read_events(), changed)
+            self._emit(changed)
+
+
+def create_watcher(folders: Iterable[str], on_change: callable, *, interval: float = 15.0) -> ReplayWatcher:
+    folder_list = [str(folder) for folder in folders if folder]
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder_list, on_change)
+        except (OSError, AttributeError) as exc:
+            logging.debug("inotify unavailable, polling replay folders instead: %s", exc)
+    return PollingWatcher(folder_list, on_change, interval=interval)
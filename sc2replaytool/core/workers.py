@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+
+# Modules the forkserver imports once, so every worker forked from it starts
+# with sc2reader and its datapacks already loaded.
+PRELOAD_MODULES = ["sc2replaytool.core.indexer", "sc2reader", "sc2reader.data", "sc2reader.readers"]
+# Pools kept alive between scans: one for manual scans and one for governed
+# background scans covers the GUI.
+MAX_POOLS = 2
+
+# Windows has no nice levels: a worker's nice level picks its priority class.
+BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+IDLE_PRIORITY_CLASS = 0x40
+IDLE_NICE = 15
+
+_pools: Dict[Tuple[int, int], ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+_context: Optional[Any] = None
+
+
+def priority_class(nice: int) -> Optional[int]:
+    if nice <= 0:
+        return None
+    return IDLE_PRIORITY_CLASS if nice >= IDLE_NICE else BELOW_NORMAL_PRIORITY_CLASS
+
+
+def _lower_priority(nice: int) -> None:
+    if nice <= 0:
+        return
+    try:
+        if os.name == "nt":
+            import ctypes
+
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), priority_class(nice)):
+                raise ctypes.WinError()
+        else:
+            os.nice(nice)
+    except (OSError, AttributeError) as exc:
+        logging.warning("Could not lower parse worker priority: %s", exc)
+
+
+def _init_worker(nice: int, warm: Optional[callable]) -> None:
+    # Ctrl+C is handled by the parent, which cancels the scan job and waits
+    # for the replays in flight instead of having every worker die with it.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _lower_priority(nice)
+    if warm is not None:
+        try:
+            warm()
+        except Exception as exc:  # noqa: BLE001
+            logging.debug("Parse worker warm-up failed: %s", exc)
+
+
+def _noop() -> None:
+    return None
+
+
+def _mp_context() -> Any:
+    # forkserver forks workers from a clean, preloaded process rather than
+    # from the GUI with its threads; frozen builds and Windows use the default.
+    global _context
+    if _context is None:
+        if "forkserver" in multiprocessing.get_all_start_methods() and not getattr(sys, "frozen", False):
+            _context = multiprocessing.get_context("forkserver")
+            _context.set_forkserver_preload(PRELOAD_MODULES)
+        else:
+            _context = multiprocessing.get_context()
+    return _context
+
+
+def get_parse_pool(workers: int, nice: int = 0, *, warm: Optional[callable] = None) -> ProcessPoolExecutor:
+    # Returns the live pool for (workers, nice), starting one if needed.
+    # Workers are spawned on demand and stay warm until exit; a pool broken by
+    # a crashed worker is replaced.
+    key = (workers, nice)
+    with _lock:
+        pool = _pools.pop(key, None)
+        if pool is not None and getattr(pool, "_broken", False):
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = None
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=_mp_context(),
+                initializer=_init_worker,
+                initargs=(nice, warm),
+            )
+        _pools[key] = pool
+        while len(_pools) > MAX_POOLS:
+            _pools.pop(next(iter(_pools))).shutdown(wait=False, cancel_futures=True)
+        return pool
+
+
+def prewarm_parse_pool(workers: int, nice: int = 0, *, warm: Optional[callable] = None) -> None:
+    # Starts the workers now (each one runs warm on start) so the first scan
+    # does not pay for the imports.
+    pool = get_parse_pool(workers, nice, warm=warm)
+    for _ in range(workers):
+        pool.submit(_noop)
+
+
+def shutdown_parse_pools() -> None:
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_parse_pools)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import datetime
+import multiprocessing
+import sys
+import types
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterator, List
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    # Every test gets its own data directory (index, tags, journals).
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("APPDATA", str(tmp_path / "data"))
+    from sc2replaytool.core.paths import get_data_dir
+
+    return get_data_dir()
+
+
+class _UnitEvent:
+    def __init__(self, frame: int, pid: int, name: str, x: int, y: int) -> None:
+        self.frame = frame
+        self.control_pid = pid
+        self.unit_type_name = name
+        self.x = x
+        self.y = y
+
+
+@pytest.fixture
+def fake_sc2reader(monkeypatch: pytest.MonkeyPatch) -> Iterator[SimpleNamespace]:
+    # A stand-in for sc2reader: replays are any bytes, those starting with
+    # b"BAD" fail to load. loads lists the name of every replay loaded.
+    loads: List[str] = []
+
+    def load_replay(source: Any, load_level: int = 4) -> SimpleNamespace:
+        if hasattr(source, "read"):
+            data, name = source.read(), source.name
+        else:
+            with open(source, "rb") as f:
+                data, name = f.read(), str(source)
+        loads.append(name)
+        if data.startswith(b"BAD"):
+            raise ValueError("corrupt replay")
+        players = [
+            SimpleNamespace(pid=1, name="Alice", play_race="Protoss", result="Win", team_id=1),
+            SimpleNamespace(pid=2, name="Bob", play_race="Terran", result="Loss", team_id=2),
+        ]
+        events = [_UnitEvent(0, 1, "Nexus", 10, 10), _UnitEvent(0, 2, "CommandCenter", 100, 100)]
+        return SimpleNamespace(
+            players=players,
+            map_name=f"Map {len(data) % 3}",
+            start_time=datetime.datetime(2020, 1, 1),
+            length="10.00",
+            game_type="1v1",
+            speed="Faster",
+            tracker_events=events,
+        )
+
+    module = types.ModuleType("sc2reader")
+    module.__file__ = __file__
+    module.__version__ = "test"
+    module.load_replay = load_replay
+    monkeypatch.setitem(sys.modules, "sc2reader", module)
+    # Only workers forked from this process see the stand-in, and warm pools
+    # must not outlive the test's data directory.
+    from sc2replaytool.core import workers
+
+    monkeypatch.setattr(workers, "_context", multiprocessing.get_context("fork"))
+    yield SimpleNamespace(module=module, loads=loads)
+    workers.shutdown_parse_pools()
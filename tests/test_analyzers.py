@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import inspect
+from types import SimpleNamespace
+
+import pytest
+
+from sc2replaytool.core import indexer
+from sc2replaytool.core.indexer import (
+    TRACKER_ANALYZERS,
+    _run_tracker_analyzers,
+    _TrackerAnalyzer,
+    load_index,
+    save_index,
+    scan_replays,
+)
+
+
+class UnitBornEvent:
+    def __init__(self, frame: int, pid: int, name: str, x: int, y: int) -> None:
+        self.frame = frame
+        self.control_pid = pid
+        self.unit_type_name = name
+        self.x = x
+        self.y = y
+
+
+class UnitInitEvent(UnitBornEvent):
+    pass
+
+
+class PlayerStatsEvent:
+    def __init__(self, frame: int, pid: int) -> None:
+        self.frame = frame
+        self.pid = pid
+
+
+def _replay() -> SimpleNamespace:
+    return SimpleNamespace(
+        players=[
+            SimpleNamespace(pid=1, name="Alice", play_race="Terran"),
+            SimpleNamespace(pid=2, name="Bob", play_race="Terran"),
+        ]
+    )
+
+
+def _opening(pid: int, base: int, offset: int) -> list:
+    events = [UnitBornEvent(0, pid, "CommandCenter", base, base)]
+    for n in range(8):
+        events.append(UnitInitEvent(10 + n, pid, "Barracks", base + offset, base + n))
+        events.append(PlayerStatsEvent(10 + n, pid))
+    return events
+
+
+def _pulled(events: list, pulled: list):
+    for event in events:
+        pulled.append(event)
+        yield event
+
+
+def test_one_pass_feeds_every_analyzer_and_stops_at_their_quotas():
+    opening = _opening(1, 10, 5) + _opening(2, 100, 60)
+    events = opening + _opening(1, 10, 5)
+    pulled = []
+
+    fields, stop = _run_tracker_analyzers(_replay(), _pulled(events, pulled), {"proxy_threshold": 35.0})
+
+    assert stop == "quota"
+    # The last event to read is Bob's eighth Barracks.
+    assert pulled == opening[:-1]
+    assert [seq["seq_general"] for seq in fields["bo_sequences"]] == [["Barracks"] * 8] * 2
+    assert sorted(fields["proxy_distances"]) == ["1", "2"]
+    assert fields["proxy_flag"] is True
+    assert fields["proxy_distance_max"] == fields["proxy_distances"]["2"]
+
+
+def test_events_reach_only_the_analyzers_subscribed_to_their_class(monkeypatch):
+    fed = []
+
+    class StatsAnalyzer(_TrackerAnalyzer):
+        name = "stats"
+        event_classes = ("PlayerStatsEvent",)
+
+        def feed(self, event):
+            fed.append(event)
+
+        def result(self, events_seen):
+            return {"stats_events": events_seen}
+
+    monkeypatch.setattr(indexer, "TRACKER_ANALYZERS", indexer.TRACKER_ANALYZERS + [StatsAnalyzer])
+    events = _opening(1, 10, 5)[:5]
+
+    fields, stop = _run_tracker_analyzers(_replay(), events, {})
+
+    assert stop == "end"
+    assert fed == [event for event in events if isinstance(event, PlayerStatsEvent)]
+    assert fields["stats_events"] == 5
+    assert fields["bo_sequences"][0]["seq_general"] == ["Barracks", "Barracks"]
+
+
+def _scanned(tmp_path, fake_sc2reader):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    (folder / "game.SC2Replay").write_bytes(b"replay")
+    scan_replays(folder)
+    fake_sc2reader.loads.clear()
+    return folder
+
+
+def test_bumped_tracker_analyzer_reruns_from_cached_events(tmp_path, fake_sc2reader, monkeypatch):
+    folder = _scanned(tmp_path, fake_sc2reader)
+    monkeypatch.setattr(indexer._ProxyAnalyzer, "version", 2)
+
+    index = scan_replays(folder)
+
+    assert fake_sc2reader.loads == []
+    assert (index["stats"]["parsed"], index["stats"]["refreshed"]) == (0, 1)
+    assert index["replays"][0]["analyzer_versions"] == {"matchup": 1, "players": 1, "sequences": 1, "proxy": 2}
+    assert scan_replays(folder)["stats"]["refreshed"] == 0
+
+
+def test_bumped_metadata_analyzer_reloads_the_header_only(tmp_path, fake_sc2reader, monkeypatch):
+    folder = _scanned(tmp_path, fake_sc2reader)
+    monkeypatch.setitem(indexer.METADATA_ANALYZERS, "matchup", (2, indexer._matchup_fields))
+
+    index = scan_replays(folder)
+
+    assert len(fake_sc2reader.loads) == 1
+    assert (index["stats"]["parsed"], index["stats"]["refreshed"]) == (0, 1)
+    assert index["replays"][0]["analyzer_versions"]["matchup"] == 2
+
+
+def test_unversioned_records_count_as_version_1(tmp_path, fake_sc2reader):
+    folder = _scanned(tmp_path, fake_sc2reader)
+    index = load_index()
+    index["replays"] = [{k: v for k, v in item.items() if k != "analyzer_versions"} for item in index["replays"]]
+    save_index(index)
+
+    index = scan_replays(folder)
+
+    assert fake_sc2reader.loads == []
+    assert (index["stats"]["cached"], index["stats"]["refreshed"]) == (1, 0)
+
+
+def test_analyzers_implement_feed_and_result():
+    class FeedOnly(_TrackerAnalyzer):
+        def feed(self, event):
+            pass
+
+    with pytest.raises(TypeError):
+        FeedOnly(SimpleNamespace(players=[]), {})
+    assert TRACKER_ANALYZERS
+    assert not any(inspect.isabstract(cls) for cls in TRACKER_ANALYZERS)
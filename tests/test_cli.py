@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import multiprocessing
+import sys
+
+from sc2replaytool import cli
+
+
+def test_cli_lets_frozen_parse_workers_start(monkeypatch):
+    calls = []
+    monkeypatch.setattr(multiprocessing, "freeze_support", lambda: calls.append(sys.argv[1:]))
+    monkeypatch.setattr(sys, "argv", ["sc2replaytool", "--list"])
+
+    cli.main()
+
+    assert calls == [["--list"]]
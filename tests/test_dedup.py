@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from sc2replaytool.core import indexer
+from sc2replaytool.core.dedup import content_hash, duplicate_groups
+from sc2replaytool.core.governor import ScanGovernor
+from sc2replaytool.core.indexer import load_index, scan_replays
+
+
+def _count_hashes(monkeypatch) -> list:
+    calls = []
+    hash_path = indexer.try_content_hash
+
+    def counted(path):
+        calls.append(path)
+        return hash_path(path)
+
+    monkeypatch.setattr(indexer, "try_content_hash", counted)
+    return calls
+
+
+def test_copies_are_parsed_once(tmp_path, fake_sc2reader):
+    replays = tmp_path / "replays"
+    (replays / "a").mkdir(parents=True)
+    (replays / "b").mkdir()
+    (replays / "a" / "game.SC2Replay").write_bytes(b"replay one")
+    (replays / "b" / "copy.SC2Replay").write_bytes(b"replay one")
+    (replays / "a" / "other.SC2Replay").write_bytes(b"replay two!")
+
+    index = scan_replays(replays)
+
+    assert index["stats"]["parsed"] == 2
+    assert index["stats"]["deduplicated"] == 1
+    assert len(fake_sc2reader.loads) == 2
+    by_name = {Path(item["path"]).name: item for item in index["replays"]}
+    assert by_name["game.SC2Replay"]["content_hash"] == by_name["copy.SC2Replay"]["content_hash"]
+    assert by_name["copy.SC2Replay"]["content_hash"] == content_hash(replays / "b" / "copy.SC2Replay")
+    assert [len(group) for group in duplicate_groups(index["replays"])] == [2]
+
+
+def test_copy_of_indexed_replay_reuses_its_record(tmp_path, fake_sc2reader):
+    replays = tmp_path / "replays"
+    replays.mkdir()
+    (replays / "game.SC2Replay").write_bytes(b"replay one")
+    scan_replays(replays)
+    (replays / "copy.SC2Replay").write_bytes(b"replay one")
+
+    index = scan_replays(replays, index=load_index())
+
+    assert index["stats"]["deduplicated"] == 1
+    assert len(fake_sc2reader.loads) == 1
+
+
+def test_only_same_size_replays_are_hashed_before_parsing(tmp_path, fake_sc2reader, monkeypatch):
+    replays = tmp_path / "replays"
+    replays.mkdir()
+    for n in range(5):
+        (replays / f"game{n}.SC2Replay").write_bytes(b"x" * (100 + n))
+    calls = _count_hashes(monkeypatch)
+
+    index = scan_replays(replays)
+
+    assert calls == []
+    assert index["stats"]["parsed"] == 5
+    assert all(item.get("content_hash") for item in index["replays"])
+
+
+def test_spent_tick_budget_reads_nothing(tmp_path, fake_sc2reader, monkeypatch):
+    replays = tmp_path / "replays"
+    replays.mkdir()
+    (replays / "game.SC2Replay").write_bytes(b"y" * 100)
+    scan_replays(replays)
+    # Same size as the indexed replay, so each would be hashed up front.
+    for n in range(10):
+        (replays / f"new{n}.SC2Replay").write_bytes(bytes([n]) * 100)
+    calls = _count_hashes(monkeypatch)
+    governor = ScanGovernor(bytes_per_second=1, tick_seconds=1e-9)
+
+    index = scan_replays(replays, index=load_index(), governor=governor, newest_first=True)
+
+    assert calls == []
+    assert index["stats"]["deferred"] == 10
+    assert len(fake_sc2reader.loads) == 1
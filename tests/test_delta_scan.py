@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from sc2replaytool.core.event_cache import event_cache_path
+from sc2replaytool.core.indexer import load_index, scan_replays_multi, scan_replays_multi_delta
+
+
+def _names(index) -> list:
+    return [Path(item["path"]).name for item in index["replays"]]
+
+
+def test_delta_scan_parses_added_and_changed_replays_and_drops_removed_ones(tmp_path, fake_sc2reader):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    for n in range(3):
+        (folder / f"game{n}.SC2Replay").write_bytes(b"r" * (10 + n))
+    first = _names(scan_replays_multi([folder]))
+    removed = str(folder.resolve() / "game2.SC2Replay")
+    assert event_cache_path(removed).exists()
+    fake_sc2reader.loads.clear()
+
+    (folder / "game1.SC2Replay").write_bytes(b"a longer, rewritten replay")
+    (folder / "game2.SC2Replay").unlink()
+    (folder / "game3.SC2Replay").write_bytes(b"new replay")
+    index = scan_replays_multi_delta([folder])
+
+    stats = index["stats"]
+    assert (stats["added"], stats["changed"], stats["removed"], stats["parsed"]) == (1, 1, 1, 2)
+    assert sorted(Path(name).name for name in fake_sc2reader.loads) == ["game1.SC2Replay", "game3.SC2Replay"]
+    # A changed replay keeps its place; new ones are appended.
+    assert _names(index) == [name for name in first if name != "game2.SC2Replay"] + ["game3.SC2Replay"]
+    changed = next(item for item in index["replays"] if item["filename"] == "game1.SC2Replay")
+    assert changed["size"] == len(b"a longer, rewritten replay")
+    assert not event_cache_path(removed).exists()
+    assert _names(load_index()) == _names(index)
+
+
+def test_delta_scan_drops_errors_of_deleted_replays(tmp_path, fake_sc2reader):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    (folder / "good.SC2Replay").write_bytes(b"replay")
+    (folder / "bad.SC2Replay").write_bytes(b"BAD replay")
+    assert len(scan_replays_multi([folder])["errors"]) == 1
+
+    (folder / "bad.SC2Replay").unlink()
+    index = scan_replays_multi_delta([folder])
+
+    assert index["errors"] == []
+    assert (index["stats"]["removed"], index["stats"]["parsed"]) == (0, 0)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from sc2replaytool.core.event_cache import EVENT_CACHE_DIRNAME, clear_event_cache, event_cache_path
+from sc2replaytool.core.indexer import load_index, save_index, scan_replays, scan_replays_multi
+
+
+def _replays(tmp_path, name: str, count: int):
+    folder = tmp_path / name
+    folder.mkdir()
+    for n in range(count):
+        (folder / f"game{n}.SC2Replay").write_bytes(b"r" * (10 + n))
+    return folder
+
+
+def _cached(data_dir) -> set:
+    return {path.name for path in (data_dir / EVENT_CACHE_DIRNAME).iterdir()}
+
+
+def test_saving_drops_subsets_of_replays_no_longer_indexed(tmp_path, data_dir, fake_sc2reader):
+    folder = _replays(tmp_path, "replays", 3)
+    scan_replays(folder)
+    assert _cached(data_dir) == {event_cache_path(str(folder / f"game{n}.SC2Replay")).name for n in range(3)}
+    (folder / "game2.SC2Replay").unlink()
+    (data_dir / EVENT_CACHE_DIRNAME / "leftover.json.gz.tmp").write_bytes(b"")
+
+    scan_replays(folder, index=load_index())
+
+    assert _cached(data_dir) == {event_cache_path(str(folder / f"game{n}.SC2Replay")).name for n in range(2)}
+
+
+def test_saving_some_folders_keeps_the_subsets_of_the_others(tmp_path, data_dir, fake_sc2reader):
+    first, second = _replays(tmp_path, "a", 1), _replays(tmp_path, "b", 1)
+    index = scan_replays_multi([first, second])
+    cached = _cached(data_dir)
+
+    index["replays"] = [record for record in index["replays"] if record["source_folder"] == str(first)]
+    save_index(index, [first])
+
+    assert _cached(data_dir) == cached
+    clear_event_cache()
+    assert not (data_dir / EVENT_CACHE_DIRNAME).exists()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+from sc2replaytool.core.archives import member_path
+from sc2replaytool.core.failures import load_failures, prune_failures, record_failure
+from sc2replaytool.core.indexer import scan_replays
+
+
+def test_failed_replay_is_skipped_until_it_changes(tmp_path, fake_sc2reader):
+    replays = tmp_path / "replays"
+    replays.mkdir()
+    bad = replays / "bad.SC2Replay"
+    bad.write_bytes(b"BAD replay")
+    key = str(replays.resolve() / "bad.SC2Replay")
+
+    first = scan_replays(replays)
+    entry = load_failures()["failures"][key]
+    assert (entry["exception"], entry["message"], entry["attempts"]) == ("ValueError", "corrupt replay", 1)
+    assert first["stats"]["failed"] == 1
+
+    second = scan_replays(replays)
+    assert (second["stats"]["failed"], second["stats"]["known_failures"]) == (0, 1)
+    assert second["errors"] == first["errors"]
+    assert len(fake_sc2reader.loads) == 1
+
+    bad.write_bytes(b"BAD replay, rewritten")
+    scan_replays(replays)
+    assert len(fake_sc2reader.loads) == 2
+    assert load_failures()["failures"][key]["attempts"] == 2
+
+    bad.write_bytes(b"a good replay")
+    fixed = scan_replays(replays)
+    assert fixed["stats"]["parsed"] == 1 and fixed["errors"] == []
+    assert load_failures()["failures"] == {}
+
+
+def test_parser_upgrade_retries_failed_replays(tmp_path, fake_sc2reader, monkeypatch):
+    replays = tmp_path / "replays"
+    replays.mkdir()
+    (replays / "bad.SC2Replay").write_bytes(b"BAD replay")
+    scan_replays(replays)
+
+    monkeypatch.setattr(fake_sc2reader.module, "__version__", "newer")
+    scan_replays(replays)
+
+    assert len(fake_sc2reader.loads) == 2
+    (entry,) = load_failures()["failures"].values()
+    assert entry["parser_version"] == "newer"
+
+
+def _write_pack(path: Path) -> None:
+    with zipfile.ZipFile(path, "w") as pack:
+        pack.writestr("good.SC2Replay", b"GOOD replay")
+        pack.writestr("bad.SC2Replay", b"BAD replay")
+
+
+def test_prune_keeps_failures_of_archive_members(tmp_path):
+    pack = tmp_path / "pack.zip"
+    _write_pack(pack)
+    registry = {}
+    record_failure(registry, member_path(pack, "bad.SC2Replay"), pack.stat(), "test", {"message": "corrupt"})
+    record_failure(registry, member_path(tmp_path / "gone.zip", "bad.SC2Replay"), pack.stat(), "test", {})
+    record_failure(registry, str(tmp_path / "gone.SC2Replay"), pack.stat(), "test", {})
+
+    assert prune_failures(registry) == 2
+    assert list(registry["failures"]) == [member_path(pack, "bad.SC2Replay")]
+
+
+def test_failed_archive_member_is_not_parsed_again(tmp_path, fake_sc2reader):
+    replays = tmp_path / "replays"
+    replays.mkdir()
+    _write_pack(replays / "pack.zip")
+
+    first = scan_replays(replays)
+    assert first["stats"]["failed"] == 1
+    assert first["stats"]["parsed"] == 1
+    loads = len(fake_sc2reader.loads)
+
+    second = scan_replays(replays)
+    assert second["stats"]["failed"] == 0
+    assert second["stats"]["known_failures"] == 1
+    assert len(fake_sc2reader.loads) == loads
+    bad = member_path(replays.resolve() / "pack.zip", "bad.SC2Replay")
+    assert load_failures()["failures"][bad]["attempts"] == 1
+
+
+def test_plain_failed_replay_is_skipped(tmp_path, fake_sc2reader):
+    replays = tmp_path / "replays"
+    replays.mkdir()
+    (replays / "bad.SC2Replay").write_bytes(b"BAD replay")
+
+    scan_replays(replays)
+    second = scan_replays(replays)
+    assert second["stats"]["known_failures"] == 1
+    assert len(fake_sc2reader.loads) == 1
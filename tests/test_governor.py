@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from sc2replaytool.core import governor as governor_module
+from sc2replaytool.core.governor import ScanGovernor
+from sc2replaytool.core.indexer import scan_replays
+
+
+def test_reads_are_paced_within_the_tick_budget(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(governor_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    governor = ScanGovernor(workers=2, bytes_per_second=100, tick_seconds=1.0)
+    governor.start_tick()
+
+    assert governor.cap_jobs(8) == 2
+    assert governor.reserve(50) == 0.0
+    assert governor.reserve(50) == 0.5
+    clock[0] += 0.25
+    assert governor.reserve(50) == 0.75
+    # The next read could only start after the budget ran out.
+    assert governor.reserve(50) is None
+    assert not governor.expired()
+    clock[0] += 1.0
+    assert governor.expired()
+
+    governor.start_tick()
+    assert governor.reserve(50) == 0.0
+
+
+def test_governed_scan_defers_what_its_budget_cannot_read(tmp_path, fake_sc2reader):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    # Sizes differ, so no replay is hashed up front as a possible copy.
+    for n in range(3):
+        (folder / f"game{n}.SC2Replay").write_bytes(b"replay" + b"." * (4 + n))
+    governor = ScanGovernor(bytes_per_second=10, tick_seconds=0.5)
+
+    index = scan_replays(folder, governor=governor)
+
+    assert (index["stats"]["parsed"], index["stats"]["deferred"]) == (1, 2)
+    assert len(index["replays"]) == 1
+    assert sorted(index["deferred"]) == sorted(
+        str(path) for path in folder.resolve().iterdir() if str(path) != index["replays"][0]["path"]
+    )
+
+    index = scan_replays(folder, governor=governor, index=index)
+    assert (index["stats"]["parsed"], index["stats"]["deferred"]) == (1, 1)
+    index = scan_replays(folder, governor=governor, index=index)
+    assert (index["stats"]["parsed"], index["stats"]["deferred"]) == (1, 0)
+    assert len(index["replays"]) == 3 and "deferred" not in index
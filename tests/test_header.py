@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import struct
+import sys
+import types
+from datetime import datetime
+from pathlib import Path
+
+from sc2replaytool.core.header import load_replay_header
+from sc2replaytool.core.indexer import scan_replays
+
+# 2020-01-01 12:00:00.7654321 UTC as a Windows file time.
+FILE_TIME = 132223536007654321
+# 600.49 seconds at 22.4 loops per second.
+GAME_LOOPS = 13451
+
+
+def _vint(value: int) -> bytes:
+    magnitude = abs(value)
+    out = bytearray([((magnitude & 0x3F) << 1) | (value < 0)])
+    magnitude >>= 6
+    while magnitude:
+        out[-1] |= 0x80
+        out.append(magnitude & 0x7F)
+        magnitude >>= 7
+    return bytes(out)
+
+
+def _encode(value) -> bytes:
+    # Blizzard's versioned serialization, as read by core/header.py.
+    if isinstance(value, list):
+        return b"\x00" + _vint(len(value)) + b"".join(_encode(item) for item in value)
+    if isinstance(value, bytes):
+        return b"\x02" + _vint(len(value)) + value
+    if isinstance(value, dict):
+        return b"\x05" + _vint(len(value)) + b"".join(_vint(tag) + _encode(item) for tag, item in value.items())
+    return b"\x09" + _vint(value)
+
+
+def _player(name: bytes, race: bytes, team: int, result: int, slot: int) -> dict:
+    return {0: name, 2: race, 5: team, 7: 0, 8: result, 9: slot}
+
+
+def _attributes(values: list) -> bytes:
+    data = b"\x00" * 5 + struct.pack("<I", len(values))
+    for attribute_id, scope, text in values:
+        data += struct.pack("<IIB", 999, attribute_id, scope) + text.ljust(4, b"\x00")[::-1]
+    return data
+
+
+def _archive() -> dict:
+    return {
+        "user_data": _encode({1: {4: 80188, 5: 80188}, 3: GAME_LOOPS}),
+        "replay.details": _encode(
+            {
+                0: [
+                    _player(b"&lt;TAG&gt;<sp/>Alice", b"Protoss", 0, 1, 0),
+                    # Localized race name: the lobby pick decides.
+                    _player(b"Bob", b"Terraner", 1, 2, 1),
+                ],
+                1: b"Ephemeron LE",
+                5: FILE_TIME,
+                12: 4,
+            }
+        ),
+        "replay.attributes.events": _attributes([(2001, 16, b"1v1"), (3001, 2, b"Terr")]),
+    }
+
+
+def _fake_mpyq(monkeypatch, archives: dict) -> None:
+    # A stand-in for mpyq serving the archives by file name; anything else is
+    # not an MPQ archive.
+    class MPQArchive:
+        def __init__(self, source, listfile=True):
+            files = archives.get(Path(str(source)).name)
+            if files is None:
+                raise ValueError("not an MPQ archive")
+            self.header = {"user_data_header": {"content": files["user_data"]}}
+            self._files = files
+
+        def read_file(self, name):
+            return self._files.get(name)
+
+    module = types.ModuleType("mpyq")
+    module.MPQArchive = MPQArchive
+    monkeypatch.setitem(sys.modules, "mpyq", module)
+
+
+def test_header_fields_match_sc2reader(tmp_path, monkeypatch):
+    _fake_mpyq(monkeypatch, {"game.SC2Replay": _archive()})
+
+    header = load_replay_header(tmp_path / "game.SC2Replay")
+
+    # sc2reader drops the file time's fraction of a second.
+    assert header.start_time == datetime(2020, 1, 1, 11, 50, 0)
+    assert header.length == "10.00"
+    assert header.map_name == "Ephemeron LE"
+    assert header.game_type == "1v1"
+    assert header.speed == "Faster"
+    assert [(p.pid, p.name, p.play_race, p.result, p.team_id) for p in header.players] == [
+        (1, "Alice", "Protoss", "Win", 1),
+        (2, "Bob", "Terran", "Loss", 2),
+    ]
+
+
+def test_first_phase_reads_headers_without_sc2reader(tmp_path, fake_sc2reader, monkeypatch):
+    _fake_mpyq(monkeypatch, {"game.SC2Replay": _archive()})
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    (folder / "game.SC2Replay").write_bytes(b"replay")
+    (folder / "other.SC2Replay").write_bytes(b"other replay")
+
+    index = scan_replays(folder, two_phase=True)
+
+    # The replay mpyq cannot read goes through sc2reader.
+    assert [Path(name).name for name in fake_sc2reader.loads] == ["other.SC2Replay"]
+    records = {item["filename"]: item for item in index["replays"]}
+    assert records["game.SC2Replay"]["map"] == "Ephemeron LE"
+    assert records["game.SC2Replay"]["start_time"] == "2020-01-01T11:50:00"
+    assert records["game.SC2Replay"]["matchup"] == "PvT"
+    assert records["other.SC2Replay"]["map"] != "Ephemeron LE"
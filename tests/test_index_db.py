@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+
+from sc2replaytool.core.index_db import (
+    LEGACY_INDEX_FILENAME,
+    LEGACY_TAGS_FILENAME,
+    _connect,
+    _read_records,
+    filter_replays,
+    query_replay_paths,
+    read_index,
+    read_tags,
+    snapshot_path,
+    write_index,
+)
+from sc2replaytool.core.index_snapshot import SnapshotReplays
+
+
+def _record(n: int, map_name: str, players: list, matchup: str = "PvT") -> dict:
+    return {
+        "path": f"/replays/{'ab'[n >= 2]}/game{n}.SC2Replay",
+        "filename": f"game{n}.SC2Replay",
+        "source_folder": f"/replays/{'ab'[n >= 2]}",
+        "map": map_name,
+        "matchup": matchup,
+        "start_time": f"2020-01-0{n + 1} 10:00:00",
+        "length": "12:34",
+        "mtime": 1_700_000_000.5 + n,
+        "size": 1000 + n,
+        "players": [{"name": name, "race": "Protoss", "result": "Win", "team_id": 1, "pid": 1} for name in players],
+    }
+
+
+def _index() -> dict:
+    return {
+        "folder": "/replays",
+        "folders": ["/replays/a", "/replays/b"],
+        "replays": [
+            _record(0, "Ephemeron LE", ["Alice", "Bob"]),
+            _record(1, "Jagannatha", ["Ölaf", "Bob"], matchup="TvZ"),
+            _record(2, "Ephemeron LE", ["Carol"]),
+            _record(3, "Oceanborn", ["Alice"]),
+        ],
+    }
+
+
+def test_json_stores_are_migrated_once(data_dir):
+    data_dir.mkdir(parents=True, exist_ok=True)
+    index = _index()
+    tags = {
+        "favorites": [index["replays"][0]["path"]],
+        "tags": {index["replays"][1]["path"]: ["cheese", "pro"]},
+        "build_orders": {index["replays"][2]["path"]: "Proxy Gate"},
+    }
+    (data_dir / LEGACY_INDEX_FILENAME).write_text(json.dumps(index), encoding="utf-8")
+    (data_dir / LEGACY_TAGS_FILENAME).write_text(json.dumps(tags), encoding="utf-8")
+
+    assert list(read_index()["replays"]) == index["replays"]
+    assert read_index()["folders"] == index["folders"]
+    assert read_tags() == tags
+
+    # Only a new database imports them.
+    (data_dir / LEGACY_INDEX_FILENAME).write_text(json.dumps({"replays": []}), encoding="utf-8")
+    assert list(read_index()["replays"]) == index["replays"]
+
+
+def test_query_uses_stored_columns():
+    write_index(_index())
+
+    assert query_replay_paths(matchup="TvZ") == {"/replays/a/game1.SC2Replay"}
+    assert query_replay_paths(map_text="ephemeron") == {"/replays/a/game0.SC2Replay", "/replays/b/game2.SC2Replay"}
+    assert query_replay_paths(player_text="ölaf") == {"/replays/a/game1.SC2Replay"}
+    assert query_replay_paths(map_text="ephemeron", player_text="ali") == {"/replays/a/game0.SC2Replay"}
+    assert query_replay_paths(map_text="missing") == set()
+
+
+def test_filter_decodes_only_matches():
+    write_index(_index())
+    replays = read_index()["replays"]
+    assert isinstance(replays, SnapshotReplays)
+
+    found = list(filter_replays(replays, map_text="Ephemeron", player_text="alice"))
+
+    assert [item["path"] for item in found] == ["/replays/a/game0.SC2Replay"]
+    assert [replays.peek(slot) is not None for slot in range(len(replays))] == [True, False, False, False]
+
+
+def test_filter_matches_unsaved_records_in_memory():
+    write_index(_index())
+    replays = list(read_index()["replays"])
+    replays[3] = dict(replays[3], map="Ephemeron LE")
+    replays.append(_record(4, "Ephemeron LE", ["Dave"]))
+
+    found = list(filter_replays(replays, map_text="ephemeron"))
+
+    assert [item["filename"] for item in found] == [
+        "game0.SC2Replay",
+        "game2.SC2Replay",
+        "game3.SC2Replay",
+        "game4.SC2Replay",
+    ]
+    assert list(filter_replays(replays)) == replays
+
+
+def test_strings_are_stored_once_and_shared_on_load():
+    write_index(_index())
+    with _connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM strings WHERE text = 'Ephemeron LE'").fetchone() == (1,)
+        assert conn.execute("SELECT COUNT(*) FROM replays WHERE map_id IS NULL OR data IS NOT NULL").fetchone() == (0,)
+        from_rows = _read_records(conn)
+
+    for records in (from_rows, list(read_index()["replays"])):
+        records.sort(key=lambda record: record["path"])
+        assert records == _index()["replays"]
+        # game0 and game2 sit in different shards.
+        assert records[0]["map"] is records[2]["map"]
+        assert records[0]["players"][0]["name"] is records[3]["players"][0]["name"]
+
+
+def _generations() -> dict:
+    with _connect() as conn:
+        return dict(conn.execute("SELECT folder, generation FROM shards"))
+
+
+def test_save_rewrites_only_changed_shards(data_dir):
+    write_index(_index())
+    before = _generations()
+    index = read_index()
+    index["replays"][3] = dict(index["replays"][3], map="Jagannatha")
+
+    assert write_index(index) == 1
+
+    after = _generations()
+    assert after["/replays/a"] == before["/replays/a"]
+    assert after["/replays/b"] != before["/replays/b"]
+    assert sorted(data_dir.glob("replay_index-*.snapshot")) == sorted(snapshot_path(g) for g in after.values())
+    assert read_index()["replays"][3]["map"] == "Jagannatha"
+
+
+def test_save_of_some_folders_keeps_the_other_shards():
+    write_index(_index())
+    index = read_index()
+    index["replays"] = [record for record in index["replays"] if record["source_folder"] == "/replays/a"][:1]
+
+    write_index(index, folders=["/replays/a"])
+
+    assert [record["filename"] for record in read_index()["replays"]] == [
+        "game0.SC2Replay",
+        "game2.SC2Replay",
+        "game3.SC2Replay",
+    ]
+
+
+def test_start_time_ranges_use_the_index():
+    write_index(_index())
+    with _connect() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT name FROM replays WHERE start_time >= ? ORDER BY start_time DESC",
+            ("2020-01-02",),
+        ).fetchall()
+
+    assert any("replays_start_time" in row[-1] for row in plan)
+
+
+def test_no_statement_needs_sqlite_3_35(monkeypatch):
+    # Python 3.10 on Debian 11 and Ubuntu 20.04 comes with SQLite 3.34/3.31.
+    statements = []
+    connect = sqlite3.connect
+
+    def traced(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", traced)
+    write_index(_index())
+    index = read_index()
+    index["replays"][0] = dict(index["replays"][0], map="Oceanborn")
+    index["replays"].append(_record(4, "New Map", ["Dave"]))
+    write_index(index)
+
+    assert [record["map"] for record in read_index()["replays"]][:2] == ["Oceanborn", "Jagannatha"]
+    assert statements
+    assert not any("RETURNING" in statement.upper() for statement in statements)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import math
+
+from sc2replaytool.core.index_db import read_index, snapshot_path, write_index
+from sc2replaytool.core.indexer import load_index, scan_replays, scan_replays_multi_delta
+from sc2replaytool.core.journal import append_journal
+from sc2replaytool.core import index_snapshot
+from sc2replaytool.core.index_snapshot import SnapshotReplays, copy_replays, open_snapshot, write_snapshot
+
+
+def _records() -> list:
+    return [
+        {
+            "path": "/replays/game0.SC2Replay",
+            "filename": "game0.SC2Replay",
+            "map": "Ephemeron LE",
+            "matchup": "PvT",
+            "start_time": "2020-01-01T10:00:00",
+            "length": "12.34",
+            "mtime": 1_700_000_000.25,
+            "size": 123456,
+            "players": [
+                {"name": "Alice", "race": "Protoss", "result": "Win", "team_id": 1, "pid": 1},
+                {"name": "Bob", "race": "Terran", "result": "Loss", "team_id": 2, "pid": 2},
+            ],
+            "bo_sequences": [
+                {"pid": 1, "race": "Protoss", "name": "Alice", "seq_tech": ["Gateway"], "seq_general": []},
+            ],
+            "proxy_distance_max": {"1": 12.5},
+        },
+        # Values the columns cannot hold exactly travel in the record's rest.
+        {
+            "path": "C:\\Replays\\game1.SC2Replay",
+            "map": 7,
+            "start_time": "2020-01-01 10:00:00+02:00",
+            "length": "1:02:03",
+            "mtime": math.inf,
+            "size": "big",
+            "players": [{"name": None, "race": "Zerg", "result": None, "team_id": None, "pid": 3}],
+            "bo_sequences": "odd",
+            "analysis_status": None,
+            "extra": {"nested": [1, 2]},
+        },
+        {"path": None, "mtime": 3, "proxy_threshold": 25.0},
+        {},
+    ]
+
+
+def test_records_round_trip(tmp_path):
+    path = tmp_path / "index.snapshot"
+    records = _records()
+    write_snapshot(path, {"folder": "/replays/"}, records, 7)
+
+    part = open_snapshot(path, 7)
+
+    assert part.count == len(records)
+    assert part.meta == {"folder": "/replays/"}
+    for row, record in enumerate(records):
+        decoded = part.decode(row)
+        assert decoded == record
+        assert list(decoded) == list(record)
+        assert [type(value) for value in decoded.values()] == [type(value) for value in record.values()]
+    assert part.path(1) == "C:\\Replays\\game1.SC2Replay"
+    assert part.path(2) is None
+
+
+def test_stale_or_damaged_snapshot_is_not_opened(tmp_path):
+    path = tmp_path / "index.snapshot"
+    write_snapshot(path, {}, _records(), 7)
+
+    assert open_snapshot(path, 8) is None
+    assert open_snapshot(tmp_path / "missing.snapshot", 7) is None
+    path.write_bytes(path.read_bytes()[:40])
+    assert open_snapshot(path, 7) is None
+
+
+def test_index_loads_lazily_from_snapshots():
+    records = _records()[:2]
+    write_index({"folder": "/replays", "replays": records})
+
+    replays = read_index()["replays"]
+
+    assert isinstance(replays, SnapshotReplays)
+    assert [replays.path(slot) for slot in range(len(replays))] == [record["path"] for record in records]
+    assert replays.peek(0) is None
+    assert list(replays) == records
+
+
+def test_missing_snapshot_is_rebuilt_from_rows(data_dir):
+    records = _records()[:2]
+    write_index({"folder": "/replays", "replays": records})
+    snapshots = sorted(data_dir.glob("replay_index-*.snapshot"))
+    for path in snapshots:
+        path.unlink()
+
+    assert list(read_index()["replays"]) == records
+    assert sorted(data_dir.glob("replay_index-*.snapshot")) == snapshots
+    assert all(snapshot_path(int(path.stem.split("-")[1])) == path for path in snapshots)
+
+
+def test_fields_read_without_decoding(tmp_path):
+    path = tmp_path / "index.snapshot"
+    records = _records()
+    write_snapshot(path, {}, records, 7)
+    replays = SnapshotReplays([open_snapshot(path, 7)])
+
+    for slot, record in enumerate(records):
+        for key in ("path", "map", "mtime", "size", "players", "extra", "missing"):
+            assert replays.value(slot, key, "default") == record.get(key, "default")
+    copy = replays.copy([3, 0])
+    copy[0] = {"path": "replaced"}
+
+    assert [replays.peek(slot) for slot in range(len(replays))] == [None] * len(records)
+    assert copy.value(0, "path") == "replaced"
+    assert list(copy) == [{"path": "replaced"}, records[0]]
+    assert replays.peek(0) is None and replays.path(3) is None
+
+
+def _scanned(tmp_path, count: int = 4):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    for n in range(count):
+        (folder / f"game{n}.SC2Replay").write_bytes(b"r" * (10 + n))
+    scan_replays(folder)
+    return folder
+
+
+def _decoded(replays) -> int:
+    return sum(replays.peek(slot) is not None for slot in range(len(replays)))
+
+
+def test_journal_fold_leaves_other_rows_unread(tmp_path, fake_sc2reader):
+    folder = _scanned(tmp_path)
+    record = dict(read_index()["replays"][1], map="Journaled")
+    append_journal([record])
+
+    replays = load_index()["replays"]
+
+    assert isinstance(replays, SnapshotReplays)
+    assert _decoded(replays) == 1
+    assert replays[1]["map"] == "Journaled"
+    assert len(replays) == 4 and str(folder) in replays.path(0)
+
+
+def test_delta_scan_decodes_only_what_changed(tmp_path, fake_sc2reader):
+    folder = _scanned(tmp_path)
+    (folder / "game9.SC2Replay").write_bytes(b"new replay")
+
+    index = scan_replays_multi_delta([folder], index=load_index())
+
+    assert index["stats"]["parsed"] == 1
+    assert isinstance(index["replays"], SnapshotReplays)
+    assert len(read_index()["replays"]) == 5
+
+    again = scan_replays_multi_delta([folder], index=load_index())
+    assert again["stats"]["parsed"] == 0
+    assert _decoded(again["replays"]) == 0
+
+
+def test_superseded_snapshots_are_unmapped_before_they_are_dropped(data_dir):
+    records = [dict(record, source_folder="/replays") for record in _records()[:2]]
+    write_index({"folder": "/replays", "replays": records})
+    index = read_index()
+    other = copy_replays(index["replays"])
+    (part,) = index["replays"].parts()
+    mapped = part._mapped
+    old = snapshot_path(part.generation)
+
+    index["replays"][0] = dict(index["replays"][0], map="Oceanborn")
+    write_index(index)
+
+    assert mapped.closed and not old.exists()
+    # Lists still holding its rows decoded them first.
+    assert list(other) == records
+    assert read_index()["replays"][0]["map"] == "Oceanborn"
+
+
+def test_unusable_snapshots_are_unmapped(tmp_path, monkeypatch):
+    path = tmp_path / "index.snapshot"
+    write_snapshot(path, {}, _records(), 7)
+    data = path.read_bytes()
+    path.write_bytes(data[:-16])
+    mapped = []
+    real_mmap = index_snapshot.mmap.mmap
+
+    def tracked(*args, **kwargs):
+        mapped.append(real_mmap(*args, **kwargs))
+        return mapped[-1]
+
+    monkeypatch.setattr(index_snapshot.mmap, "mmap", tracked)
+
+    assert open_snapshot(path, 7) is None
+    assert open_snapshot(path, 8) is None
+    assert [item.closed for item in mapped] == [True, True]
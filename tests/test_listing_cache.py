@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+
+from sc2replaytool.core import listing_cache
+from sc2replaytool.core.indexer import load_index, scan_replays, scan_replays_multi, scan_replays_multi_delta
+from sc2replaytool.core.listing_cache import iter_replay_files
+
+
+def _age(*paths: Path) -> None:
+    # Old enough that neither the directories nor the files count as racy.
+    moment = time.time() - 3600
+    for path in paths:
+        os.utime(path, (moment, moment))
+
+
+def _walk(folder: Path, cache: dict) -> tuple:
+    counts: dict = {}
+    stream = iter_replay_files([folder], cache, counts, workers=2)
+    found = {}
+    try:
+        while True:
+            replay, _folder, stat = next(stream)
+            found[replay.name] = (stat.st_mtime, stat.st_size)
+    except StopIteration as stop:
+        return found, counts, stop.value
+
+
+def _folder(tmp_path: Path) -> Path:
+    folder = tmp_path / "replays"
+    (folder / "sub").mkdir(parents=True)
+    for name in ("a.SC2Replay", "b.SC2Replay", "sub/c.SC2Replay"):
+        (folder / name).write_bytes(b"x" * len(name))
+        _age(folder / name)
+    _age(folder / "sub", folder)
+    return folder
+
+
+def _dirs(index) -> tuple:
+    return index["stats"]["dirs_listed"], index["stats"]["dirs_cached"]
+
+
+def test_only_changed_directories_are_listed_again(tmp_path, fake_sc2reader):
+    folder = _folder(tmp_path)
+    first = scan_replays(folder)
+    assert _dirs(first) == (2, 0)
+
+    second = scan_replays(folder)
+    assert _dirs(second) == (0, 2)
+    assert [item["path"] for item in second["replays"]] == [item["path"] for item in first["replays"]]
+
+    (folder / "sub" / "d.SC2Replay").write_bytes(b"new replay")
+    _age(folder / "sub")
+    third = scan_replays_multi_delta([folder])
+    assert _dirs(third) == (1, 1)
+    assert sorted(item["filename"] for item in third["replays"]) == [
+        "a.SC2Replay",
+        "b.SC2Replay",
+        "c.SC2Replay",
+        "d.SC2Replay",
+    ]
+
+
+def test_recently_modified_directories_are_not_trusted(tmp_path, fake_sc2reader):
+    folder = _folder(tmp_path)
+    (folder / "sub" / "d.SC2Replay").write_bytes(b"new replay")
+    listed = os.stat(folder / "sub")
+    scan_replays(folder)
+
+    # On a coarse mtime filesystem a second write can leave the mtime as it was.
+    (folder / "sub" / "e.SC2Replay").write_bytes(b"another replay")
+    os.utime(folder / "sub", ns=(listed.st_atime_ns, listed.st_mtime_ns))
+    index = scan_replays(folder)
+
+    assert _dirs(index) == (1, 1)
+    assert "e.SC2Replay" in {item["filename"] for item in index["replays"]}
+
+
+def test_cold_scan_reuses_the_listing_stats(tmp_path, fake_sc2reader, monkeypatch):
+    folder = _folder(tmp_path)
+    target = tmp_path / "elsewhere.SC2Replay"
+    target.write_bytes(b"linked replay")
+    (folder / "link.SC2Replay").symlink_to(target)
+    calls = []
+    real_stat, real_lstat = os.stat, os.lstat
+
+    def stat(path, *args, **kwargs):
+        calls.append(str(path))
+        return real_stat(path, *args, **kwargs)
+
+    def lstat(path, *args, **kwargs):
+        calls.append(str(path))
+        return real_lstat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", stat)
+    monkeypatch.setattr(os, "lstat", lstat)
+    index = scan_replays(folder)
+    monkeypatch.undo()
+
+    assert not [path for path in calls if path.endswith(".SC2Replay")]
+    # Two directories stat'ed and listed, and one stat per replay.
+    assert index["stats"]["fs_calls"] == 8
+    assert index["stats"]["fs_calls_per_replay"] == 2.0
+    link = next(item for item in index["replays"] if item["filename"] == "link.SC2Replay")
+    assert link["path"] == str(folder.resolve() / "link.SC2Replay")
+    assert link["size"] == len(b"linked replay")
+
+
+def _folders(tmp_path: Path) -> list:
+    folders = []
+    for name in ("a", "b"):
+        folder = tmp_path / name
+        for sub in ("x", "x/y", "z"):
+            (folder / sub).mkdir(parents=True, exist_ok=True)
+            for n in range(2):
+                (folder / sub / f"{n}.SC2Replay").write_bytes(b"replay")
+        folders.append(folder)
+    return folders
+
+
+def test_folders_are_read_concurrently_in_walk_order(tmp_path, monkeypatch):
+    folders = _folders(tmp_path)
+    roots = {str(folder) for folder in folders}
+    both_reading = threading.Barrier(2, timeout=5.0)
+    read_dir = listing_cache._read_dir
+
+    def read(path, *args):
+        if path in roots:
+            both_reading.wait()
+        return read_dir(path, *args)
+
+    monkeypatch.setattr(listing_cache, "_read_dir", read)
+
+    found = [(replay, folder) for replay, folder, _stat in iter_replay_files(folders, {}, workers=4)]
+
+    expected = [
+        (Path(root) / name, folder)
+        for folder in folders
+        for root, _dirs, files in os.walk(folder)
+        for name in files
+    ]
+    assert found == expected
+
+
+def test_parsing_starts_before_discovery_finishes(tmp_path, fake_sc2reader, monkeypatch):
+    first, second = _folders(tmp_path)
+    read_dir = listing_cache._read_dir
+    parsed_early = []
+
+    def read(path, *args):
+        if path == str(second / "z"):
+            deadline = time.monotonic() + 5.0
+            while not fake_sc2reader.loads and time.monotonic() < deadline:
+                time.sleep(0.01)
+            parsed_early.append(bool(fake_sc2reader.loads))
+        return read_dir(path, *args)
+
+    monkeypatch.setattr(listing_cache, "_read_dir", read)
+
+    index = scan_replays_multi([first, second])
+
+    assert parsed_early == [True]
+    assert len(index["replays"]) == 12
+
+
+def test_warm_walk_returns_the_cold_walk_stats(tmp_path):
+    folder = _folder(tmp_path)
+    cache: dict = {}
+    cold, _counts, changed = _walk(folder, cache)
+
+    warm, counts, changed_again = _walk(folder, cache)
+
+    assert changed and not changed_again
+    assert warm == cold
+    assert warm["a.SC2Replay"] == (os.stat(folder / "a.SC2Replay").st_mtime, 11)
+    assert counts["dirs_cached"] == 2
+
+
+def test_changed_directory_stats_new_and_replaced_files(tmp_path):
+    folder = _folder(tmp_path)
+    cache: dict = {}
+    _walk(folder, cache)
+    (folder / "new.SC2Replay").write_bytes(b"new")
+    replacement = folder / "b.tmp"
+    replacement.write_bytes(b"replaced!!!!!")
+    os.replace(replacement, folder / "b.SC2Replay")
+    _age(folder / "new.SC2Replay", folder / "b.SC2Replay")
+    (folder / "sub" / "c.SC2Replay").unlink()
+    _age(folder, folder / "sub")
+
+    found, counts, changed = _walk(folder, cache)
+
+    assert changed
+    assert sorted(found) == ["a.SC2Replay", "b.SC2Replay", "new.SC2Replay"]
+    assert found["b.SC2Replay"][1] == 13
+    assert found["new.SC2Replay"][1] == 3
+    assert counts["dirs_listed"] == 2
+
+
+def test_racy_files_are_not_trusted(tmp_path):
+    folder = _folder(tmp_path)
+    (folder / "sub" / "c.SC2Replay").write_bytes(b"growing")
+    cache: dict = {}
+    _walk(folder, cache)
+    with open(folder / "sub" / "c.SC2Replay", "ab") as f:
+        f.write(b" and done")
+
+    found, _counts, _changed = _walk(folder, cache)
+
+    assert found["c.SC2Replay"][1] == len(b"growing and done")
+
+
+def test_warm_scan_stats_directories_only(tmp_path, fake_sc2reader, monkeypatch):
+    folder = _folder(tmp_path)
+    scan_replays(folder)
+    stats, listings = [], []
+    real_stat, real_scandir = os.stat, os.scandir
+
+    def stat(path, *args, **kwargs):
+        stats.append(str(path))
+        return real_stat(path, *args, **kwargs)
+
+    def scandir(path="."):
+        listings.append(str(path))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "stat", stat)
+    monkeypatch.setattr(os, "scandir", scandir)
+    index = scan_replays(folder, index=load_index())
+    monkeypatch.undo()
+
+    assert index["stats"]["cached"] == 3
+    assert index["stats"]["dirs_cached"] == 2
+    assert index["stats"]["fs_calls"] == 2
+    assert index["stats"]["fs_calls_per_replay"] == round(2 / 3, 2)
+    assert listings == []
+    assert not [path for path in stats if path.endswith(".SC2Replay")]
+    assert sorted(path for path in stats if path.startswith(str(folder))) == sorted(
+        [str(folder), str(folder), str(folder / "sub")]
+    )
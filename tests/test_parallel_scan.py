@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from sc2replaytool.core.indexer import scan_replays_multi, scan_replays_multi_delta
+
+
+def _folders(tmp_path) -> list:
+    folders = [tmp_path / "a", tmp_path / "b"]
+    for n, folder in enumerate(folders):
+        folder.mkdir()
+        for i in range(3):
+            (folder / f"game{i}.SC2Replay").write_bytes(b"r" * (10 + 3 * n + i))
+    (folders[1] / "broken.SC2Replay").write_bytes(b"BAD replay")
+    return folders
+
+
+def test_parallel_scan_matches_a_serial_one(tmp_path, fake_sc2reader):
+    folders = _folders(tmp_path)
+
+    serial = scan_replays_multi(folders, use_cache=False, jobs=1)
+    parallel = scan_replays_multi(folders, use_cache=False, jobs=3)
+
+    assert len(serial["replays"]) == 6 and len(serial["errors"]) == 1
+    # Workers finish in any order; the index keeps discovery order.
+    assert list(parallel["replays"]) == list(serial["replays"])
+    assert parallel["errors"] == serial["errors"]
+
+
+def test_parallel_delta_scan_adds_new_replays(tmp_path, fake_sc2reader):
+    folders = _folders(tmp_path)
+    scan_replays_multi(folders, jobs=3)
+    (folders[0] / "new.SC2Replay").write_bytes(b"new replay")
+    (folders[1] / "other.SC2Replay").write_bytes(b"other replay")
+
+    index = scan_replays_multi_delta(folders, jobs=3)
+
+    assert sorted(Path(item["path"]).name for item in index["replays"]) == [
+        "game0.SC2Replay",
+        "game0.SC2Replay",
+        "game1.SC2Replay",
+        "game1.SC2Replay",
+        "game2.SC2Replay",
+        "game2.SC2Replay",
+        "new.SC2Replay",
+        "other.SC2Replay",
+    ]
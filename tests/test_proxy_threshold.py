@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from sc2replaytool.core.indexer import ANALYSIS_PARTIAL, apply_proxy_threshold, load_index, scan_replays
+
+
+def _index() -> dict:
+    return {
+        "replays": [
+            {"path": "a", "proxy_distances": {"1": 20.0, "2": 50.0}, "proxy_threshold": 35.0},
+            {"path": "b", "proxy_distances": {}, "proxy_threshold": 35.0},
+            {"path": "c", "analysis_status": ANALYSIS_PARTIAL},
+        ]
+    }
+
+
+def test_flags_follow_the_threshold_from_stored_distances():
+    index = _index()
+
+    assert apply_proxy_threshold(index, 40.0) == 2
+    first, second, partial = index["replays"]
+    assert (first["proxy_flag"], first["proxy_distance_max"], first["proxy_threshold"]) == (True, 50.0, 40.0)
+    assert (second["proxy_flag"], second["proxy_distance_max"]) == (False, None)
+    assert partial == {"path": "c", "analysis_status": ANALYSIS_PARTIAL}
+    assert index["proxy_threshold"] == 40.0
+
+    assert apply_proxy_threshold(index, 40.0) == 0
+    assert apply_proxy_threshold(index, 60.0) == 2
+    assert index["replays"][0]["proxy_flag"] is False
+
+
+def test_new_threshold_does_not_reparse_cached_replays(tmp_path, fake_sc2reader):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    (folder / "game.SC2Replay").write_bytes(b"replay")
+    scan_replays(folder, proxy_threshold=35.0)
+    fake_sc2reader.loads.clear()
+
+    index = scan_replays(folder, proxy_threshold=10.0)
+
+    assert fake_sc2reader.loads == []
+    assert index["replays"][0]["proxy_threshold"] == 10.0
+    assert load_index()["proxy_threshold"] == 10.0
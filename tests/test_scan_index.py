@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from sc2replaytool.core import indexer
+from sc2replaytool.core.indexer import load_index, scan_replays
+
+
+def _saves(monkeypatch) -> list:
+    saved = []
+    save_index = indexer.save_index
+
+    def counted(index, *args, **kwargs):
+        saved.append(len(index["replays"]))
+        save_index(index, *args, **kwargs)
+
+    monkeypatch.setattr(indexer, "save_index", counted)
+    return saved
+
+
+def test_unchanged_rescan_of_an_in_memory_index_is_not_saved(tmp_path, fake_sc2reader, monkeypatch):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    (folder / "game0.SC2Replay").write_bytes(b"replay")
+    index = scan_replays(folder)
+    fake_sc2reader.loads.clear()
+    saved = _saves(monkeypatch)
+
+    index = scan_replays(folder, index=index)
+    assert fake_sc2reader.loads == [] and saved == []
+
+    (folder / "game1.SC2Replay").write_bytes(b"another replay")
+    index = scan_replays(folder, index=index)
+    assert len(fake_sc2reader.loads) == 1 and saved == [2]
+    assert len(load_index()["replays"]) == 2
+
+
+def test_new_threshold_leaves_the_callers_records_alone(tmp_path, fake_sc2reader, monkeypatch):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    (folder / "game0.SC2Replay").write_bytes(b"replay")
+    index = scan_replays(folder, proxy_threshold=35.0)
+    record = index["replays"][0]
+    saved = _saves(monkeypatch)
+
+    rescanned = scan_replays(folder, proxy_threshold=10.0, index=index)
+
+    assert record["proxy_threshold"] == 35.0
+    assert rescanned["replays"][0]["proxy_threshold"] == 10.0
+    assert saved == [1]
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import pytest
+
+from sc2replaytool.core import indexer
+from sc2replaytool.core.indexer import load_index, scan_replays
+from sc2replaytool.core.index_db import read_index
+from sc2replaytool.core.journal import append_journal, journal_path, load_journal
+from sc2replaytool.core.scan_job import ScanCancelled, ScanJob
+
+
+def _replays(tmp_path, count: int, name: str = "replays"):
+    folder = tmp_path / name
+    folder.mkdir()
+    for n in range(count):
+        (folder / f"game{n}.SC2Replay").write_bytes(b"r" * (10 + n))
+    return folder
+
+
+def test_interrupted_scan_resumes_from_the_journal(tmp_path, fake_sc2reader):
+    folder = _replays(tmp_path, 5)
+
+    def crash(done, total):
+        if done == 3:
+            raise RuntimeError("crashed")
+
+    with pytest.raises(RuntimeError):
+        scan_replays(folder, progress_cb=crash)
+    # A crash mid-append leaves a truncated last line.
+    with journal_path().open("a", encoding="utf-8") as f:
+        f.write('{"path": "/replays/cut')
+
+    assert len(load_journal()) == 3
+    assert len(load_index()["replays"]) == 3
+    fake_sc2reader.loads.clear()
+
+    index = scan_replays(folder)
+
+    assert len(fake_sc2reader.loads) == 2
+    assert len(index["replays"]) == 5
+    assert load_journal() == []
+
+
+def test_checkpoints_save_the_index_being_built(tmp_path, fake_sc2reader, monkeypatch):
+    scan_replays(_replays(tmp_path, 1, "other"))
+    folder = _replays(tmp_path, 3)
+    index = load_index()
+    monkeypatch.setattr(indexer, "JOURNAL_CHECKPOINT_SECONDS", 0.0)
+    monkeypatch.setattr(indexer, "read_index", lambda: pytest.fail("a checkpoint reloaded the index"))
+    saved = []
+    save_index = indexer.save_index
+
+    def counted(index, folders=None):
+        saved.append(len(index["replays"]))
+        save_index(index, folders)
+
+    monkeypatch.setattr(indexer, "save_index", counted)
+
+    scan_replays(folder, index=index)
+
+    # One checkpoint per record, then the finished index.
+    assert saved == [2, 3, 4, 4]
+    assert load_journal() == []
+    assert len(read_index()["replays"]) == 4
+
+
+def test_journal_appends_are_synced_in_batches(tmp_path, fake_sc2reader, monkeypatch):
+    folder = _replays(tmp_path, 40)
+    monkeypatch.setattr(indexer, "JOURNAL_BATCH_SECONDS", 3600.0)
+    batches = []
+    append = indexer.append_journal
+
+    def counted(records):
+        batches.append(len(records))
+        append(records)
+
+    monkeypatch.setattr(indexer, "append_journal", counted)
+
+    scan_replays(folder)
+
+    assert batches == [32, 8]
+
+
+def test_cancelled_scan_journals_its_last_batch(tmp_path, fake_sc2reader):
+    folder = _replays(tmp_path, 5)
+    job = ScanJob()
+
+    def progress(done, total):
+        if done == 3:
+            job.cancel()
+
+    with pytest.raises(ScanCancelled):
+        scan_replays(folder, progress_cb=progress, job=job)
+
+    assert len(load_journal()) == 3
+    assert len(read_index()["replays"]) == 0
+
+
+def test_unchanged_rescan_prunes_journal_entries_it_dropped(tmp_path, fake_sc2reader):
+    folder = _replays(tmp_path, 2)
+    index = scan_replays(folder)
+    # Left by an earlier, interrupted scan of a replay deleted since.
+    gone = dict(index["replays"][0], path=str(folder / "gone.SC2Replay"), filename="gone.SC2Replay")
+    append_journal([gone, index["replays"][1]])
+
+    rescanned = scan_replays(folder, index=index)
+
+    assert rescanned["stats"]["parsed"] == 0
+    assert load_journal() == [index["replays"][1]]
+    assert [record["filename"] for record in load_index()["replays"]] == ["game0.SC2Replay", "game1.SC2Replay"]
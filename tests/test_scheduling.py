@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from sc2replaytool.core.indexer import _scheduled, scan_replays
+
+
+def _task(slot: int, mtime: float):
+    return slot, Path(f"{slot}.SC2Replay"), Path("."), None, SimpleNamespace(st_mtime=mtime)
+
+
+def test_newest_first_streams_with_bounded_lookahead():
+    pulled = []
+
+    def discovery():
+        for slot in range(100):
+            pulled.append(slot)
+            yield _task(slot, float(slot % 10))
+
+    stream = _scheduled(discovery(), lookahead=4)
+    first = next(stream)
+    assert len(pulled) == 5
+    assert first[0] == 4
+
+    order = [first[0]] + [task[0] for task in stream]
+    assert sorted(order) == list(range(100))
+
+
+def test_newest_first_within_lookahead():
+    tasks = [_task(slot, mtime) for slot, mtime in enumerate([1.0, 5.0, 3.0, 5.0, 2.0])]
+    assert [task[0] for task in _scheduled(tasks, lookahead=10)] == [1, 3, 2, 4, 0]
+
+
+def test_newest_first_scan_keeps_folder_order(tmp_path, fake_sc2reader):
+    replays = tmp_path / "replays"
+    replays.mkdir()
+    for n in range(6):
+        path = replays / f"game{n}.SC2Replay"
+        path.write_bytes(b"z" * (10 + n))
+        mtime = 1_700_000_000 + (n * 5) % 6
+        os.utime(path, (mtime, mtime))
+
+    newest = scan_replays(replays, newest_first=True)
+    in_order = scan_replays(replays, use_cache=False)
+
+    assert newest["stats"]["parsed"] == 6
+    assert [item["path"] for item in newest["replays"]] == [item["path"] for item in in_order["replays"]]
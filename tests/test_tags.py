@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from sc2replaytool.core import tags as tags_module
+from sc2replaytool.core.index_db import read_tags
+from sc2replaytool.core.journal import load_journal
+from sc2replaytool.core.tags import (
+    load_tags,
+    save_tag_edits,
+    save_tags,
+    set_build_order,
+    set_favorite,
+    set_tags,
+    tag_journal_path,
+)
+
+GAME = "/replays/game.SC2Replay"
+OTHER = "/replays/other.SC2Replay"
+
+
+def test_edits_are_journaled_then_folded_on_load():
+    tags = load_tags()
+    set_favorite(tags, GAME, True)
+    set_tags(tags, GAME, ["pro", " cheese ", ""])
+    save_tag_edits(tags, [GAME])
+    set_build_order(tags, OTHER, "Proxy Gate")
+    save_tag_edits(tags, [OTHER, OTHER])
+
+    assert len(load_journal(tag_journal_path())) == 2
+    assert read_tags() == {"favorites": [], "build_orders": {}, "tags": {}}
+
+    loaded = load_tags()
+
+    assert loaded == tags
+    assert loaded == {"favorites": [GAME], "tags": {GAME: ["cheese", "pro"]}, "build_orders": {OTHER: "Proxy Gate"}}
+    assert load_journal(tag_journal_path()) == []
+    assert read_tags() == loaded
+
+
+def test_later_entries_win_and_clear_edits():
+    tags = load_tags()
+    set_favorite(tags, GAME, True)
+    set_tags(tags, GAME, ["pro"])
+    save_tags(tags)
+    set_favorite(tags, GAME, False)
+    set_tags(tags, GAME, [])
+    save_tag_edits(tags, [GAME])
+
+    assert load_tags() == {"favorites": [], "tags": {}, "build_orders": {}}
+    assert read_tags() == {"favorites": [], "build_orders": {}, "tags": {}}
+
+
+def test_journal_is_compacted_once_it_grows(monkeypatch):
+    monkeypatch.setattr(tags_module, "TAG_JOURNAL_COMPACT_BYTES", 1)
+    tags = load_tags()
+    set_favorite(tags, GAME, True)
+
+    save_tag_edits(tags, [GAME])
+
+    assert load_journal(tag_journal_path()) == []
+    assert read_tags()["favorites"] == [GAME]
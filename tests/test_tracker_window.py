@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sys
+import types
+from types import SimpleNamespace
+
+import pytest
+
+from sc2replaytool.core.indexer import _TrackerStream
+
+EVENTS = 10
+EVENT_BYTES = 6
+
+
+class _OpaqueDecoder:
+    # Exposes nothing about its position. Each event is three structs.
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._pos = 0
+        self._reads = 0
+
+    def done(self) -> bool:
+        return self._pos >= len(self._data)
+
+    def read_struct(self):
+        self._reads += 1
+        self._pos += EVENT_BYTES // 3
+        return (10, 1, [0, 0, 0, 0])[(self._reads - 1) % 3]
+
+
+class _TellDecoder(_OpaqueDecoder):
+    def tell(self) -> int:
+        return self._pos
+
+
+class _BufferDecoder(_OpaqueDecoder):
+    # s2protocol style: the offset is only known to the bit buffer.
+    @property
+    def _buffer(self) -> SimpleNamespace:
+        return SimpleNamespace(used_bits=lambda: self._pos * 8)
+
+
+def _stream(monkeypatch, decoder_class) -> _TrackerStream:
+    decoders = types.ModuleType("sc2reader.decoders")
+    decoders.VersionedDecoder = decoder_class
+    readers = types.ModuleType("sc2reader.readers")
+    readers.TrackerEventsReader = lambda: SimpleNamespace(EVENT_DISPATCH={1: lambda frames, data, build: frames})
+    monkeypatch.setitem(sys.modules, "sc2reader", types.ModuleType("sc2reader"))
+    monkeypatch.setitem(sys.modules, "sc2reader.decoders", decoders)
+    monkeypatch.setitem(sys.modules, "sc2reader.readers", readers)
+    archive = SimpleNamespace(read_file=lambda name: b"\0" * (EVENTS * EVENT_BYTES))
+    return _TrackerStream(SimpleNamespace(build=1, archive=archive))
+
+
+@pytest.mark.parametrize("decoder_class", [_TellDecoder, _BufferDecoder, _OpaqueDecoder])
+def test_window_stats_count_skipped_events(monkeypatch, decoder_class):
+    stream = _stream(monkeypatch, decoder_class)
+    events = iter(stream)
+    for _ in range(4):
+        next(events)
+
+    stats = stream.window_stats("loop_cap", 100)
+
+    assert stats["events_decoded"] == 4
+    assert stats["events_skipped"] == EVENTS - 4
+    assert stats["bytes_skipped"] == (EVENTS - 4) * EVENT_BYTES
+
+
+@pytest.mark.parametrize("decoder_class", [_TellDecoder, _BufferDecoder, _OpaqueDecoder])
+def test_window_stats_after_full_stream(monkeypatch, decoder_class):
+    stream = _stream(monkeypatch, decoder_class)
+    assert len(list(stream)) == EVENTS
+
+    stats = stream.window_stats("end", None)
+
+    assert stats["events_skipped"] == 0
+    assert stats["bytes_skipped"] == 0
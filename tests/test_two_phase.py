@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from sc2replaytool.core.indexer import (
+    ANALYSIS_COMPLETE,
+    ANALYSIS_FAILED,
+    ANALYSIS_PARTIAL,
+    analyze_partial_replays,
+    load_index,
+    scan_replays,
+)
+
+
+def _replays(tmp_path, count: int):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    for n in range(count):
+        (folder / f"game{n}.SC2Replay").write_bytes(b"r" * (10 + n))
+    return folder
+
+
+def test_first_phase_stores_metadata_only(tmp_path, fake_sc2reader):
+    folder = _replays(tmp_path, 2)
+
+    index = scan_replays(folder, two_phase=True)
+
+    assert [item["analysis_status"] for item in index["replays"]] == [ANALYSIS_PARTIAL] * 2
+    assert [item["matchup"] for item in index["replays"]] == ["PvT"] * 2
+    assert all("bo_sequences" not in item for item in index["replays"])
+
+    # Partial records are cache hits for another first phase only.
+    fake_sc2reader.loads.clear()
+    scan_replays(folder, two_phase=True)
+    assert fake_sc2reader.loads == []
+    index = scan_replays(folder)
+    assert len(fake_sc2reader.loads) == 2
+    assert [item["analysis_status"] for item in index["replays"]] == [ANALYSIS_COMPLETE] * 2
+
+
+def test_analysis_pass_completes_partial_records(tmp_path, fake_sc2reader):
+    folder = _replays(tmp_path, 3)
+    scan_replays(folder, two_phase=True)
+    (folder / "game2.SC2Replay").write_bytes(b"BAD replay")
+
+    index = analyze_partial_replays()
+
+    records = {item["filename"]: item for item in index["replays"]}
+    assert [records[f"game{n}.SC2Replay"]["analysis_status"] for n in range(3)] == [
+        ANALYSIS_COMPLETE,
+        ANALYSIS_COMPLETE,
+        ANALYSIS_FAILED,
+    ]
+    assert [seq["pid"] for seq in records["game0.SC2Replay"]["bo_sequences"]] == [1, 2]
+    assert len(index["errors"]) == 1
+    assert list(load_index()["replays"]) == list(index["replays"])
+    fake_sc2reader.loads.clear()
+    analyze_partial_replays()
+    assert fake_sc2reader.loads == []
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import inspect
+import queue
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from sc2replaytool.core.indexer import scan_replay_paths, scan_replays_multi
+from sc2replaytool.core.watcher import InotifyWatcher, PollingWatcher, ReplayWatcher
+
+
+def _changes(watcher_cls, folder: Path, change: callable, *, settle: float = 0.0, **kwargs) -> set:
+    reported: queue.Queue = queue.Queue()
+    watcher = watcher_cls([str(folder)], reported.put, **kwargs)
+    watcher.start()
+    try:
+        # Lets a polling watcher take its first snapshot.
+        time.sleep(settle)
+        change()
+        paths = reported.get(timeout=5.0)
+        # Later batches of the same change (e.g. a polling tick in between).
+        while True:
+            try:
+                paths |= reported.get(timeout=0.5)
+            except queue.Empty:
+                return paths
+    finally:
+        watcher.stop()
+
+
+def _folder(tmp_path) -> Path:
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    (folder / "old.SC2Replay").write_bytes(b"old replay")
+    (folder / "moved.SC2Replay").write_bytes(b"moved replay")
+    return folder
+
+
+_CHANGED = ("new.SC2Replay", "old.SC2Replay", "moved.SC2Replay", "renamed.SC2Replay")
+
+
+def _change(folder: Path) -> callable:
+    def change():
+        (folder / "new.SC2Replay").write_bytes(b"new replay")
+        (folder / "notes.txt").write_text("not a replay")
+        (folder / "old.SC2Replay").unlink()
+        (folder / "moved.SC2Replay").rename(folder / "renamed.SC2Replay")
+
+    return change
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_reports_written_moved_and_deleted_replays(tmp_path):
+    folder = _folder(tmp_path)
+    paths = _changes(InotifyWatcher, folder, _change(folder))
+
+    assert paths == {str(folder / name) for name in _CHANGED}
+
+    def add_subfolder():
+        # Moved in with its games, which the watch never saw being written.
+        staging = tmp_path / "staging"
+        staging.mkdir()
+        (staging / "game.SC2Replay").write_bytes(b"replay")
+        staging.rename(folder / "season")
+
+    assert _changes(InotifyWatcher, folder, add_subfolder) == {str(folder / "season" / "game.SC2Replay")}
+
+
+def test_polling_watcher_reports_changed_replays(tmp_path):
+    folder = _folder(tmp_path)
+    paths = _changes(PollingWatcher, folder, _change(folder), settle=0.5, interval=0.05)
+
+    assert paths == {str(folder / name) for name in _CHANGED}
+
+
+def test_scan_of_reported_paths_parses_and_drops_only_those(tmp_path, fake_sc2reader):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    for name in ("a", "b", "c"):
+        (folder / f"{name}.SC2Replay").write_bytes(b"replay " + name.encode())
+    scan_replays_multi([folder])
+    fake_sc2reader.loads.clear()
+    (folder / "a.SC2Replay").write_bytes(b"rewritten replay a")
+    (folder / "b.SC2Replay").unlink()
+    (folder / "d.SC2Replay").write_bytes(b"replay d")
+    outside = tmp_path / "elsewhere.SC2Replay"
+    outside.write_bytes(b"replay")
+
+    index = scan_replay_paths([folder / "a.SC2Replay", folder / "b.SC2Replay", outside], [folder])
+
+    assert [Path(name).name for name in fake_sc2reader.loads] == ["a.SC2Replay"]
+    assert sorted(item["filename"] for item in index["replays"]) == ["a.SC2Replay", "c.SC2Replay"]
+
+
+def test_watchers_implement_run():
+    with pytest.raises(TypeError):
+        ReplayWatcher([], print)
+    assert not inspect.isabstract(PollingWatcher)
+    assert not inspect.isabstract(InotifyWatcher)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import ctypes
+import multiprocessing
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from sc2replaytool.core import workers
+from sc2replaytool.core.indexer import scan_replays
+from sc2replaytool.core.workers import BELOW_NORMAL_PRIORITY_CLASS, IDLE_PRIORITY_CLASS, priority_class
+
+
+def test_pools_stay_warm_per_size_and_priority(monkeypatch):
+    monkeypatch.setattr(workers, "_context", multiprocessing.get_context("fork"))
+    try:
+        first = workers.get_parse_pool(1)
+        pid = first.submit(os.getpid).result()
+        assert workers.get_parse_pool(1) is first
+        assert first.submit(os.getpid).result() == pid
+
+        workers.get_parse_pool(1, 10)
+        workers.get_parse_pool(2)
+        # Only the most recently used pools stay alive.
+        assert list(workers._pools) == [(1, 10), (2, 0)]
+        assert workers.get_parse_pool(1) is not first
+    finally:
+        workers.shutdown_parse_pools()
+    assert workers._pools == {}
+
+
+def test_scans_share_one_pool(tmp_path, fake_sc2reader):
+    folder = tmp_path / "replays"
+    folder.mkdir()
+    (folder / "game0.SC2Replay").write_bytes(b"replay")
+    scan_replays(folder, jobs=2)
+    pool = workers._pools[(2, 0)]
+    (folder / "game1.SC2Replay").write_bytes(b"another replay")
+
+    index = scan_replays(folder, jobs=2)
+
+    assert index["stats"]["parsed"] == 1
+    assert workers._pools == {(2, 0): pool}
+
+
+@pytest.mark.parametrize(
+    "nice, expected",
+    [
+        (0, None),
+        (-5, None),
+        (1, BELOW_NORMAL_PRIORITY_CLASS),
+        (10, BELOW_NORMAL_PRIORITY_CLASS),
+        (15, IDLE_PRIORITY_CLASS),
+        (19, IDLE_PRIORITY_CLASS),
+    ],
+)
+def test_nice_levels_map_to_priority_classes(nice, expected):
+    assert priority_class(nice) == expected
+
+
+def _fake_kernel32(monkeypatch, result: int = 1) -> list:
+    calls = []
+    kernel32 = SimpleNamespace(
+        GetCurrentProcess=lambda: "process",
+        SetPriorityClass=lambda handle, value: calls.append((handle, value)) or result,
+    )
+    monkeypatch.setattr(ctypes, "windll", SimpleNamespace(kernel32=kernel32), raising=False)
+    monkeypatch.setattr(ctypes, "WinError", lambda: OSError("access denied"), raising=False)
+    monkeypatch.setattr(os, "name", "nt")
+    return calls
+
+
+def test_windows_workers_get_a_priority_class(monkeypatch):
+    calls = _fake_kernel32(monkeypatch)
+    workers._lower_priority(10)
+    workers._lower_priority(0)
+    monkeypatch.undo()
+
+    assert calls == [("process", BELOW_NORMAL_PRIORITY_CLASS)]
+
+
+def test_failure_to_lower_priority_is_logged(monkeypatch, caplog):
+    _fake_kernel32(monkeypatch, result=0)
+    workers._lower_priority(19)
+    monkeypatch.undo()
+
+    assert "Could not lower parse worker priority: access denied" in caplog.text
+
+
+def test_posix_workers_are_reniced(monkeypatch):
+    calls = []
+    monkeypatch.setattr(os, "name", "posix")
+    monkeypatch.setattr(os, "nice", calls.append, raising=False)
+    workers._lower_priority(10)
+    monkeypatch.undo()
+
+    assert calls == [10]